@@ -11,12 +11,18 @@ bl_info = {
 import bpy
 from . import c3_operators
 from . import c3_ui
+from . import c3_live
+from . import c3_lod
 
 def register():
     c3_operators.register()
     c3_ui.register()
+    c3_live.register()
+    c3_lod.register()
 
 def unregister():
+    c3_lod.unregister()
+    c3_live.unregister()
     c3_ui.unregister()
     c3_operators.unregister()
 
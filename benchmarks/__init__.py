@@ -0,0 +1,87 @@
+import ast
+import datetime
+import gc
+import importlib
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import types
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADDON_NAME = "c3_addon"
+
+def addon_version():
+    # Read bl_info without importing the add-on, which needs bpy
+    with open(os.path.join(ADDON_DIR, "__init__.py"), encoding="utf-8") as file:
+        tree = ast.parse(file.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "bl_info" for t in node.targets):
+            return ".".join(str(v) for v in ast.literal_eval(node.value)["version"])
+    return "unknown"
+
+def load_addon(register=False):
+    # With register=False the package __init__ (and with it bpy) is skipped so the
+    # parser modules can be used from plain CPython, which still needs numpy and
+    # mathutils (pip install numpy mathutils)
+    if ADDON_NAME in sys.modules:
+        return sys.modules[ADDON_NAME]
+    
+    if register:
+        spec = importlib.util.spec_from_file_location(
+            ADDON_NAME, os.path.join(ADDON_DIR, "__init__.py"),
+            submodule_search_locations=[ADDON_DIR]
+        )
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[ADDON_NAME] = package
+        spec.loader.exec_module(package)
+        package.register()
+    else:
+        package = types.ModuleType(ADDON_NAME)
+        package.__path__ = [ADDON_DIR]
+        sys.modules[ADDON_NAME] = package
+    
+    modules = ["c3_main", "c3_common", "c3_key", "c3_motion", "c3_phy"]
+    if register:
+        modules.append("c3_bake")
+    for name in modules:
+        setattr(package, name, importlib.import_module(f"{ADDON_NAME}.{name}"))
+    return package
+
+def measure(name, params, func, repeat=5, setup=None):
+    # Best, median and mean wall time of func() over `repeat` runs, setup() runs untimed before each
+    times = []
+    for n in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {
+        "name": name,
+        "params": params,
+        "repeat": repeat,
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "mean_s": statistics.fmean(times),
+    }
+
+def write_report(results, out=None, runtime=None):
+    report = {
+        "addon_version": addon_version(),
+        "runtime": runtime or f"cpython {platform.python_version()}",
+        "platform": platform.platform(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if out:
+        with open(out, 'w', encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return report
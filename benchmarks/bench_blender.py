@@ -0,0 +1,133 @@
+# Full import benchmarks, run inside Blender:
+#   blender --background --factory-startup --python benchmarks/bench_blender.py -- --out import.json
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bpy
+from benchmarks import c3_synth, load_addon, measure, write_report
+from benchmarks.bench_parse import add_arguments, run_parse_suite
+
+def reset_data():
+    for data in (bpy.data.objects, bpy.data.meshes, bpy.data.actions, bpy.data.materials,
+                 bpy.data.images, bpy.data.collections, bpy.data.node_groups, bpy.data.shape_keys):
+        bpy.data.batch_remove(list(data))
+
+def storage_bytes():
+    # Per-frame data the import left behind: shape key positions or float palette images
+    total = 0
+    for key in bpy.data.shape_keys:
+        total += sum(len(kb.data) * 12 for kb in key.key_blocks[1:])
+    for image in bpy.data.images:
+        if image.is_float:
+            total += image.size[0] * image.size[1] * 16
+    return total
+
+def playback(frames):
+    scene = bpy.context.scene
+    for frame in range(frames):
+        scene.frame_set(frame)
+        bpy.context.evaluated_depsgraph_get()
+
+def run_import_suite(args, workdir):
+    addon = load_addon(register=True)
+    C3Phy = addon.c3_phy.C3Phy
+    C3Motion = addon.c3_motion.C3Motion
+    C3Bake = addon.c3_bake.C3Bake
+    results = []
+    
+    def cold_setup():
+        reset_data()
+        C3Motion.Motion_ClearCache()
+    
+    for ChunkID in args.phy_types:
+        for KeyType in args.key_types:
+            path = os.path.join(workdir, f"{ChunkID.strip()}_{KeyType}.c3")
+            c3_synth.make_c3(path, ChunkID, KeyType, args.vertices, args.bones, args.frames,
+                             args.keyframes, args.chunks)
+            
+            for bake_mode in ('FRAMES', 'KEYFRAMES', 'LIVE', 'GEOMETRY_NODES'):
+                params = {"phy": ChunkID, "key": KeyType, "vertices": args.vertices, "bones": args.bones,
+                          "frames": args.frames, "keyframes": args.keyframes, "chunks": args.chunks,
+                          "bake_mode": bake_mode}
+                
+                results.append(measure(
+                    "import_scene.c3_model", params,
+                    lambda: bpy.ops.import_scene.c3_model(filepath=path, create_new_scene=False, bake_mode=bake_mode),
+                    args.repeat, setup=cold_setup
+                ))
+                
+                def playback_setup():
+                    cold_setup()
+                    bpy.ops.import_scene.c3_model(filepath=path, create_new_scene=False, bake_mode=bake_mode)
+                    # The import excludes its collection from the view layer, playback needs it evaluated
+                    for layer_coll in bpy.context.view_layer.layer_collection.children:
+                        layer_coll.exclude = False
+                
+                result = measure("playback", params, lambda: playback(args.frames), args.repeat, setup=playback_setup)
+                result["storage_bytes"] = storage_bytes()
+                results.append(result)
+                
+                if bake_mode not in ('FRAMES', 'KEYFRAMES'):
+                    continue
+                
+                state = {}
+                
+                def bake_setup():
+                    cold_setup()
+                    phy_loader = C3Phy()
+                    phy_loader.C3_Load(path)
+                    motion_loader = C3Motion()
+                    motion_loader.C3_Load(path)
+                    state["objects"] = []
+                    for lpPhy, lpMotion in zip(phy_loader.m_phy, motion_loader.m_motion):
+                        lpPhy.lpMotion = lpMotion
+                        C3Phy.Phy_Calculate(lpPhy)
+                        mesh = bpy.data.meshes.new(lpPhy.lpName)
+                        mesh.from_pydata(lpPhy.outputPositions.tolist(), [], [tuple(lpPhy.lpIB[i:i + 3]) for i in range(0, len(lpPhy.lpIB), 3)])
+                        obj = bpy.data.objects.new(lpPhy.lpName, mesh)
+                        bpy.context.scene.collection.objects.link(obj)
+                        state["objects"].append((obj, lpPhy))
+                
+                def bake_all():
+                    for obj, lpPhy in state["objects"]:
+                        C3Bake.Bake_ShapeKeys(obj, lpPhy, szMode=bake_mode)
+                
+                results.append(measure("C3Bake.Bake_ShapeKeys", params, bake_all, args.repeat, setup=bake_setup))
+    
+    # The whole export of one large PHY: Export_Phy reads it back through Live_Load, then Phy_Save
+    for ChunkID in args.phy_types:
+        params = {"phy": ChunkID, "vertices": args.export_vertices, "bones": args.bones}
+        path = os.path.join(workdir, f"export_{ChunkID.strip()}.c3")
+        c3_synth.make_c3(path, ChunkID, "ZKEY", args.export_vertices, args.bones, 2, 2, 1)
+        out = os.path.join(workdir, f"exported_{ChunkID.strip()}.c3")
+        
+        def export_setup():
+            cold_setup()
+            bpy.ops.import_scene.c3_model(filepath=path, create_new_scene=False, bake_mode='LIVE')
+            for obj in bpy.context.scene.objects:
+                obj.select_set("c3_phy_file" in obj)
+        
+        results.append(measure("export_scene.c3_model", params, lambda: bpy.ops.export_scene.c3_model(filepath=out),
+                               args.repeat, setup=export_setup))
+    
+    reset_data()
+    return results
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Benchmark full C3 imports inside Blender")
+    add_arguments(parser)
+    parser.add_argument("--skip-parse", action="store_true", help="only run the bpy import benchmarks")
+    args = parser.parse_args(argv)
+    
+    with tempfile.TemporaryDirectory(prefix="c3_bench_") as workdir:
+        results = [] if args.skip_parse else run_parse_suite(args, workdir)
+        results += run_import_suite(args, workdir)
+    write_report(results, args.out, runtime=f"blender {bpy.app.version_string}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# Parser and skinning benchmarks, runnable from plain CPython:
+#   python -m benchmarks.bench_parse --out parse.json
+import argparse
+import io
+import os
+import sys
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import c3_synth, load_addon, measure, write_report
+
+def add_arguments(parser):
+    parser.add_argument("--vertices", type=int, default=2000)
+    parser.add_argument("--bones", type=int, default=30)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--keyframes", type=int, default=15)
+    parser.add_argument("--chunks", type=int, default=4, help="PHY/MOTI chunk pairs per file")
+    parser.add_argument("--phy-types", nargs="+", default=list(c3_synth.PHY_TYPES))
+    parser.add_argument("--key-types", nargs="+", default=list(c3_synth.KEY_TYPES))
+    parser.add_argument("--scaling", type=int, nargs="*", default=[50, 100, 200, 400],
+                        help="chunk counts for the load-time scaling run")
+    parser.add_argument("--export-vertices", type=int, default=65535,
+                        help="vertices of the single-PHY save timing (16-bit indices cap it at 65535)")
+    parser.add_argument("--motion-tolerance", type=float, default=0.01, help="tolerance of the Motion_Optimize run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+
+def resave(addon, path, ChunkID):
+    # The file rebuilt from its parsed PHYs and motions with Phy_Save/Motion_Save
+    phy_loader = addon.c3_phy.C3Phy()
+    phy_loader.C3_Load(path)
+    motion_loader = addon.c3_motion.C3Motion()
+    motion_loader.C3_Load(path)
+    out = [c3_synth.C3_HEADER]
+    for lpPhy in phy_loader.m_phy:
+        view = io.BytesIO()
+        addon.c3_phy.C3Phy.Phy_Save(view, lpPhy, ChunkID)
+        out.append(c3_synth.chunk(ChunkID, view.getvalue()))
+    for lpMotion in motion_loader.m_motion:
+        view = io.BytesIO()
+        addon.c3_motion.C3Motion.Motion_Save(view, lpMotion)
+        out.append(c3_synth.chunk("MOTI", view.getvalue()))
+    return b"".join(out)
+
+def run_parse_suite(args, workdir):
+    addon = load_addon()
+    C3Phy = addon.c3_phy.C3Phy
+    C3Motion = addon.c3_motion.C3Motion
+    results = []
+    
+    for ChunkID in args.phy_types:
+        for KeyType in args.key_types:
+            params = {"phy": ChunkID, "key": KeyType, "vertices": args.vertices, "bones": args.bones,
+                      "frames": args.frames, "keyframes": args.keyframes, "chunks": args.chunks}
+            path = os.path.join(workdir, f"{ChunkID.strip()}_{KeyType}.c3")
+            c3_synth.make_c3(path, ChunkID, KeyType, args.vertices, args.bones, args.frames,
+                             args.keyframes, args.chunks)
+            
+            results.append(measure("C3Phy.C3_Load", params, lambda: C3Phy().C3_Load(path), args.repeat))
+            results.append(measure("C3Motion.C3_Load", params, lambda: C3Motion().C3_Load(path),
+                                   args.repeat, setup=C3Motion.Motion_ClearCache))
+            
+            phy_loader = C3Phy()
+            phy_loader.C3_Load(path)
+            motion_loader = C3Motion()
+            motion_loader.C3_Load(path)
+            for lpPhy, lpMotion in zip(phy_loader.m_phy, motion_loader.m_motion):
+                lpPhy.lpMotion = lpMotion
+            
+            def calculate_all_frames():
+                for lpPhy in phy_loader.m_phy:
+                    for frame in range(args.frames):
+                        C3Phy.Phy_SetFrame(lpPhy, frame)
+                        C3Phy.Phy_Calculate(lpPhy)
+            
+            # Cold clears the palette cache, warm reuses the palettes of the previous run
+            results.append(measure("C3Phy.Phy_Calculate[cold]", params, calculate_all_frames, args.repeat,
+                                   setup=addon.c3_motion.C3Motion.Motion_ClearPalettes))
+            results.append(measure("C3Phy.Phy_Calculate[warm]", params, calculate_all_frames, args.repeat))
+            
+            # Round trip: saving what was parsed must give back the file byte for byte
+            def save_all():
+                for lpPhy in phy_loader.m_phy:
+                    C3Phy.Phy_Save(io.BytesIO(), lpPhy, ChunkID)
+                for lpMotion in motion_loader.m_motion:
+                    C3Motion.Motion_Save(io.BytesIO(), lpMotion)
+            
+            result = measure("Phy_Save+Motion_Save", params, save_all, args.repeat)
+            with open(path, 'rb') as file:
+                result["byte_identical"] = resave(addon, path, ChunkID) == file.read()
+            results.append(result)
+    
+    for count in args.scaling:
+        params = {"chunks": count, "vertices": 64, "bones": 4, "frames": 10, "keyframes": 3}
+        path = os.path.join(workdir, f"scaling_{count}.c3")
+        c3_synth.make_c3(path, "PHY4", "ZKEY", 64, 4, 10, 3, count)
+        
+        def load_both():
+            C3Phy().C3_Load(path)
+            C3Motion().C3_Load(path)
+        
+        result = measure("C3_Load[scaling]", params, load_both, args.repeat, setup=C3Motion.Motion_ClearCache)
+        result["per_chunk_s"] = result["min_s"] / count
+        results.append(result)
+    
+    for ChunkID in args.phy_types:
+        params = {"phy": ChunkID, "vertices": args.export_vertices, "bones": args.bones}
+        path = os.path.join(workdir, f"export_{ChunkID.strip()}.c3")
+        c3_synth.make_c3(path, ChunkID, "ZKEY", args.export_vertices, args.bones, 2, 2, 1)
+        phy_loader = C3Phy()
+        phy_loader.C3_Load(path)
+        lpPhy = phy_loader.m_phy[0]
+        results.append(measure("C3Phy.Phy_Save[large]", params, lambda: C3Phy.Phy_Save(io.BytesIO(), lpPhy, ChunkID), args.repeat))
+        # The parse Export_Phy runs through Live_Load, without the per-vertex objects
+        results.append(measure("C3Phy.C3_Load[export]", params, lambda: C3Phy().C3_Load(path, bVertices=False), args.repeat))
+    
+    # ZKEY recompression of smooth rigid motions, the size and error of the last run are kept
+    rng = np.random.default_rng(0)
+    for KeyType in args.key_types:
+        if KeyType == "ZKEY":
+            continue
+        params = {"key": KeyType, "bones": args.bones, "frames": args.frames, "keyframes": args.keyframes,
+                  "tolerance": args.motion_tolerance}
+        data = c3_synth.motion_chunk(rng, KeyType, args.bones, args.frames, args.keyframes, smooth=True)[8:]
+        lpMotion = C3Motion.Motion_Load(io.BytesIO(data))[1]
+        state = {}
+        
+        def optimize():
+            state["report"] = C3Motion.Motion_Optimize(lpMotion, args.motion_tolerance)[1]
+        
+        result = measure("C3Motion.Motion_Optimize", params, optimize, args.repeat)
+        result.update(state["report"])
+        results.append(result)
+    
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark C3 parsing and skinning without Blender")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="c3_bench_") as workdir:
+        results = run_parse_suite(args, workdir)
+    write_report(results, args.out)
+    if not all(result.get("byte_identical", True) for result in results):
+        print("round trip: a saved file differs from its source", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import struct
+import numpy as np
+
+C3_HEADER = b"MAXFILE C3 00001"
+
+PHY_TYPES = ("PHY ", "PHY3", "PHY4")
+KEY_TYPES = ("KKEY", "ZKEY", "XKEY", "LEGACY")
+
+def chunk(ChunkID, payload):
+    return ChunkID.encode() + struct.pack('<I', len(payload)) + payload
+
+def pack_string(text, encoding="ascii"):
+    data = text.encode(encoding)
+    return struct.pack('<I', len(data)) + data
+
+def pack_frames(frames):
+    # C3Frame: nFrame, fParam, bParam + 3 pad bytes, nParam
+    out = struct.pack('<I', len(frames))
+    for nFrame, fParam, bParam, nParam in frames:
+        out += struct.pack('<if?3xi', nFrame, fParam, bParam, nParam)
+    return out
+
+def phy_chunk(rng, ChunkID="PHY4", vertices=1000, triangles=None, bones=20, name="v_body", tex_name="v_body.dds", frames=30):
+    morph_max = 4 if ChunkID == "PHY " else 1
+    triangles = vertices * 2 if triangles is None else triangles
+    
+    fields = [("pos", '<f4', (morph_max, 3)), ("uv", '<f4', 2), ("color", '<u4'),
+              ("index", '<u4', 2), ("weight", '<f4', 2)]
+    if ChunkID == "PHY3":
+        fields.append(("normal", '<f4', 3))
+    vb = np.zeros(vertices, dtype=np.dtype(fields))
+    vb["pos"] = rng.uniform(-50.0, 50.0, (vertices, morph_max, 3))
+    vb["uv"] = rng.uniform(0.0, 1.0, (vertices, 2))
+    vb["color"] = 0xFFFFFFFF
+    vb["index"] = rng.integers(0, bones, (vertices, 2))
+    vb["weight"][:, 0] = 1.0
+    if ChunkID == "PHY3":
+        vb["normal"] = (0.0, 0.0, 1.0)
+    
+    ib = rng.integers(0, max(vertices, 1), triangles * 3).astype('<u2')
+    
+    out = pack_string(name)
+    out += struct.pack('<III', 2, vertices, 0)
+    out += vb.tobytes()
+    out += struct.pack('<II', triangles, 0)
+    out += ib.tobytes()
+    out += pack_string(tex_name, "gbk")
+    out += struct.pack('<6f', -50, -50, -50, 50, 50, 50)
+    out += np.identity(4, dtype='<f4').tobytes()
+    out += struct.pack('<I', 4)
+    out += pack_frames([(0, 1.0, False, 0), (frames // 2, 0.5, False, 0), (frames - 1, 1.0, False, 0)])
+    out += pack_frames([(0, 0.0, True, 0)])
+    out += pack_frames([(frames // 3, 0.0, False, 5)])
+    out += b'STEP' + struct.pack('<2f', 0.0, 0.0)
+    return chunk(ChunkID, out)
+
+def random_quaternions(rng, count):
+    q = rng.normal(size=(count, 4))
+    return (q / np.linalg.norm(q, axis=1, keepdims=True)).astype('<f4')
+
+def random_matrices(rng, count):
+    m = np.zeros((count, 4, 4), dtype='<f4')
+    m[:, :3, :3] = rng.uniform(-1.0, 1.0, (count, 3, 3))
+    m[:, 3, :3] = rng.uniform(-10.0, 10.0, (count, 3))
+    m[:, 3, 3] = 1.0
+    return m
+
+def smooth_matrices(rng, bones, positions):
+    # Rigid bone matrices (rotation about a fixed axis plus translation) that change
+    # smoothly with the frame, like captured animation stored at every frame
+    axis = rng.normal(size=(bones, 3))
+    axis /= np.linalg.norm(axis, axis=1, keepdims=True)
+    speed = rng.uniform(-0.01, 0.01, bones)
+    wobble = rng.uniform(0.0, 0.2, bones)
+    offset = rng.uniform(-10.0, 10.0, (bones, 3))
+    frames = np.asarray(positions, dtype=np.float64)[:, None]
+    angle = speed * frames + wobble * np.sin(frames * 0.05)
+    q = np.empty((len(positions), bones, 4))
+    q[..., :3] = axis * np.sin(angle / 2)[..., None]
+    q[..., 3] = np.cos(angle / 2)
+    x, y, z, w = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    m = np.zeros((len(positions), bones, 4, 4), dtype='<f4')
+    # Row-vector layout, as C3Motion.create_from_quaternion builds it
+    m[..., 0, :3] = np.stack((1 - 2 * (y * y + z * z), 2 * (x * y + z * w), 2 * (z * x - y * w)), axis=-1)
+    m[..., 1, :3] = np.stack((2 * (x * y - z * w), 1 - 2 * (z * z + x * x), 2 * (y * z + x * w)), axis=-1)
+    m[..., 2, :3] = np.stack((2 * (z * x + y * w), 2 * (y * z - x * w), 1 - 2 * (y * y + x * x)), axis=-1)
+    m[..., 3, :3] = offset + np.sin(frames * 0.05)[..., None] * 2.0
+    m[..., 3, 3] = 1.0
+    return m
+
+def motion_chunk(rng, KeyType="ZKEY", bones=20, frames=30, keyframes=10, morphs=0, smooth=False):
+    # smooth=True stores smooth_matrices (KKEY, XKEY and legacy only) instead of random ones
+    keyframes = min(keyframes, frames)
+    positions = np.linspace(0, frames - 1, keyframes).round().astype(np.int64)
+    if smooth:
+        poses = smooth_matrices(rng, bones, positions if KeyType != "LEGACY" else np.arange(frames))
+    
+    out = struct.pack('<II', bones, frames)
+    if KeyType == "KKEY":
+        out += b'KKEY' + struct.pack('<I', keyframes)
+        for n, pos in enumerate(positions):
+            out += struct.pack('<I', pos) + (poses[n] if smooth else random_matrices(rng, bones)).tobytes()
+    elif KeyType == "ZKEY":
+        out += b'ZKEY' + struct.pack('<I', keyframes)
+        for pos in positions:
+            keys = np.empty((bones, 7), dtype='<f4')
+            keys[:, :4] = random_quaternions(rng, bones)
+            keys[:, 4:] = rng.uniform(-10.0, 10.0, (bones, 3))
+            out += struct.pack('<H', pos) + keys.tobytes()
+    elif KeyType == "XKEY":
+        out += b'XKEY' + struct.pack('<I', keyframes)
+        for n, pos in enumerate(positions):
+            out += struct.pack('<H', pos) + np.ascontiguousarray((poses[n] if smooth else random_matrices(rng, bones))[:, :, :3]).tobytes()
+    else:
+        # Legacy motions store every frame, bone-major
+        out += (np.ascontiguousarray(poses.transpose(1, 0, 2, 3)) if smooth else random_matrices(rng, bones * frames)).tobytes()
+    
+    out += struct.pack('<I', morphs)
+    out += rng.uniform(0.0, 1.0, morphs * frames).astype('<f4').tobytes()
+    return chunk("MOTI", out)
+
+def write_c3(path, chunks):
+    with open(path, 'wb') as file:
+        file.write(C3_HEADER)
+        for data in chunks:
+            file.write(data)
+
+def make_c3(path, ChunkID="PHY4", KeyType="ZKEY", vertices=1000, bones=20, frames=30, keyframes=10, count=1, morphs=0, shared=False, seed=0):
+    # PHY chunks come first and MOTI chunks last, as in the shipped assets.
+    # shared=True repeats one motion for every PHY, like multi-part characters
+    rng = np.random.default_rng(seed)
+    phys = [phy_chunk(rng, ChunkID, vertices, bones=bones, name=f"v_part{n}", frames=frames) for n in range(count)]
+    if shared:
+        motions = [motion_chunk(rng, KeyType, bones, frames, keyframes, morphs)] * count
+    else:
+        motions = [motion_chunk(rng, KeyType, bones, frames, keyframes, morphs) for n in range(count)]
+    write_c3(path, phys + motions)
+    return path
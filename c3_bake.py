@@ -0,0 +1,513 @@
+import bpy
+import numpy as np
+from bpy_extras import anim_utils
+from . import c3_phy
+from . import c3_profile
+
+class C3Bake:
+    @staticmethod
+    def Bake_ShapeKeys(obj, lpPhy, fTolerance=0.0001, fEpsilon=0.0, szMode='FRAMES', lpProfiler=None, szPhy=None):
+        for _ in C3Bake.Bake_ShapeKeysIter(obj, lpPhy, fTolerance, fEpsilon, szMode, lpProfiler, szPhy):
+            pass
+
+    @staticmethod
+    def Bake_ShapeKeysIter(obj, lpPhy, fTolerance=0.0001, fEpsilon=0.0, szMode='FRAMES', lpProfiler=None, szPhy=None):
+        # Yields once per sampled frame so callers can spread the bake over several
+        # timer ticks, the value F-curves are written after the last yield
+        if not lpPhy.lpMotion or lpPhy.lpMotion.dwFrames == 0:
+            return
+        if lpProfiler is None:
+            lpProfiler = c3_profile.C3Profiler()
+
+        # Ensure Basis exists
+        if not obj.data.shape_keys:
+            obj.shape_key_add(name="Basis")
+
+        key_blocks = obj.data.shape_keys.key_blocks
+        basis = np.empty(len(key_blocks[0].data) * 3, dtype=np.float32)
+        key_blocks[0].data.foreach_get("co", basis)
+        basis = basis.reshape(-1, 3)
+
+        # Frame keys from an earlier bake are overwritten in place and only the
+        # surplus is removed at the end, shape_key_remove is slow on long key lists.
+        # Their value F-curves go first so renaming a key does not rewrite them
+        lpPool = {sk.name: sk for sk in key_blocks[1:] if sk.name.startswith("Frame_")}
+        C3Bake.Bake_ClearKeyCurves(obj.data.shape_keys, lpPool.values())
+
+        frames = C3Bake.Bake_SampleFrames(lpPhy.lpMotion, szMode)
+        lpUnique = []
+        lpFrameKey = []
+        table = {}
+
+        # The frame, alpha and draw state are put back afterwards, also when the bake is abandoned
+        fA, bDraw, nFrame = lpPhy.fA, lpPhy.bDraw, lpPhy.nFrame
+        try:
+            for frame in frames:
+                with lpProfiler.stage("bake.calculate", szPhy):
+                    c3_phy.C3Phy.Phy_SetFrame(lpPhy, frame)
+                    c3_phy.C3Phy.Phy_Calculate(lpPhy)
+                pos = lpPhy.outputPositions
+
+                # Frames that barely move away from Basis are left to Basis (-1)
+                if fEpsilon > 0 and (len(pos) == 0 or np.abs(pos - basis).max() < fEpsilon):
+                    lpFrameKey.append(-1)
+                    yield frame
+                    continue
+
+                with lpProfiler.stage("bake.dedupe", szPhy):
+                    nKey = C3Bake.Bake_FindKey(lpUnique, lpFrameKey, table, pos, fTolerance)
+                if nKey == -1:
+                    with lpProfiler.stage("bake.store", szPhy):
+                        sk = C3Bake.Bake_TakeKey(obj, lpPool, f"Frame_{frame}")
+                        sk.data.foreach_set("co", pos.ravel())
+                        sk.value = 0.0
+                    nKey = len(lpUnique)
+                    lpUnique.append((sk, pos.copy()))
+                    table.setdefault(C3Bake.Bake_Hash(pos, fTolerance), []).append(nKey)
+                lpFrameKey.append(nKey)
+                yield frame
+        finally:
+            lpPhy.fA, lpPhy.bDraw, lpPhy.nFrame = fA, bDraw, nFrame
+
+        with lpProfiler.stage("bake.fcurves", szPhy):
+            for sk in lpPool.values():
+                obj.shape_key_remove(sk)
+            C3Bake.Bake_KeyValues(obj, [sk for sk, pos in lpUnique], frames, lpFrameKey)
+
+        max_frame = lpPhy.lpMotion.dwFrames - 1
+        bpy.context.scene.frame_end = max_frame
+
+    @staticmethod
+    def Bake_Morphs(obj, lpPhy):
+        lpBaked = C3Bake.Bake_MorphKeys(obj, lpPhy)
+        # Targets of an earlier clip that this motion doesn't weight
+        if obj.data.shape_keys:
+            lpStale = [sk for sk in obj.data.shape_keys.key_blocks if sk.name.startswith("Morph_") and sk.name not in lpBaked]
+            C3Bake.Bake_ClearKeyCurves(obj.data.shape_keys, lpStale)
+            for sk in lpStale:
+                obj.shape_key_remove(sk)
+        return len(lpBaked)
+
+    @staticmethod
+    def Bake_MorphKeys(obj, lpPhy):
+        # The engine blends sum(w[m] * pos[m]) with weights that add up to 1, which is
+        # Basis plus w[m] * (pos[m] - pos[0]) for m >= 1: one relative key per target,
+        # skinned once with the frame 0 bones, and the weights as value F-curves
+        lpMotion = lpPhy.lpMotion
+        if not lpMotion or lpMotion.dwFrames == 0 or not lpMotion.lpMorph or lpPhy.lpMorphPos is None:
+            return []
+        dwCount = int(lpMotion.dwMorphCount)
+        nTargets = min(dwCount - 1, len(lpPhy.lpMorphPos))
+        if nTargets <= 0:
+            return []
+
+        if not obj.data.shape_keys:
+            obj.shape_key_add(name="Basis")
+        key_blocks = obj.data.shape_keys.key_blocks
+        basis = np.empty(len(key_blocks[0].data) * 3, dtype=np.float32)
+        key_blocks[0].data.foreach_get("co", basis)
+        basis = basis.reshape(-1, 3)
+
+        nFrame = lpPhy.nFrame
+        c3_phy.C3Phy.Phy_SetFrame(lpPhy, 0)
+        bone = c3_phy.C3Phy.Phy_GetBones(lpPhy)
+        lpPhy.nFrame = nFrame
+        rest = c3_phy.C3Phy.Phy_Skin(lpPhy, lpPhy.lpPos, bone)
+
+        dwFrames = int(lpMotion.dwFrames)
+        weights = np.array(lpMotion.lpMorph, dtype=np.float32).reshape(dwFrames, dwCount)
+        frames = list(range(dwFrames + 1))
+        rows = [frame % dwFrames for frame in frames]
+        fcurves = C3Bake.Bake_GetCurves(obj.data.shape_keys, f"{obj.name}_ShapeKeys")
+
+        lpBaked = []
+        for m in range(1, nTargets + 1):
+            if not weights[:, m].any():
+                continue
+            target = c3_phy.C3Phy.Phy_Skin(lpPhy, lpPhy.lpMorphPos[m - 1], bone)
+            name = f"Morph_{m}"
+            sk = key_blocks.get(name)
+            if sk is None:
+                sk = obj.shape_key_add(name=name, from_mix=False)
+            sk.data.foreach_set("co", (basis + target - rest).ravel())
+            sk.slider_min = min(0.0, float(weights[:, m].min()))
+            sk.slider_max = max(1.0, float(weights[:, m].max()))
+
+            co = C3Bake.Bake_Compact(frames, weights[rows, m], False)
+            C3Bake.Bake_Curve(fcurves, sk.path_from_id("value"), 0, co, 'LINEAR')
+            lpBaked.append(name)
+        return lpBaked
+
+    @staticmethod
+    def Bake_TakeKey(obj, lpPool, name):
+        # A key that already has the name is the best match, any other leftover is
+        # renamed, and a new key is only added once the pool is used up
+        sk = lpPool.pop(name, None)
+        if sk is None and lpPool:
+            sk = lpPool.pop(next(iter(lpPool)))
+            sk.name = name
+        if sk is None:
+            sk = obj.shape_key_add(name=name, from_mix=False)
+        return sk
+
+    @staticmethod
+    def Bake_ClearKeyCurves(key, lpKeys):
+        # Only the curves of the given (baked) keys, keys the user added keep their animation
+        fcurves = C3Bake.Bake_FCurves(key, False)
+        if fcurves is None:
+            return
+        paths = {sk.path_from_id("value") for sk in lpKeys}
+        for fc in [fc for fc in fcurves if fc.data_path in paths]:
+            fcurves.remove(fc)
+
+    @staticmethod
+    def Bake_SampleFrames(lpMotion, szMode):
+        dwFrames = int(lpMotion.dwFrames)
+        if szMode != 'KEYFRAMES' or not lpMotion.dwKeyFrames:
+            return list(range(dwFrames + 1))
+
+        # Motion_GetMatrix interpolates linearly between keys and clamps outside
+        # them, so keys at the keyframes plus both ends reproduce every frame
+        frames = {0, dwFrames - 1}
+        for keyframe in lpMotion.lpKeyFrame:
+            if 0 <= keyframe.pos < dwFrames:
+                frames.add(int(keyframe.pos))
+        return sorted(frames)
+
+    @staticmethod
+    def Bake_Hash(pos, fTolerance):
+        if fTolerance > 0:
+            return np.floor(pos / fTolerance).astype(np.int64).tobytes()
+        return pos.tobytes()
+
+    @staticmethod
+    def Bake_FindKey(lpUnique, lpFrameKey, table, pos, fTolerance):
+        # Static stretches usually repeat the previous frame, which may fall in a
+        # neighbouring hash bucket, so it is always tried along with the bucket
+        candidates = list(table.get(C3Bake.Bake_Hash(pos, fTolerance), []))
+        if lpFrameKey and lpFrameKey[-1] >= 0:
+            candidates.append(lpFrameKey[-1])
+
+        for nKey in candidates:
+            other = lpUnique[nKey][1]
+            if len(pos) == 0 or np.abs(pos - other).max() <= fTolerance:
+                return nKey
+        return -1
+
+    @staticmethod
+    def Bake_KeyValues(obj, lpKeys, frames, lpFrameKey):
+        # Each key is 1.0 on the sample frames that use it and 0.0 on the
+        # neighbouring samples, with linear blends in between
+        fcurves = C3Bake.Bake_GetCurves(obj.data.shape_keys, f"{obj.name}_ShapeKeys")
+
+        lpFrameKey = np.array(lpFrameKey, dtype=np.int64)
+        count = len(frames)
+        padded = [frames[0] - 1] + list(frames) + [frames[-1] + 1]
+
+        for nKey, sk in enumerate(lpKeys):
+            used = np.flatnonzero(lpFrameKey == nKey)
+            points = np.unique(np.concatenate((used - 1, used, used + 1)))
+            points = points[(points >= -1) & (points <= count)]
+
+            co = np.empty((len(points), 2), dtype=np.float32)
+            co[:, 0] = [padded[p + 1] for p in points]
+            co[:, 1] = np.isin(points, used)
+
+            C3Bake.Bake_Curve(fcurves, sk.path_from_id("value"), 0, co, 'LINEAR')
+
+    @staticmethod
+    def Bake_Curve(fcurves, data_path, nIndex, co, szInterpolation):
+        # Replaces the F-curve at data_path[nIndex] with the (frame, value) rows of co in one go
+        fc = fcurves.find(data_path, index=nIndex)
+        if fc is not None:
+            fcurves.remove(fc)
+        fc = fcurves.new(data_path, index=nIndex)
+        interpolation = bpy.types.Keyframe.bl_rna.properties["interpolation"].enum_items[szInterpolation].value
+        fc.keyframe_points.add(len(co))
+        fc.keyframe_points.foreach_set("co", np.ascontiguousarray(co, dtype=np.float32).ravel())
+        fc.keyframe_points.foreach_set("interpolation", [interpolation] * len(co))
+        fc.update()
+        return fc
+
+    @staticmethod
+    def Bake_Compact(frames, values, bConstant):
+        # Rows of (frame, value) that reproduce the track: changes only for stepped
+        # tracks, and only the corners of the polyline for linear ones
+        frames = np.asarray(frames, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        keep = np.ones(len(values), dtype=bool)
+        if len(values) > 2:
+            if bConstant:
+                keep[1:] = values[1:] != values[:-1]
+            else:
+                slope = np.diff(values) / np.diff(frames)
+                keep[1:-1] = np.abs(np.diff(slope)) > 1e-6
+        return np.column_stack((frames[keep], values[keep]))
+
+    @staticmethod
+    def Bake_GetAction(id_data, szName):
+        if id_data.animation_data is None:
+            id_data.animation_data_create()
+        action = id_data.animation_data.action
+        if action is None:
+            action = bpy.data.actions.new(name=szName)
+            id_data.animation_data.action = action
+        return action
+
+    @staticmethod
+    def Bake_OwnAction(id_data):
+        # ID.copy() keeps the action of the original, a copy that is baked again gets its own
+        anim = id_data.animation_data
+        if anim is None or anim.action is None or anim.action.users <= 1:
+            return
+        slot = getattr(anim, "action_slot", None)
+        identifier = slot.identifier if slot is not None else None
+        anim.action = anim.action.copy()
+        if identifier is not None:
+            anim.action_slot = next((slot for slot in anim.action.slots if slot.identifier == identifier), None)
+
+    @staticmethod
+    def Bake_FCurves(id_data, bCreate=True):
+        # F-curves the ID's action animates it with. Blender 4.4+ keeps them in a channelbag
+        # per action slot (action.fcurves is gone in 5.0), older versions only have action.fcurves
+        anim = id_data.animation_data
+        action = anim.action if anim else None
+        if action is None:
+            return None
+        if not hasattr(anim_utils, "action_ensure_channelbag_for_slot"):
+            return action.fcurves
+        slot = anim.action_slot
+        if slot is None:
+            if not bCreate:
+                return None
+            slot = action.slots.new(id_data.id_type, id_data.name)
+            anim.action_slot = slot
+        if bCreate:
+            return anim_utils.action_ensure_channelbag_for_slot(action, slot).fcurves
+        channelbag = anim_utils.action_get_channelbag_for_slot(action, slot)
+        return channelbag.fcurves if channelbag is not None else None
+
+    @staticmethod
+    def Bake_GetCurves(id_data, szName):
+        C3Bake.Bake_GetAction(id_data, szName)
+        return C3Bake.Bake_FCurves(id_data)
+
+    @staticmethod
+    def Bake_Tracks(obj, lpPhy):
+        # Alpha, draw and texture change keys become material alpha, hide_viewport /
+        # hide_render and a UV mapping offset instead of per-frame mesh data.
+        # Every frame is sampled: the draw and texture keys fire on exact frames only
+        lpKey = lpPhy.Key
+        if not lpPhy.lpMotion or lpPhy.lpMotion.dwFrames == 0:
+            return False
+        if not (lpKey.dwAlphas or lpKey.dwDraws or lpKey.dwChangeTexs):
+            return False
+
+        fA, bDraw, nFrame = lpPhy.fA, lpPhy.bDraw, lpPhy.nFrame
+        frames = list(range(int(lpPhy.lpMotion.dwFrames) + 1))
+        alphas = []
+        hidden = []
+        offsets = []
+        for frame in frames:
+            c3_phy.C3Phy.Phy_SetFrame(lpPhy, frame)
+            offsets.append(c3_phy.C3Phy.Phy_ProcessKeys(lpPhy))
+            alphas.append(lpPhy.fA)
+            hidden.append(0.0 if lpPhy.bDraw else 1.0)
+        lpPhy.fA, lpPhy.bDraw, lpPhy.nFrame = fA, bDraw, nFrame
+
+        if lpKey.dwDraws:
+            fcurves = C3Bake.Bake_GetCurves(obj, f"{obj.name}_Tracks")
+            co = C3Bake.Bake_Compact(frames, hidden, True)
+            if "c3_hidden" in obj:
+                # LOD sources: drivers combine the property with the LOD switch
+                C3Bake.Bake_Curve(fcurves, '["c3_hidden"]', 0, co, 'CONSTANT')
+            else:
+                C3Bake.Bake_Curve(fcurves, "hide_viewport", 0, co, 'CONSTANT')
+                C3Bake.Bake_Curve(fcurves, "hide_render", 0, co, 'CONSTANT')
+
+        if not (lpKey.dwAlphas or lpKey.dwChangeTexs):
+            return True
+
+        mat = C3Bake.Bake_TrackMaterial(obj, bool(lpKey.dwChangeTexs))
+        if mat is None:
+            return True
+        nodes = mat.node_tree.nodes
+        fcurves = C3Bake.Bake_GetCurves(mat.node_tree, f"{mat.name}_Tracks")
+
+        if lpKey.dwAlphas:
+            socket = nodes["Principled BSDF"].inputs["Alpha"]
+            co = C3Bake.Bake_Compact(frames, alphas, False)
+            C3Bake.Bake_Curve(fcurves, socket.path_from_id("default_value"), 0, co, 'LINEAR')
+
+        mapping = nodes.get("C3_Mapping")
+        if lpKey.dwChangeTexs and mapping is not None:
+            # Imported UVs are flipped (1 - v), so the v offset runs downwards
+            socket = mapping.inputs["Location"]
+            offsets = np.array(offsets, dtype=np.float64)
+            for nIndex, sign in ((0, 1.0), (1, -1.0)):
+                co = C3Bake.Bake_Compact(frames, offsets[:, nIndex] * sign, True)
+                C3Bake.Bake_Curve(fcurves, socket.path_from_id("default_value"), nIndex, co, 'CONSTANT')
+        return True
+
+    @staticmethod
+    def Bake_TrackMaterial(obj, bMapping):
+        # Animated materials can't stay shared with other PHYs, so the object gets its own copy
+        mat = obj.data.materials[0] if obj.data.materials else None
+        if mat is None or not mat.use_nodes:
+            return None
+        if mat.users > 1:
+            mat = mat.copy()
+            C3Bake.Bake_OwnAction(mat.node_tree)
+            obj.data.materials[0] = mat
+
+        if hasattr(mat, "blend_method"):
+            mat.blend_method = 'BLEND'
+
+        nodes = mat.node_tree.nodes
+        tex_image = nodes.get("C3_Texture")
+        if bMapping and tex_image is not None and nodes.get("C3_Mapping") is None:
+            coords = nodes.new('ShaderNodeTexCoord')
+            mapping = nodes.new('ShaderNodeMapping')
+            mapping.name = "C3_Mapping"
+            mat.node_tree.links.new(mapping.inputs['Vector'], coords.outputs['UV'])
+            mat.node_tree.links.new(tex_image.inputs['Vector'], mapping.outputs['Vector'])
+        return mat
+
+    @staticmethod
+    def Bake_GeometryNodes(obj, lpPhy):
+        # Skinning without shape keys or per-frame Python: the mesh keeps the rest
+        # positions, "c3_bone" holds each vertex's bone and every frame's bone matrices
+        # go into a float image that a generated node group samples at the scene frame.
+        # Raises ValueError with the reason when the object cannot be skinned this way
+        if bpy.app.version < (3, 2, 0):
+            raise ValueError("Geometry Nodes skinning needs Blender 3.2 or later")
+        if not lpPhy.lpMotion or lpPhy.lpMotion.dwFrames == 0:
+            raise ValueError("the PHY has no motion frames")
+
+        mesh = obj.data
+        if len(mesh.vertices) != len(lpPhy.lpPos):
+            raise ValueError(f"the mesh has {len(mesh.vertices)} vertices, the PHY {len(lpPhy.lpPos)}")
+        mesh.vertices.foreach_set("co", lpPhy.lpPos.ravel())
+        mesh.update()
+
+        image = C3Bake.Bake_PaletteImage(f"{obj.name}_C3Palette", lpPhy)
+        dwBones = image.size[0] // 4 - 1
+
+        # Unbound vertices (-1) point at the extra all-zero matrix after the last bone
+        attribute = mesh.attributes.get("c3_bone")
+        if attribute is not None:
+            mesh.attributes.remove(attribute)
+        attribute = mesh.attributes.new("c3_bone", 'INT', 'POINT')
+        attribute.data.foreach_set("value", np.where(lpPhy.lpSkinBone < 0, dwBones, lpPhy.lpSkinBone).astype(np.int32))
+
+        group = C3Bake.Bake_SkinGroup(f"{obj.name}_C3Skin", image, int(lpPhy.lpMotion.dwFrames))
+        mesh["c3_skin_group"] = group.name
+        modifier = obj.modifiers.get("C3 Skinning")
+        if modifier is None:
+            modifier = obj.modifiers.new("C3 Skinning", 'NODES')
+        modifier.node_group = group
+
+    @staticmethod
+    def Bake_PaletteImage(name, lpPhy):
+        # One row per frame, one RGBA pixel per matrix row: bone b occupies pixels 4b..4b+3
+        lpMotion = lpPhy.lpMotion
+        dwFrames = int(lpMotion.dwFrames)
+        nFrame = lpPhy.nFrame
+        lpRows = []
+        for frame in range(dwFrames):
+            c3_phy.C3Phy.Phy_SetFrame(lpPhy, frame)
+            lpRows.append(c3_phy.C3Phy.Phy_GetBones(lpPhy))
+        lpPhy.nFrame = nFrame
+
+        palette = np.zeros((dwFrames, len(lpRows[0]) + 1, 4, 4), dtype=np.float32)
+        palette[:, :-1] = lpRows
+        width = palette.shape[1] * 4
+
+        image = bpy.data.images.get(name)
+        if image is not None and (image.size[0] != width or image.size[1] != dwFrames):
+            bpy.data.images.remove(image)
+            image = None
+        if image is None:
+            image = bpy.data.images.new(name, width, dwFrames, alpha=True, float_buffer=True)
+        image.colorspace_settings.name = 'Non-Color'
+        image.pixels.foreach_set(palette.ravel())
+        # Generated pixels are lost on save unless packed, EXR keeps them float
+        image.file_format = 'OPEN_EXR'
+        image.pack()
+        return image
+
+    @staticmethod
+    def Bake_SkinGroup(name, image, dwFrames):
+        # position = x * R0 + y * R1 + z * R2 + R3 with R the rows of the frame's bone
+        # matrix (row vectors, translation in the last row), fetched with Closest sampling
+        group = bpy.data.node_groups.get(name)
+        if group is not None:
+            bpy.data.node_groups.remove(group)
+        group = bpy.data.node_groups.new(name, 'GeometryNodeTree')
+        if hasattr(group, "interface"):
+            group.interface.new_socket(name="Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+            group.interface.new_socket(name="Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+        else:
+            group.inputs.new('NodeSocketGeometry', "Geometry")
+            group.outputs.new('NodeSocketGeometry', "Geometry")
+
+        nodes = group.nodes
+        links = group.links
+        width = image.size[0]
+
+        def add_math(operation, *inputs):
+            node = nodes.new('ShaderNodeMath')
+            node.operation = operation
+            for n, value in enumerate(inputs):
+                if isinstance(value, bpy.types.NodeSocket):
+                    links.new(node.inputs[n], value)
+                else:
+                    node.inputs[n].default_value = value
+            return node.outputs[0]
+
+        group_in = nodes.new('NodeGroupInput')
+        group_out = nodes.new('NodeGroupOutput')
+        time = nodes.new('GeometryNodeInputSceneTime')
+        bone = nodes.new('GeometryNodeInputNamedAttribute')
+        bone.data_type = 'INT'
+        bone.inputs["Name"].default_value = "c3_bone"
+        bone_index = next(socket for socket in bone.outputs if socket.name == "Attribute" and socket.enabled)
+
+        # Same frame mapping as the shape key bake: frame % dwFrames, centred on the texel
+        frame = add_math('FLOOR', add_math('WRAP', time.outputs["Frame"], float(dwFrames), 0.0))
+        v = add_math('DIVIDE', add_math('ADD', frame, 0.5), float(dwFrames))
+
+        lpRows = []
+        for r in range(4):
+            u = add_math('DIVIDE', add_math('MULTIPLY_ADD', bone_index, 4.0, r + 0.5), float(width))
+            uv = nodes.new('ShaderNodeCombineXYZ')
+            links.new(uv.inputs[0], u)
+            links.new(uv.inputs[1], v)
+            texture = nodes.new('GeometryNodeImageTexture')
+            texture.interpolation = 'Closest'
+            texture.extension = 'EXTEND'
+            texture.inputs["Image"].default_value = image
+            links.new(texture.inputs["Vector"], uv.outputs[0])
+            lpRows.append(texture.outputs["Color"])
+
+        position = nodes.new('GeometryNodeInputPosition')
+        separate = nodes.new('ShaderNodeSeparateXYZ')
+        links.new(separate.inputs[0], position.outputs[0])
+
+        result = lpRows[3]
+        for r in range(3):
+            scale = nodes.new('ShaderNodeVectorMath')
+            scale.operation = 'SCALE'
+            links.new(scale.inputs[0], lpRows[r])
+            links.new(scale.inputs["Scale"], separate.outputs[r])
+            add = nodes.new('ShaderNodeVectorMath')
+            add.operation = 'ADD'
+            links.new(add.inputs[0], result)
+            links.new(add.inputs[1], scale.outputs[0])
+            result = add.outputs[0]
+
+        set_position = nodes.new('GeometryNodeSetPosition')
+        links.new(set_position.inputs["Geometry"], group_in.outputs[0])
+        links.new(set_position.inputs["Position"], result)
+        links.new(group_out.inputs[0], set_position.outputs["Geometry"])
+        return group
@@ -1,5 +1,14 @@
+import math
+import os
 import struct
 
+# Morph targets per vertex by PHY chunk ID and bones per vertex
+PHY_MORPHS = {b'PHY ': 4, b'PHY3': 1, b'PHY4': 1}
+PHY_BONES = 2
+# Keyframe position type and per-bone key shape of the keyed MOTI formats:
+# a 4x4 matrix (KKEY), a quaternion and a translation (ZKEY), a 4x3 matrix (XKEY)
+MOTION_KEYS = {b'KKEY': ('I', (4, 4)), b'ZKEY': ('H', (7,)), b'XKEY': ('H', (4, 3))}
+
 class ChunkHeader:
     def __init__(self):
         self.byChunkID = b''
@@ -18,3 +27,79 @@ class ChunkHeader:
         chunk.byChunkID = file.read(4)
         chunk.dwChunkSize = struct.unpack('<I', file.read(4))[0]
         return chunk
+    
+    @staticmethod
+    def make_report(byChunkID, offset, size, status, message=""):
+        return {
+            "id": byChunkID.decode(errors='replace') if byChunkID else None,
+            "offset": offset,
+            "size": size,
+            "status": status,
+            "message": message,
+        }
+    
+    @staticmethod
+    def read_chunks(file, lpIDs, lpReport):
+        # Yields (chunk, offset, data) for the chunk IDs in lpIDs (every chunk for None), data
+        # holding exactly dwChunkSize bytes so a parser can never run into the next chunk.
+        # Other chunks are skipped, a truncated header or chunk ends the walk with an entry in lpReport
+        dwFileSize = os.fstat(file.fileno()).st_size
+        while file.tell() < dwFileSize:
+            offset = file.tell()
+            if offset + 8 > dwFileSize:
+                lpReport.append(ChunkHeader.make_report(None, offset, 0, "error", f"truncated chunk header ({dwFileSize - offset} bytes)"))
+                return
+            chunk = ChunkHeader.read(file)
+            if lpIDs is not None and chunk.byChunkID not in lpIDs:
+                file.seek(chunk.dwChunkSize, 1)
+                continue
+            data = file.read(chunk.dwChunkSize)
+            if len(data) < chunk.dwChunkSize:
+                lpReport.append(ChunkHeader.make_report(chunk.byChunkID, offset, chunk.dwChunkSize, "error",
+                                                        f"truncated, {len(data)} of {chunk.dwChunkSize} bytes in the file"))
+                return
+            yield chunk, offset, data
+
+
+# The PHY vertex and MOTI keyframe records as (field, struct type, shape) lists. Phy_Save and
+# Motion_Save build their numpy dtypes from them and c3_inspect its record sizes, so this
+# module stays free of numpy for c3_inspect
+class RecordLayout:
+    NUMPY_TYPES = {'f': '<f4', 'I': '<u4', 'H': '<u2'}
+    
+    @staticmethod
+    def phy_vertex(byChunkID):
+        fields = [("pos", 'f', (PHY_MORPHS[byChunkID], 3)), ("uv", 'f', (2,)), ("color", 'I', ()),
+                  ("index", 'I', (PHY_BONES,)), ("weight", 'f', (PHY_BONES,))]
+        if byChunkID == b'PHY3':
+            fields.append(("normal", 'f', (3,)))
+        return fields
+    
+    @staticmethod
+    def motion_key(byKeyType, dwBoneCount):
+        pos, shape = MOTION_KEYS[byKeyType]
+        return [("pos", pos, ()), ("key", 'f', (dwBoneCount,) + shape)]
+    
+    @staticmethod
+    def size(fields):
+        return sum(struct.calcsize('<' + code) * math.prod(shape) for name, code, shape in fields)
+    
+    @staticmethod
+    def read(file, fields, dwCount):
+        # Yields the next dwCount records of file as field -> tuple of its values, flattened
+        data = file.read(dwCount * RecordLayout.size(fields))
+        if len(data) != dwCount * RecordLayout.size(fields):
+            raise ValueError(f"{dwCount} records of {RecordLayout.size(fields)} bytes run past the end of the data")
+        spans = []
+        start = 0
+        for name, code, shape in fields:
+            spans.append((name, start, start + math.prod(shape)))
+            start += math.prod(shape)
+        fmt = '<' + ''.join(f"{math.prod(shape)}{code}" for name, code, shape in fields)
+        for values in struct.iter_unpack(fmt, data):
+            yield {name: values[a:b] for name, a, b in spans}
+    
+    @staticmethod
+    def dtype(fields):
+        # For numpy.dtype
+        return [(name, RecordLayout.NUMPY_TYPES[code], shape) for name, code, shape in fields]
@@ -0,0 +1,212 @@
+import io
+import os
+import struct
+import bpy
+import numpy as np
+from . import c3_main
+from . import c3_common
+from . import c3_phy
+from . import c3_motion
+from . import c3_live
+
+PHY_CHUNKS = (b'PHY ', b'PHY3', b'PHY4')
+
+# Exports write the PHY chunks of edited objects back into a copy of the file they were
+# imported from. Motions are copied as is unless they are retimed or recompressed, every
+# other chunk (other PHYs, unknown types) is always copied as is
+class C3Export:
+    @staticmethod
+    def Export_ReadChunks(lpName):
+        # The version header and every chunk as [byChunkID, data], in file order
+        lpReport = []
+        with open(lpName, 'rb') as file:
+            byVersion = file.read(16)
+            if byVersion.decode(errors='replace').rstrip('\0') != c3_main.C3_VERSION:
+                raise ValueError(f"{os.path.basename(lpName)} is not a C3 file")
+            lpChunks = [[chunk.byChunkID, data] for chunk, offset, data in c3_common.ChunkHeader.read_chunks(file, None, lpReport)]
+        if lpReport:
+            raise ValueError(f"{os.path.basename(lpName)} is damaged: {lpReport[0]['message']}")
+        return byVersion, lpChunks
+
+    @staticmethod
+    def Export_WriteFile(lpName, byVersion, lpChunks):
+        # Written next to the target and moved over it, so exporting onto the source file is safe
+        temp = lpName + ".tmp"
+        with open(temp, 'wb') as file:
+            file.write(byVersion)
+            for byChunkID, data in lpChunks:
+                file.write(byChunkID + struct.pack('<I', len(data)))
+                file.write(data)
+        os.replace(temp, lpName)
+
+    @staticmethod
+    def Export_Phy(obj, lpFiles, frame):
+        # The PHY the object was imported from with the mesh's positions, faces and UVs.
+        # Vertices are split again per (mesh vertex, UV) like C3 stores them and keep the
+        # bones, colour and normal of the vertex they came from. Values within rounding of
+        # the source are written as read, so an unedited object saves unchanged
+        lpPhy = c3_live.C3Live.Live_Load(obj, lpFiles)
+        if lpPhy is None:
+            raise ValueError(f"{obj.name}: its source PHY could not be loaded")
+        mesh = obj.data
+        totalVerts = len(mesh.vertices)
+        if totalVerts != len(lpPhy.lpPos):
+            raise ValueError(f"{obj.name}: the mesh has {totalVerts} vertices, its PHY {len(lpPhy.lpPos)}; vertices cannot be added or removed")
+
+        co = np.empty(totalVerts * 3, dtype=np.float32)
+        if mesh.shape_keys is not None:
+            mesh.shape_keys.reference_key.data.foreach_get("co", co)
+        else:
+            mesh.vertices.foreach_get("co", co)
+        co = co.reshape(-1, 3)
+
+        # Back to the bind pose: Geometry Nodes skinning keeps it in the mesh, shape keys
+        # are baked on a basis skinned at frame 0 and live objects hold the current frame
+        if "c3_skin_group" not in mesh:
+            c3_phy.C3Phy.Phy_SetFrame(lpPhy, frame if obj.get("c3_live") else 0)
+            c3_phy.C3Phy.Phy_ProcessKeys(lpPhy)
+            if lpPhy.bDraw:
+                co = c3_phy.C3Phy.Phy_Unskin(lpPhy, co, c3_phy.C3Phy.Phy_GetBones(lpPhy))
+        kept = np.isclose(co, lpPhy.lpPos, rtol=1e-5, atol=1e-5).all(axis=1)
+        co[kept] = lpPhy.lpPos[kept]
+        bMoved = not kept.all()
+
+        mesh.calc_loop_triangles()
+        nCorners = len(mesh.loop_triangles) * 3
+        corner_verts = np.empty(nCorners, dtype=np.int32)
+        corner_loops = np.empty(nCorners, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", corner_verts)
+        mesh.loop_triangles.foreach_get("loops", corner_loops)
+
+        uv_layer = mesh.uv_layers.get("UVMap") or mesh.uv_layers.active
+        if uv_layer is not None:
+            loop_uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+            uv_layer.data.foreach_get("uv", loop_uvs)
+            uvs = loop_uvs.reshape(-1, 2)[corner_loops]
+            uvs[:, 1] = 1 - uvs[:, 1]
+            source_uvs = lpPhy.lpTexCoord[corner_verts]
+            same = np.isclose(uvs, source_uvs, rtol=0.0, atol=1e-6).all(axis=1)
+            uvs[same] = source_uvs[same]
+        else:
+            uvs = lpPhy.lpTexCoord[corner_verts]
+
+        # One vertex per distinct (vertex, UV bits), ordered by mesh vertex. Vertices no
+        # face uses are kept with their source UV so nothing the mesh holds is lost
+        used = np.zeros(totalVerts, dtype=bool)
+        used[corner_verts] = True
+        unused = np.flatnonzero(~used)
+        keys = np.concatenate((
+            np.column_stack((corner_verts, uvs.view(np.int32))),
+            np.column_stack((unused, lpPhy.lpTexCoord[unused].view(np.int32))),
+        )).astype(np.int64)
+        # np.unique(axis=0) without its slow row sort
+        order = np.lexsort((keys[:, 2], keys[:, 1], keys[:, 0]))
+        keys = keys[order]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = (keys[1:] != keys[:-1]).any(axis=1)
+        inverse = np.empty(len(keys), dtype=np.int64)
+        inverse[order] = np.cumsum(first) - 1
+        keys = keys[first]
+        source = keys[:, 0]
+
+        bResized = len(source) != lpPhy.dwNVecCount + lpPhy.dwAVecCount
+        lpPhy.lpVB = None
+        lpPhy.lpPos = np.ascontiguousarray(co[source])
+        lpPhy.lpMorphPos = np.ascontiguousarray(lpPhy.lpMorphPos[:, source])
+        lpPhy.lpTexCoord = np.ascontiguousarray(keys[:, 1:].astype(np.int32).view(np.float32))
+        lpPhy.lpLoopTexCoord = None
+        lpPhy.lpSkinBone = lpPhy.lpSkinBone[source]
+        lpPhy.lpBoneIndex = lpPhy.lpBoneIndex[source]
+        lpPhy.lpBoneWeight = lpPhy.lpBoneWeight[source]
+        lpPhy.lpColor = lpPhy.lpColor[source]
+        if lpPhy.lpNormal is not None:
+            lpPhy.lpNormal = lpPhy.lpNormal[source]
+        lpPhy.lpIB = inverse.ravel()[:nCorners].tolist()
+        if bResized:
+            lpPhy.dwNVecCount = len(source)
+            lpPhy.dwAVecCount = 0
+        if (lpPhy.dwNTriCount + lpPhy.dwATriCount) * 3 != nCorners:
+            lpPhy.dwNTriCount = nCorners // 3
+            lpPhy.dwATriCount = 0
+        if bMoved or bResized:
+            lpPhy.bboxMin = lpPhy.lpPos.min(axis=0).tolist() if len(source) else (0.0, 0.0, 0.0)
+            lpPhy.bboxMax = lpPhy.lpPos.max(axis=0).tolist() if len(source) else (0.0, 0.0, 0.0)
+        return lpPhy
+
+    @staticmethod
+    def Export_Motions(lpChunks, fTolerance=None, fTimeScale=1.0):
+        # Every MOTI chunk retimed by fTimeScale (Motion_Retime) and, with fTolerance, put
+        # through Motion_Optimize. The ZKEY version replaces the chunk only when it is smaller
+        # and within the tolerance (scale or shear it cannot hold is kept as is). A chunk
+        # that fails keeps its source bytes and its report carries the error
+        lpReports = []
+        for chunk in lpChunks:
+            if chunk[0] != b'MOTI':
+                continue
+            report = {"bytes_before": len(chunk[1]), "bytes_after": len(chunk[1]), "max_error": 0.0,
+                      "retimed": False, "replaced": False, "error": ""}
+            lpReports.append(report)
+            try:
+                result, lpMotion = c3_motion.C3Motion.Motion_Load(io.BytesIO(chunk[1]))
+                data = chunk[1]
+                if fTimeScale != 1.0:
+                    lpMotion = c3_motion.C3Motion.Motion_Retime(lpMotion, fTimeScale)
+                    view = io.BytesIO()
+                    c3_motion.C3Motion.Motion_Save(view, lpMotion)
+                    data = view.getvalue()
+                    report["retimed"] = True
+            except Exception as e:
+                report["error"] = str(e) or type(e).__name__
+                continue
+            
+            optimized = None
+            if fTolerance is not None:
+                try:
+                    lpNew, optimized = c3_motion.C3Motion.Motion_Optimize(lpMotion, fTolerance)
+                except ValueError as e:
+                    # Too long for ZKEY's 16-bit positions: kept as read (or as retimed)
+                    report["error"] = str(e)
+            if optimized is not None:
+                if optimized["bytes_after"] < len(data) and optimized["max_error"] <= fTolerance:
+                    view = io.BytesIO()
+                    c3_motion.C3Motion.Motion_Save(view, lpNew)
+                    data = view.getvalue()
+                    report["replaced"] = True
+                    report["max_error"] = optimized["max_error"]
+                report["keyframes_before"] = optimized["keyframes_before"]
+                report["keyframes_after"] = optimized["keyframes_after"]
+            chunk[1] = data
+            report["bytes_after"] = len(data)
+        return lpReports
+
+    @staticmethod
+    def Export_Objects(lpObjects, lpName, frame, fMotionTolerance=None, fTimeScale=1.0):
+        # Objects must come from one file, each replaces the PHY chunk at its c3_phy_index.
+        # With fMotionTolerance or fTimeScale the motions are recompressed or retimed as
+        # well. Returns the number of PHYs written and the Export_Motions reports
+        sources = {bpy.path.abspath(obj["c3_phy_file"]) for obj in lpObjects}
+        if len(sources) != 1:
+            raise ValueError("the objects come from different C3 files, export them separately")
+        byVersion, lpChunks = C3Export.Export_ReadChunks(sources.pop())
+        lpPhyChunks = [chunk for chunk in lpChunks if chunk[0] in PHY_CHUNKS]
+
+        lpFiles = {}
+        lpDone = {}
+        for obj in lpObjects:
+            index = obj.get("c3_phy_index", 0)
+            if index >= len(lpPhyChunks):
+                raise ValueError(f"{obj.name}: the file has no PHY {index}")
+            if index in lpDone:
+                raise ValueError(f"{obj.name} and {lpDone[index]} are both PHY {index}")
+            lpDone[index] = obj.name
+
+            lpPhy = C3Export.Export_Phy(obj, lpFiles, frame)
+            view = io.BytesIO()
+            c3_phy.C3Phy.Phy_Save(view, lpPhy, lpPhyChunks[index][0].decode())
+            lpPhyChunks[index][1] = view.getvalue()
+
+        lpReports = []
+        if fMotionTolerance is not None or fTimeScale != 1.0:
+            lpReports = C3Export.Export_Motions(lpChunks, fMotionTolerance, fTimeScale)
+        C3Export.Export_WriteFile(lpName, byVersion, lpChunks)
+        return len(lpDone), lpReports
@@ -0,0 +1,290 @@
+# Inspect and validate .c3 files without Blender:
+#   python c3_inspect.py <files or folders> [--files-from list.txt] [--format json|csv] [--out report.json] [--jobs N] [--decode]
+# The scan reads chunk headers and counts only, --decode also runs the full parsers
+# (needs numpy and mathutils) and checks they agree with the scan
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import struct
+import sys
+
+try:
+    from . import c3_common
+    from . import c3_key
+    from . import c3_main
+except ImportError:
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import c3_common
+    import c3_key
+    import c3_main
+
+PHY_CHUNKS = tuple(c3_common.PHY_MORPHS)
+FRAME_SIZE = struct.calcsize(c3_key.FRAME_FORMAT)
+
+class C3Inspect:
+    @staticmethod
+    def Inspect_Read(file, fmt, end):
+        size = struct.calcsize(fmt)
+        if file.tell() + size > end:
+            raise ValueError(f"read past chunk end at {file.tell()}")
+        return struct.unpack(fmt, file.read(size))
+
+    @staticmethod
+    def Inspect_Skip(file, size, end):
+        if size < 0 or file.tell() + size > end:
+            raise ValueError(f"skip of {size} bytes past chunk end at {file.tell()}")
+        file.seek(size, 1)
+
+    @staticmethod
+    def Inspect_String(file, end):
+        length = C3Inspect.Inspect_Read(file, '<I', end)[0]
+        if file.tell() + length > end:
+            raise ValueError(f"string of {length} bytes past chunk end at {file.tell()}")
+        return file.read(length).decode('gbk', errors='replace').rstrip('\0')
+
+    @staticmethod
+    def Inspect_Phy(file, byChunkID, end):
+        # Same layout Phy_Load reads (c3_common.RecordLayout), with the vertex, index and key arrays skipped
+        info = {"type": byChunkID.decode().strip()}
+        info["name"] = C3Inspect.Inspect_String(file, end)
+        info["blend"], nvec, avec = C3Inspect.Inspect_Read(file, '<III', end)
+        info["vertices"] = nvec + avec
+        C3Inspect.Inspect_Skip(file, info["vertices"] * c3_common.RecordLayout.size(c3_common.RecordLayout.phy_vertex(byChunkID)), end)
+        ntri, atri = C3Inspect.Inspect_Read(file, '<II', end)
+        info["triangles"] = ntri + atri
+        C3Inspect.Inspect_Skip(file, info["triangles"] * 6, end)
+        info["texture"] = C3Inspect.Inspect_String(file, end)
+        info["bbox"] = list(C3Inspect.Inspect_Read(file, '<6f', end))
+        C3Inspect.Inspect_Skip(file, 64, end)
+        info["tex_rows"] = C3Inspect.Inspect_Read(file, '<I', end)[0]
+        for key in ("alphas", "draws", "change_texs"):
+            info[key] = C3Inspect.Inspect_Read(file, '<I', end)[0]
+            C3Inspect.Inspect_Skip(file, info[key] * FRAME_SIZE, end)
+
+        info["uvstep"] = False
+        info["two_sided"] = False
+        if file.tell() + 4 <= end:
+            flag = file.read(4)
+            if flag == b'STEP':
+                C3Inspect.Inspect_Skip(file, 8, end)
+                info["uvstep"] = True
+            else:
+                file.seek(-4, 1)
+        if file.tell() + 4 <= end:
+            flag = file.read(4)
+            if flag == b'2SID':
+                info["two_sided"] = True
+            else:
+                file.seek(-4, 1)
+        return info
+
+    @staticmethod
+    def Inspect_Motion(file, end):
+        # Same layout Motion_Load reads (c3_common.RecordLayout), with the matrices skipped
+        info = {}
+        info["bones"], info["frames"] = C3Inspect.Inspect_Read(file, '<II', end)
+        kf = file.read(4) if file.tell() + 4 <= end else b''
+        if kf in c3_common.MOTION_KEYS:
+            info["key_format"] = kf.decode()
+            info["keyframes"] = C3Inspect.Inspect_Read(file, '<I', end)[0]
+            fields = c3_common.RecordLayout.motion_key(kf, info["bones"])
+            C3Inspect.Inspect_Skip(file, info["keyframes"] * c3_common.RecordLayout.size(fields), end)
+        else:
+            file.seek(-len(kf), 1)
+            info["key_format"] = "MATRIX"
+            info["keyframes"] = info["frames"]
+            C3Inspect.Inspect_Skip(file, info["bones"] * info["frames"] * 64, end)
+        info["morphs"] = C3Inspect.Inspect_Read(file, '<I', end)[0]
+        C3Inspect.Inspect_Skip(file, info["morphs"] * info["frames"] * 4, end)
+        return info
+
+    @staticmethod
+    def Inspect_File(path):
+        report = {"path": path, "size": 0, "chunks": [], "phys": [], "motions": [], "errors": []}
+        try:
+            report["size"] = os.path.getsize(path)
+            with open(path, 'rb') as file:
+                version = file.read(16).decode(errors='replace').rstrip('\0')
+                if version != c3_main.C3_VERSION:
+                    report["errors"].append(f"bad version {version!r}")
+                    return report
+
+                while file.tell() < report["size"]:
+                    offset = file.tell()
+                    if offset + 8 > report["size"]:
+                        report["errors"].append(f"truncated chunk header at {offset}")
+                        break
+                    chunk = c3_common.ChunkHeader.read(file)
+                    start = file.tell()
+                    end = start + chunk.dwChunkSize
+                    name = chunk.byChunkID.decode(errors='replace')
+                    report["chunks"].append({"id": name, "offset": offset, "size": chunk.dwChunkSize})
+                    if end > report["size"]:
+                        report["errors"].append(f"{name} chunk at {offset} runs {end - report['size']} bytes past the end of the file")
+                        break
+
+                    if chunk.byChunkID in PHY_CHUNKS:
+                        lpList = report["phys"]
+                    elif chunk.byChunkID == b'MOTI':
+                        lpList = report["motions"]
+                    else:
+                        file.seek(end)
+                        continue
+                    # A chunk that fails keeps its slot as None, like the loaders, so
+                    # phys[n] and motions[n] stay the nth PHY and MOTI chunk of the file
+                    lpList.append(None)
+                    try:
+                        if lpList is report["phys"]:
+                            lpList[-1] = C3Inspect.Inspect_Phy(file, chunk.byChunkID, end)
+                        else:
+                            lpList[-1] = C3Inspect.Inspect_Motion(file, end)
+                        if file.tell() != end:
+                            report["errors"].append(f"{name} chunk at {offset} has {end - file.tell()} unread bytes")
+                    except ValueError as e:
+                        report["errors"].append(f"{name} chunk at {offset}: {e}")
+                    file.seek(end)
+        except OSError as e:
+            report["errors"].append(str(e))
+        return report
+
+    @staticmethod
+    def Inspect_Decode(report):
+        # Runs the add-on's parsers and compares their counts with the header scan
+        c3_phy, c3_motion = C3Inspect.Inspect_Package()
+        path = report["path"]
+
+        phy_loader = c3_phy.C3Phy()
+        if phy_loader.C3_Load(path, bVertices=False) or not report["phys"]:
+            decoded = [(len(lpPhy.lpPos), len(lpPhy.lpIB) // 3) if lpPhy is not None else None for lpPhy in phy_loader.m_phy]
+            scanned = [(phy["vertices"], phy["triangles"]) if phy is not None else None for phy in report["phys"]]
+            if decoded != scanned:
+                report["errors"].append(f"decode: PHY counts {decoded} differ from scan {scanned}")
+        else:
+            report["errors"].append("decode: C3Phy.C3_Load failed")
+
+        motion_loader = c3_motion.C3Motion()
+        if motion_loader.C3_Load(path) or not report["motions"]:
+            decoded = [(lpMotion.dwBoneCount, lpMotion.dwFrames, lpMotion.dwKeyFrames) if lpMotion is not None else None for lpMotion in motion_loader.m_motion]
+            scanned = [(moti["bones"], moti["frames"], moti["keyframes"]) if moti is not None else None for moti in report["motions"]]
+            if decoded != scanned:
+                report["errors"].append(f"decode: motion counts {decoded} differ from scan {scanned}")
+        else:
+            report["errors"].append("decode: C3Motion.C3_Load failed")
+
+        for entry in phy_loader.m_chunkReport + motion_loader.m_chunkReport:
+            if entry["status"] != "ok":
+                report["errors"].append(f"decode: {entry['id']} chunk at {entry['offset']}: {entry['status']}, {entry['message']}")
+        return report
+
+    @staticmethod
+    def Inspect_Package():
+        if __package__:
+            from . import c3_phy, c3_motion
+            return c3_phy, c3_motion
+        # Run as a script: import the add-on folder as a package without its __init__ (bpy)
+        import importlib
+        import types
+        name = "c3_inspect_addon"
+        if name not in sys.modules:
+            package = types.ModuleType(name)
+            package.__path__ = [os.path.dirname(os.path.abspath(__file__))]
+            sys.modules[name] = package
+        return importlib.import_module(f"{name}.c3_phy"), importlib.import_module(f"{name}.c3_motion")
+
+    @staticmethod
+    def Inspect_Worker(args):
+        path, bDecode = args
+        report = C3Inspect.Inspect_File(path)
+        if bDecode and not report["errors"]:
+            try:
+                C3Inspect.Inspect_Decode(report)
+            except Exception as e:
+                report["errors"].append(f"decode: {e}")
+        return report
+
+    @staticmethod
+    def Inspect_Walk(lpPaths):
+        for path in lpPaths:
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    dirs.sort()
+                    for filename in sorted(files):
+                        if filename.lower().endswith(".c3"):
+                            yield os.path.join(root, filename)
+            else:
+                yield path
+
+    @staticmethod
+    def Inspect_Run(lpPaths, nJobs=None, bDecode=False):
+        files = list(C3Inspect.Inspect_Walk(lpPaths))
+        work = [(path, bDecode) for path in files]
+        if nJobs == 1 or len(files) < 2:
+            return [C3Inspect.Inspect_Worker(item) for item in work]
+        with multiprocessing.Pool(nJobs) as pool:
+            return pool.map(C3Inspect.Inspect_Worker, work, chunksize=max(1, len(work) // (64 * (nJobs or os.cpu_count() or 1))))
+
+    @staticmethod
+    def Inspect_Column(lpEntries, key):
+        # The values of one per-chunk field joined by ';', empty for chunks that failed the scan
+        return ";".join("" if entry is None else str(entry[key]) for entry in lpEntries)
+
+    @staticmethod
+    def Inspect_Csv(reports):
+        # One row per file with the per-chunk values joined by ';'
+        stream = io.StringIO()
+        writer = csv.writer(stream)
+        writer.writerow(["path", "size", "chunks", "phys", "phy_names", "vertices", "triangles", "textures",
+                         "motions", "bones", "frames", "key_formats", "keyframes", "morphs", "errors"])
+        for report in reports:
+            phys = report["phys"]
+            motions = report["motions"]
+            writer.writerow([
+                report["path"], report["size"], ";".join(chunk["id"] for chunk in report["chunks"]),
+                len(phys), C3Inspect.Inspect_Column(phys, "name"),
+                C3Inspect.Inspect_Column(phys, "vertices"), C3Inspect.Inspect_Column(phys, "triangles"),
+                C3Inspect.Inspect_Column(phys, "texture"),
+                len(motions), C3Inspect.Inspect_Column(motions, "bones"),
+                C3Inspect.Inspect_Column(motions, "frames"), C3Inspect.Inspect_Column(motions, "key_format"),
+                C3Inspect.Inspect_Column(motions, "keyframes"), C3Inspect.Inspect_Column(motions, "morphs"),
+                " | ".join(report["errors"]),
+            ])
+        return stream.getvalue()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and validate .c3 files without Blender")
+    parser.add_argument("paths", nargs="*", help=".c3 files or folders searched recursively")
+    parser.add_argument("--files-from", help="also read paths from this file, one per line")
+    parser.add_argument("--format", choices=("json", "csv"), default="json")
+    parser.add_argument("--out", help="write the report here instead of stdout")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--decode", action="store_true", help="also run the full parsers (needs numpy and mathutils)")
+    args = parser.parse_args(argv)
+    paths = list(args.paths)
+    if args.files_from:
+        with open(args.files_from, encoding="utf-8") as file:
+            paths += [line.rstrip("\r\n") for line in file if line.strip()]
+    if not paths:
+        parser.error("no files or folders given")
+
+    reports = C3Inspect.Inspect_Run(paths, args.jobs, args.decode)
+    if args.format == "csv":
+        text = C3Inspect.Inspect_Csv(reports)
+    else:
+        text = json.dumps(reports, indent=2, ensure_ascii=False) + "\n"
+
+    if args.out:
+        with open(args.out, 'w', encoding="utf-8", newline="") as file:
+            file.write(text)
+    else:
+        sys.stdout.write(text)
+
+    bad = sum(1 for report in reports if report["errors"])
+    if bad:
+        print(f"{bad} of {len(reports)} files have errors", file=sys.stderr)
+    return 1 if bad else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,15 @@
 import struct
 
+# nFrame, fParam, bParam, 3 padding bytes, nParam
+FRAME_FORMAT = '<if?3si'
+
 class C3Frame:
     def __init__(self):
         self.nFrame = 0
         self.fParam = [0.0]
         self.bParam = [False]
         self.nParam = [0]
+        self.byPad = b'\0\0\0'
     
     @staticmethod
     def read(file):
@@ -13,9 +17,17 @@ class C3Frame:
         frame.nFrame = struct.unpack('<i', file.read(4))[0]
         frame.fParam[0] = struct.unpack('<f', file.read(4))[0]
         frame.bParam[0] = struct.unpack('<?', file.read(1))[0]
-        file.read(3)
+        frame.byPad = file.read(3)
         frame.nParam[0] = struct.unpack('<i', file.read(4))[0]
         return frame
+    
+    @staticmethod
+    def pack(lpFrames):
+        # Count and frames as read by C3Frame.read, padding bytes are written back as read
+        lpFrames = lpFrames or []
+        return struct.pack('<I', len(lpFrames)) + b''.join(
+            struct.pack(FRAME_FORMAT, frame.nFrame, frame.fParam[0], frame.bParam[0], frame.byPad, frame.nParam[0])
+            for frame in lpFrames)
 
 class C3Key:
     def __init__(self):
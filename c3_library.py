@@ -0,0 +1,324 @@
+import hashlib
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import uuid
+import bpy
+import numpy as np
+from . import c3_inspect
+from . import c3_texture
+
+INDEX_NAME = "c3_index.json"
+INDEX_VERSION = 1
+LIBRARY_NAME = "c3_library.blend"
+CATALOG_NAME = "blender_assets.cats.txt"
+# Catalog ids are uuid5 of the folder, so re-indexing keeps the ids assets already point at
+CATALOG_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "c3-blender-addon/catalog")
+PREVIEW_SIZE = 128
+# Longest ID name in bytes Blender keeps
+NAME_BYTES = 63
+
+# A library is a folder of .c3 files. c3_index.json holds the c3_inspect scan of every file
+# keyed by its path relative to the folder, with the mtime and size it was scanned at.
+# c3_library.blend holds one asset per file: an empty the size of the file's bounding box
+# that C3 Add-On > Import C3 Assets replaces with the model. Previews are made on demand by
+# C3 Add-On > Make C3 Library Previews, indexing never loads a texture
+class C3Library:
+    @staticmethod
+    def Library_Load(szRoot):
+        # Relative path -> entry, empty when there is no index yet or it is from another version
+        try:
+            with open(os.path.join(szRoot, INDEX_NAME), encoding="utf-8") as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+            return {}
+        return index.get("files", {})
+
+    @staticmethod
+    def Library_Save(szRoot, lpFiles):
+        path = os.path.join(szRoot, INDEX_NAME)
+        with open(path + ".tmp", 'w', encoding="utf-8") as file:
+            json.dump({"version": INDEX_VERSION, "files": lpFiles}, file, ensure_ascii=False, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def Library_Scan(lpPaths, nJobs=None):
+        # c3_inspect.py runs as its own script with Blender's Python so its worker processes
+        # can start on every platform (they cannot import the add-on package, which needs bpy).
+        # Falls back to scanning here when the interpreter cannot be started
+        if not lpPaths:
+            return []
+        with tempfile.TemporaryDirectory() as temp:
+            lpList = os.path.join(temp, "files.txt")
+            lpOut = os.path.join(temp, "report.json")
+            with open(lpList, 'w', encoding="utf-8") as file:
+                file.write("\n".join(lpPaths) + "\n")
+            command = [sys.executable, "-I", os.path.join(os.path.dirname(os.path.abspath(__file__)), "c3_inspect.py"),
+                       "--files-from", lpList, "--out", lpOut]
+            if nJobs:
+                command += ["--jobs", str(nJobs)]
+            try:
+                subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                with open(lpOut, encoding="utf-8") as file:
+                    reports = json.load(file)
+                if len(reports) == len(lpPaths):
+                    return reports
+            except (OSError, ValueError):
+                pass
+        return c3_inspect.C3Inspect.Inspect_Run(lpPaths, 1)
+
+    @staticmethod
+    def Library_Update(szRoot, nJobs=None):
+        # Only files whose mtime or size changed since the last run are scanned again.
+        # Returns the index, the relative paths scanned and the number of files dropped
+        szRoot = os.path.abspath(szRoot)
+        lpOld = C3Library.Library_Load(szRoot)
+        lpFiles = {}
+        lpStale = {}
+        for path in c3_inspect.C3Inspect.Inspect_Walk([szRoot]):
+            rel = os.path.relpath(path, szRoot).replace(os.sep, "/")
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = lpOld.get(rel)
+            if entry is not None and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+                lpFiles[rel] = entry
+            else:
+                lpStale[rel] = (path, stat)
+
+        lpPaths = [path for path, stat in lpStale.values()]
+        for rel, report in zip(lpStale, C3Library.Library_Scan(lpPaths, nJobs)):
+            stat = lpStale[rel][1]
+            lpFiles[rel] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "phys": report["phys"],
+                "motions": report["motions"],
+                "errors": report["errors"],
+            }
+
+        nRemoved = sum(1 for rel in lpOld if rel not in lpFiles)
+        if lpStale or nRemoved or not os.path.exists(os.path.join(szRoot, INDEX_NAME)):
+            C3Library.Library_Save(szRoot, dict(sorted(lpFiles.items())))
+        return lpFiles, set(lpStale), nRemoved
+
+    @staticmethod
+    def Library_Catalog(rel):
+        # Catalog path and id of the folder holding rel
+        folder = os.path.dirname(rel).replace(":", "-")
+        path = "C3/" + folder if folder else "C3"
+        return path, str(uuid.uuid5(CATALOG_NAMESPACE, path))
+
+    @staticmethod
+    def Library_WriteCatalogs(szRoot, lpFiles):
+        # Catalogs the user added to the file are kept
+        path = os.path.join(szRoot, CATALOG_NAME)
+        lpCatalogs = {}
+        try:
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    line = line.strip()
+                    if line and not line.startswith("#") and not line.startswith("VERSION"):
+                        lpCatalogs[line.split(":", 1)[0]] = line
+        except OSError:
+            pass
+        for rel in lpFiles:
+            catalog, catalog_id = C3Library.Library_Catalog(rel)
+            lpCatalogs[catalog_id] = f"{catalog_id}:{catalog}:{catalog.replace('/', '-')}"
+
+        with open(path + ".tmp", 'w', encoding="utf-8") as file:
+            file.write("# This is an Asset Catalog Definition file for Blender.\n"
+                       "#\n"
+                       "# Empty lines and lines starting with `#` will be ignored.\n"
+                       "# The first non-ignored line should be the version indicator.\n"
+                       "# Other lines are of the format \"UUID:catalog/path/for/assets:simple catalog name\"\n"
+                       "\n"
+                       "VERSION 1\n"
+                       "\n")
+            for line in sorted(lpCatalogs.values(), key=lambda line: line.split(":")[1]):
+                file.write(line + "\n")
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def Library_Names(lpRels):
+        # Asset name of each file: its file name, with the folder added where file names
+        # repeat, cut to NAME_BYTES with a digest of the path so names stay unique
+        lpStems = {}
+        for rel in lpRels:
+            lpStems.setdefault(os.path.splitext(os.path.basename(rel))[0], []).append(rel)
+        lpNames = {}
+        lpUsed = set()
+        for stem, lpSame in sorted(lpStems.items()):
+            for rel in lpSame:
+                name = stem if len(lpSame) == 1 else f"{stem} ({os.path.dirname(rel) or '/'})"
+                if len(name.encode()) > NAME_BYTES or name in lpUsed:
+                    digest = hashlib.blake2b(rel.encode(), digest_size=4).hexdigest()
+                    name = name.encode()[:NAME_BYTES - 9].decode(errors='ignore') + " " + digest
+                lpNames[rel] = name
+                lpUsed.add(name)
+        return lpNames
+
+    @staticmethod
+    def Library_Write(path, lpNamed):
+        # Writes the objects of lpNamed (name -> object) to path under exactly those names.
+        # Objects appended from the library or made here get .001 names when the open file
+        # already has objects of those names, so those are renamed aside until it is written
+        lpOwn = set(lpNamed.values())
+        lpLocal = {obj.name: obj for obj in bpy.data.objects if obj.library is None and obj not in lpOwn}
+        lpMoved = []
+        try:
+            for obj in lpOwn:
+                obj.name = "c3 " + uuid.uuid4().hex
+            for name, obj in lpNamed.items():
+                if name in lpLocal:
+                    lpLocal[name].name = "c3 " + uuid.uuid4().hex
+                    lpMoved.append((lpLocal[name], name))
+                obj.name = name
+            bpy.data.libraries.write(path + ".tmp", lpOwn, fake_user=True)
+            os.replace(path + ".tmp", path)
+        finally:
+            for obj, name in lpMoved:
+                lpNamed[name].name = "c3 " + uuid.uuid4().hex
+                obj.name = name
+
+    @staticmethod
+    def Library_Preview(obj, lpTexPath):
+        # The model's texture scaled down as the asset thumbnail
+        image = bpy.data.images.load(lpTexPath, check_existing=False)
+        try:
+            if image.size[0] == 0 or image.size[1] == 0:
+                return False
+            image.scale(PREVIEW_SIZE, PREVIEW_SIZE)
+            pixels = np.empty(PREVIEW_SIZE * PREVIEW_SIZE * 4, dtype=np.float32)
+            image.pixels.foreach_get(pixels)
+            preview = obj.preview_ensure()
+            preview.image_size = (PREVIEW_SIZE, PREVIEW_SIZE)
+            preview.image_pixels_float.foreach_set(pixels)
+            return True
+        except RuntimeError:
+            return False
+        finally:
+            bpy.data.images.remove(image)
+
+    @staticmethod
+    def Library_Asset(szRoot, rel, entry):
+        # Placeholder empty spanning the bounding box of all PHYs, turned like imported models
+        lpPhys = entry["phys"]
+        bboxMin = np.min([phy["bbox"][:3] for phy in lpPhys], axis=0)
+        bboxMax = np.max([phy["bbox"][3:] for phy in lpPhys], axis=0)
+
+        obj = bpy.data.objects.new(rel, None)
+        obj.empty_display_type = 'CUBE'
+        obj.empty_display_size = 1.0
+        obj.scale = np.maximum((bboxMax - bboxMin) / 2, 1e-3).tolist()
+        obj.rotation_euler = (math.radians(180), 0, math.radians(180))
+        obj["c3_source_file"] = os.path.join(szRoot, rel)
+        obj["c3_asset"] = rel
+        # Looked up by Library_Previews
+        obj["c3_textures"] = ";".join(phy["texture"] for phy in lpPhys)
+
+        obj.asset_mark()
+        obj.asset_data.catalog_id = C3Library.Library_Catalog(rel)[1]
+        motions = entry["motions"]
+        obj.asset_data.description = (f"{len(lpPhys)} PHY, {sum(phy['vertices'] for phy in lpPhys)} vertices, "
+                                      f"{sum(phy['triangles'] for phy in lpPhys)} triangles, {len(motions)} motions, "
+                                      f"{max((moti['frames'] for moti in motions), default=0)} frames")
+        for phy in lpPhys:
+            for tag in (phy["name"], phy["texture"]):
+                if tag:
+                    obj.asset_data.tags.new(tag, skip_if_exists=True)
+        return obj
+
+    @staticmethod
+    def Library_Build(szRoot, lpFiles, lpChanged):
+        # Rewrites c3_library.blend. Assets of unchanged files are carried over from the
+        # previous one with their previews, so only new and changed files cost anything.
+        # A previous library that cannot be read is rebuilt from scratch.
+        # Files without PHYs or with scan errors get no asset. Returns the number of assets
+        szRoot = os.path.abspath(szRoot)
+        path = os.path.join(szRoot, LIBRARY_NAME)
+        lpWanted = {rel for rel, entry in lpFiles.items() if entry["phys"] and not entry["errors"]}
+
+        lpLoaded = []
+        if os.path.exists(path):
+            try:
+                with bpy.data.libraries.load(path, link=False) as (data_from, data_to):
+                    data_to.objects = list(data_from.objects)
+                lpLoaded = [obj for obj in data_to.objects if obj is not None]
+            except (OSError, RuntimeError):
+                pass
+        lpAssets = {}
+        for obj in lpLoaded:
+            rel = obj.get("c3_asset")
+            if rel in lpWanted and rel not in lpChanged and rel not in lpAssets:
+                lpAssets[rel] = obj
+
+        try:
+            for rel in sorted(lpWanted - set(lpAssets)):
+                lpAssets[rel] = C3Library.Library_Asset(szRoot, rel, lpFiles[rel])
+                lpLoaded.append(lpAssets[rel])
+            lpNames = C3Library.Library_Names(lpAssets)
+            C3Library.Library_Write(path, {lpNames[rel]: obj for rel, obj in lpAssets.items()})
+        finally:
+            for obj in lpLoaded:
+                bpy.data.objects.remove(obj)
+        C3Library.Library_WriteCatalogs(szRoot, lpFiles)
+        return len(lpAssets)
+
+    @staticmethod
+    def Library_Previews(szRoot, texture_roots=()):
+        # Gives the assets of c3_library.blend that have no preview yet their texture as one.
+        # Returns the number of previews made and of assets still without one
+        path = os.path.join(os.path.abspath(szRoot), LIBRARY_NAME)
+        with bpy.data.libraries.load(path, link=False) as (data_from, data_to):
+            lpNames = list(data_from.objects)
+            data_to.objects = list(lpNames)
+        lpNamed = {name: obj for name, obj in zip(lpNames, data_to.objects) if obj is not None}
+
+        nMade = 0
+        nMissing = 0
+        lpIndices = {}
+        try:
+            for obj in lpNamed.values():
+                if "c3_asset" not in obj or (obj.preview is not None and obj.preview.image_size[0]):
+                    continue
+                directory = os.path.dirname(obj["c3_source_file"])
+                if directory not in lpIndices:
+                    lpIndices[directory] = c3_texture.C3Texture.Texture_BuildIndex([directory] + list(texture_roots))
+                stem = os.path.splitext(os.path.basename(obj["c3_asset"]))[0]
+                for texture in obj.get("c3_textures", "").split(";"):
+                    lpTexPath = c3_texture.C3Texture.Texture_Resolve(lpIndices[directory], texture, stem)
+                    if lpTexPath and C3Library.Library_Preview(obj, lpTexPath):
+                        nMade += 1
+                        break
+                else:
+                    nMissing += 1
+            if nMade:
+                C3Library.Library_Write(path, lpNamed)
+        finally:
+            for obj in lpNamed.values():
+                bpy.data.objects.remove(obj)
+        return nMade, nMissing
+
+    @staticmethod
+    def Library_Register(context, szRoot):
+        # Adds the folder to Preferences > File Paths > Asset Libraries unless it is there
+        libraries = context.preferences.filepaths.asset_libraries
+        root = os.path.normcase(os.path.realpath(szRoot))
+        for library in libraries:
+            if os.path.normcase(os.path.realpath(bpy.path.abspath(library.path))) == root:
+                return library
+        name = "C3 " + os.path.basename(os.path.normpath(szRoot))
+        if hasattr(libraries, "new"):
+            return libraries.new(name=name, directory=szRoot)
+        # Blender 3.0 and 3.1
+        bpy.ops.preferences.asset_library_add(directory=szRoot)
+        library = libraries[-1]
+        library.name = name
+        return library
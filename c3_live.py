@@ -0,0 +1,116 @@
+import copy
+import bpy
+from bpy.app.handlers import persistent
+from mathutils import Matrix
+from . import c3_phy
+from . import c3_motion
+
+# Object name -> PHY (with its lpMotion) for objects skinned on frame change instead of baked.
+# Objects carry "c3_live" plus the usual c3_phy_file/c3_motion_file properties, so the
+# table is rebuilt lazily from them after a file load or when an entry goes missing
+_live_table = {}
+_live_state = {"dirty": False}
+
+class C3Live:
+    @staticmethod
+    def Live_Add(obj, lpPhy):
+        obj["c3_live"] = True
+        _live_table[obj.name] = lpPhy
+        C3Live.Live_Update(obj, lpPhy, bpy.context.scene.frame_current)
+
+    @staticmethod
+    def Live_Remove(obj):
+        _live_table.pop(obj.name, None)
+        if "c3_live" in obj:
+            del obj["c3_live"]
+
+    @staticmethod
+    def Live_Update(obj, lpPhy, frame):
+        # One frame of positions straight into the mesh, no shape keys involved
+        mesh = obj.data
+        if len(mesh.vertices) != len(lpPhy.lpPos):
+            return False
+        c3_phy.C3Phy.Phy_SetFrame(lpPhy, frame)
+        c3_phy.C3Phy.Phy_Calculate(lpPhy)
+        mesh.vertices.foreach_set("co", lpPhy.outputPositions.ravel())
+        mesh.update()
+        return True
+
+    @staticmethod
+    def Live_Load(obj, lpFiles):
+        # lpFiles caches the parsed PHY files of one rebuild, motions come from C3_LoadCached
+        phy_file = obj.get("c3_phy_file", "")
+        motion_file = obj.get("c3_motion_file", phy_file)
+        phy_index = obj.get("c3_phy_index", 0)
+        motion_index = obj.get("c3_motion_index", phy_index)
+
+        if phy_file not in lpFiles:
+            c3_loader = c3_phy.C3Phy()
+            lpFiles[phy_file] = c3_loader if c3_loader.C3_Load(bpy.path.abspath(phy_file), bVertices=False) else None
+        c3_loader = lpFiles[phy_file]
+        if c3_loader is None or phy_index >= c3_loader.m_dwPhyNum or c3_loader.m_phy[phy_index] is None:
+            return None
+
+        # A fresh PHY per object, the parsed one may be shared by several objects of the file
+        lpPhy = copy.copy(c3_loader.m_phy[phy_index])
+        if obj.get("c3_weld"):
+            c3_phy.C3Phy.Phy_Weld(lpPhy)
+
+        motion_loader = c3_motion.C3Motion.C3_LoadCached(bpy.path.abspath(motion_file))
+        if motion_loader is not None and motion_index < motion_loader.m_dwMotionNum and motion_loader.m_motion[motion_index] is not None:
+            lpPhy.lpMotion = motion_loader.m_motion[motion_index]
+        else:
+            lpPhy.lpMotion = c3_motion.C3Motion()
+            lpPhy.lpMotion.dwBoneCount = 1
+            lpPhy.lpMotion.dwFrames = 1
+            lpPhy.lpMotion.matrix = [Matrix.Identity(4)]
+            lpPhy.lpMotion.nFrame = 0
+        return lpPhy
+
+    @staticmethod
+    def Live_Rebuild():
+        lpFiles = {}
+        for obj in bpy.data.objects:
+            if obj.type != 'MESH' or not obj.get("c3_live") or obj.name in _live_table:
+                continue
+            lpPhy = C3Live.Live_Load(obj, lpFiles)
+            if lpPhy is not None:
+                _live_table[obj.name] = lpPhy
+        _live_state["dirty"] = False
+
+    @staticmethod
+    def Live_ClearCache():
+        _live_table.clear()
+        _live_state["dirty"] = False
+
+@persistent
+def c3_live_frame_change(scene, *args):
+    if _live_state["dirty"]:
+        C3Live.Live_Rebuild()
+
+    for name, lpPhy in list(_live_table.items()):
+        obj = bpy.data.objects.get(name)
+        if obj is None or not obj.get("c3_live"):
+            # Deleted, renamed or switched back to baking: renamed objects come back on the next rebuild
+            del _live_table[name]
+            _live_state["dirty"] = True
+            continue
+        C3Live.Live_Update(obj, lpPhy, scene.frame_current)
+
+@persistent
+def c3_live_load_post(*args):
+    _live_table.clear()
+    _live_state["dirty"] = True
+
+def register():
+    bpy.app.handlers.frame_change_pre.append(c3_live_frame_change)
+    bpy.app.handlers.load_post.append(c3_live_load_post)
+    # The add-on may be enabled with live objects already in the open file
+    _live_state["dirty"] = True
+
+def unregister():
+    if c3_live_frame_change in bpy.app.handlers.frame_change_pre:
+        bpy.app.handlers.frame_change_pre.remove(c3_live_frame_change)
+    if c3_live_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(c3_live_load_post)
+    C3Live.Live_ClearCache()
@@ -0,0 +1,179 @@
+import bpy
+import numpy as np
+from bpy.props import IntProperty
+from . import c3_bake
+from . import c3_phy
+
+# Imported objects carry "c3_lod" (0 for the full mesh) and "c3_lod_count", the scene's
+# c3_lod_viewport/c3_lod_render pick the level shown, clamped to what each PHY has
+class C3Lod:
+    @staticmethod
+    def Lod_Create(obj, lpPhy, nLevels, fRatio, shared=None):
+        # LOD n keeps about fRatio ** n of the vertices. The kept vertices are a subset of
+        # the source's, so shape keys are copied by index and the source's shape key action
+        # is shared, the LODs play the same animation without baking again. A draw track
+        # and the LOD switch are combined by drivers on every level.
+        # With shared (fingerprint -> mesh), LOD meshes of an identical source are reused
+        src = obj.data
+        co = np.empty(len(src.vertices) * 3, dtype=np.float32)
+        src.vertices.foreach_get("co", co)
+        co = co.reshape(-1, 3)
+        if len(co) != len(lpPhy.lpPos):
+            return []
+
+        # UV of each original triangle corner, welded PHYs already store them per loop
+        if lpPhy.lpLoopTexCoord is not None:
+            corner_uvs = lpPhy.lpLoopTexCoord.reshape(-1, 3, 2)
+        else:
+            corner_uvs = lpPhy.lpTexCoord[np.array(lpPhy.lpIB, dtype=np.int64).reshape(-1, 3)]
+
+        obj["c3_lod"] = 0
+        obj["c3_lod_count"] = nLevels
+        C3Lod.Lod_TakeDrawTrack(obj)
+        lpLods = []
+        for level in range(1, nLevels + 1):
+            digest = f"{src['c3_digest']}/LOD{level}/{fRatio:g}" if shared is not None and "c3_digest" in src else None
+            mesh = shared.get(digest) if digest is not None else None
+            kept = None
+            if mesh is None:
+                tris, source = c3_phy.C3Phy.Phy_Decimate(lpPhy, fRatio ** level)
+                kept, faces = np.unique(tris, return_inverse=True)
+
+                mesh = bpy.data.meshes.new(f"{src.name}_LOD{level}")
+                mesh.from_pydata(co[kept].tolist(), [], faces.reshape(-1, 3).tolist())
+                mesh.update()
+
+                uvs = corner_uvs[source].reshape(-1, 2).copy()
+                uvs[:, 1] = 1 - uvs[:, 1]
+                uv_layer = mesh.uv_layers.new(name="UVMap")
+                uv_layer.data.foreach_set("uv", uvs.ravel())
+
+                for mat in src.materials:
+                    mesh.materials.append(mat)
+                if digest is not None:
+                    mesh["c3_digest"] = digest
+                    shared[digest] = mesh
+
+            lod = bpy.data.objects.new(f"{obj.name}_LOD{level}", mesh)
+            lod.rotation_euler = obj.rotation_euler
+            lod.location = obj.location
+            lod["c3_lod"] = level
+            lod["c3_lod_count"] = nLevels
+            lod["c3_lod_source"] = obj.name
+            for collection in obj.users_collection:
+                collection.objects.link(lod)
+
+            if kept is not None:
+                C3Lod.Lod_CopyShapeKeys(obj, lod, kept)
+            C3Lod.Lod_CopySkinning(obj, lod, kept)
+            lpLods.append(lod)
+
+        for target in [obj] + lpLods:
+            C3Lod.Lod_DriveVisibility(target, obj, bpy.context.scene)
+        return lpLods
+
+    @staticmethod
+    def Lod_TakeDrawTrack(obj):
+        # Bake_Tracks animates hide_viewport/hide_render of the source directly, which
+        # would override the LOD switch. The track moves to the "c3_hidden" property,
+        # which Bake_Tracks also writes from then on
+        obj["c3_hidden"] = 0.0
+        fcurves = c3_bake.C3Bake.Bake_FCurves(obj, bCreate=False)
+        fc = fcurves.find("hide_viewport") if fcurves is not None else None
+        if fc is None:
+            return
+        co = np.empty(len(fc.keyframe_points) * 2, dtype=np.float32)
+        fc.keyframe_points.foreach_get("co", co)
+        for data_path in ("hide_viewport", "hide_render"):
+            fc = fcurves.find(data_path)
+            if fc is not None:
+                fcurves.remove(fc)
+        c3_bake.C3Bake.Bake_Curve(fcurves, '["c3_hidden"]', 0, co.reshape(-1, 2), 'CONSTANT')
+        obj.hide_viewport = obj.hide_render = False
+
+    @staticmethod
+    def Lod_DriveVisibility(lod, obj, scene):
+        # A level is shown when the draw track of its source shows it and the scene's
+        # LOD setting picks it. Lod_Update leaves driven objects alone, it only switches
+        # LODs made before the drivers
+        nLast = lod["c3_lod_count"]
+        for data_path, szSetting in (("hide_viewport", "c3_lod_viewport"), ("hide_render", "c3_lod_render")):
+            driver = lod.driver_add(data_path).driver
+            driver.type = 'SCRIPTED'
+            hidden = driver.variables.new()
+            hidden.name = "hidden"
+            hidden.targets[0].id = obj
+            hidden.targets[0].data_path = '["c3_hidden"]'
+            level = driver.variables.new()
+            level.name = "level"
+            level.targets[0].id_type = 'SCENE'
+            level.targets[0].id = scene
+            level.targets[0].data_path = szSetting
+            driver.expression = f"hidden or min(level, {nLast}) != {lod['c3_lod']}"
+
+    @staticmethod
+    def Lod_CopyShapeKeys(obj, lod, kept):
+        key = obj.data.shape_keys
+        if key is None:
+            return
+        data = np.empty(len(obj.data.vertices) * 3, dtype=np.float32)
+        for kb in key.key_blocks:
+            kb.data.foreach_get("co", data)
+            sk = lod.shape_key_add(name=kb.name, from_mix=False)
+            sk.data.foreach_set("co", data.reshape(-1, 3)[kept].ravel())
+            sk.slider_min = kb.slider_min
+            sk.slider_max = kb.slider_max
+            sk.value = kb.value
+        if key.animation_data and key.animation_data.action:
+            lod.data.shape_keys.animation_data_create()
+            lod.data.shape_keys.animation_data.action = key.animation_data.action
+            # Blender 4.4+: the LOD's key is animated by the same slot as the source's
+            if hasattr(key.animation_data, "action_slot"):
+                lod.data.shape_keys.animation_data.action_slot = key.animation_data.action_slot
+
+    @staticmethod
+    def Lod_CopySkinning(obj, lod, kept):
+        # Geometry Nodes skinning: the bone attribute by index (unless the LOD mesh is
+        # reused and has it already) and the same node group
+        modifier = obj.modifiers.get("C3 Skinning")
+        attribute = obj.data.attributes.get("c3_bone")
+        if modifier is None or attribute is None:
+            return
+        if kept is not None:
+            bones = np.empty(len(obj.data.vertices), dtype=np.int32)
+            attribute.data.foreach_get("value", bones)
+            lod.data.attributes.new("c3_bone", 'INT', 'POINT').data.foreach_set("value", bones[kept])
+        lod.modifiers.new("C3 Skinning", 'NODES').node_group = modifier.node_group
+
+    @staticmethod
+    def Lod_Update(scene):
+        for obj in scene.objects:
+            if "c3_lod" not in obj:
+                continue
+            if obj.animation_data is not None and obj.animation_data.drivers.find("hide_viewport") is not None:
+                continue
+            nLast = obj.get("c3_lod_count", 0)
+            obj.hide_viewport = obj["c3_lod"] != min(scene.c3_lod_viewport, nLast)
+            obj.hide_render = obj["c3_lod"] != min(scene.c3_lod_render, nLast)
+
+def register():
+    bpy.types.Scene.c3_lod_viewport = IntProperty(
+        name="Viewport LOD",
+        description="Level of detail of imported C3 meshes shown in the viewport (0 is the full mesh)",
+        default=0,
+        min=0,
+        max=8,
+        update=lambda self, context: C3Lod.Lod_Update(self)
+    )
+    bpy.types.Scene.c3_lod_render = IntProperty(
+        name="Render LOD",
+        description="Level of detail of imported C3 meshes used for rendering (0 is the full mesh)",
+        default=0,
+        min=0,
+        max=8,
+        update=lambda self, context: C3Lod.Lod_Update(self)
+    )
+
+def unregister():
+    del bpy.types.Scene.c3_lod_render
+    del bpy.types.Scene.c3_lod_viewport
@@ -1,8 +1,26 @@
+import hashlib
+import io
+import os
 import struct
+import weakref
+from collections import OrderedDict
+import numpy as np
 from mathutils import Matrix
 from . import c3_main
 from . import c3_common
 
+# Decoded motions shared across PHYs and files, keyed by a digest of the raw MOTI chunk.
+# An entry lives as long as something (a PHY, a live object, _file_table) uses the motion
+_motion_table = weakref.WeakValueDictionary()
+# Interpolated bone matrices keyed by (motion digest, frame), shared by every PHY using the
+# motion. Least recently used palettes go once they take more than PALETTE_CACHE_BYTES
+_palette_cache = OrderedDict()
+_palette_bytes = [0]
+PALETTE_CACHE_BYTES = 64 * 1024 * 1024
+# The last MOTION_FILES motion files read: real path -> ((mtime, size), motions, report)
+_file_table = OrderedDict()
+MOTION_FILES = 8
+
 class C3KeyFrame:
     def __init__(self):
         self.pos = 0
@@ -14,12 +32,19 @@ class C3Motion:
         self.dwFrames = 0
         self.dwKeyFrames = 0
         self.lpKeyFrame = None
+        self.lpKeyPos = None
+        self.lpKeyMatrix = None
+        self.lpKeyQuat = None
+        self.szKeyType = ""
         self.matrix = None
         self.dwMorphCount = 0
         self.lpMorph = None
         self.nFrame = 0
+        self.digest = None
+        self.dwUnread = 0
         self.m_dwMotionNum = 0
-        self.m_motion = [None] * 16
+        self.m_motion = []
+        self.m_chunkReport = []
     
     @staticmethod
     def Motion_Clear(lpMotion):
@@ -28,37 +53,113 @@ class C3Motion:
         lpMotion.nFrame = 0
         lpMotion.dwKeyFrames = 0
         lpMotion.lpKeyFrame = None
+        lpMotion.lpKeyPos = None
+        lpMotion.lpKeyMatrix = None
+        lpMotion.lpKeyQuat = None
+        lpMotion.szKeyType = ""
         lpMotion.matrix = None
         lpMotion.nFrame = 0
         lpMotion.dwMorphCount = 0
         lpMotion.lpMorph = None
     
     def C3_Load(self, lpName):
+        # Same bounded per-chunk parsing as C3Phy.C3_Load, a bad MOTI chunk leaves None
+        # in m_motion
         self.m_dwMotionNum = 0
+        self.m_motion = []
+        self.m_chunkReport = []
         
         try:
             with open(lpName, 'rb') as file:
-                version = file.read(16).decode().rstrip('\0')
+                version = file.read(16).decode(errors='replace').rstrip('\0')
                 
                 if version != c3_main.C3_VERSION:
                     return False
                 
-                add = 0
-                
-                while file.tell() < len(open(lpName, 'rb').read()):
-                    chunk = c3_common.ChunkHeader.read(file)
-                    if chunk.byChunkID == b'MOTI':
-                        result, motion = C3Motion.Motion_Load(file)
-                        if not result:
-                            break
-                        self.m_motion[self.m_dwMotionNum] = motion
+                for chunk, offset, data in c3_common.ChunkHeader.read_chunks(file, (b'MOTI',), self.m_chunkReport):
+                    try:
+                        result, motion = C3Motion.Motion_Intern(data)
+                        message = "" if result else "Motion_Load failed"
+                    except Exception as e:
+                        result = False
+                        message = f"{type(e).__name__}: {e}"
+                    
+                    if not result:
+                        print(f"Error: skipped {chunk.ChunkID} chunk at {offset}: {message}")
+                        self.m_chunkReport.append(c3_common.ChunkHeader.make_report(chunk.byChunkID, offset, chunk.dwChunkSize, "error", message))
+                        self.m_motion.append(None)
                         self.m_dwMotionNum += 1
+                        continue
+                    
+                    if motion.dwUnread:
+                        self.m_chunkReport.append(c3_common.ChunkHeader.make_report(chunk.byChunkID, offset, chunk.dwChunkSize, "mismatch", f"{motion.dwUnread} bytes unread"))
                     else:
-                        file.seek(chunk.dwChunkSize, 1)
-        except:
+                        self.m_chunkReport.append(c3_common.ChunkHeader.make_report(chunk.byChunkID, offset, chunk.dwChunkSize, "ok"))
+                    self.m_motion.append(motion)
+                    self.m_dwMotionNum += 1
+        except OSError as e:
+            print("Error:", e)
             return False
         
-        return self.m_dwMotionNum > 0
+        return any(lpMotion is not None for lpMotion in self.m_motion)
+    
+    @staticmethod
+    def Motion_Intern(data):
+        # Identical MOTI chunks are decoded once and the same C3Motion is handed
+        # out to every PHY that uses them, so callers must not mutate its
+        # keyframes or bone matrices
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        lpMotion = _motion_table.get(digest)
+        if lpMotion is not None:
+            return True, lpMotion
+        
+        view = io.BytesIO(data)
+        result, lpMotion = C3Motion.Motion_Load(view)
+        if result:
+            lpMotion.digest = digest
+            lpMotion.dwUnread = len(data) - view.tell()
+            _motion_table[digest] = lpMotion
+        return result, lpMotion
+    
+    @staticmethod
+    def C3_LoadCached(lpName):
+        # C3_Load for files used over and over, such as the body motion while parts are
+        # swapped: the file is only read again once its mtime or size changes
+        path = os.path.realpath(lpName)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        
+        entry = _file_table.get(path)
+        if entry is None or entry[0] != stamp:
+            loader = C3Motion()
+            if not loader.C3_Load(path):
+                _file_table.pop(path, None)
+                return None
+            entry = (stamp, loader.m_motion, loader.m_chunkReport)
+            _file_table[path] = entry
+            while len(_file_table) > MOTION_FILES:
+                _file_table.popitem(last=False)
+        _file_table.move_to_end(path)
+        
+        loader = C3Motion()
+        loader.m_motion = list(entry[1])
+        loader.m_dwMotionNum = len(loader.m_motion)
+        loader.m_chunkReport = list(entry[2])
+        return loader
+    
+    @staticmethod
+    def Motion_ClearCache():
+        _motion_table.clear()
+        C3Motion.Motion_ClearPalettes()
+        _file_table.clear()
+    
+    @staticmethod
+    def Motion_ClearPalettes():
+        _palette_cache.clear()
+        _palette_bytes[0] = 0
     
     @staticmethod
     def Motion_Load(file):
@@ -71,87 +172,49 @@ class C3Motion:
         lpMotion.matrix = [Matrix.Identity(4) for _ in range(lpMotion.dwBoneCount)]
         
         kf = file.read(4)
-        if kf == b'KKEY':
+        if kf in c3_common.MOTION_KEYS:
+            lpMotion.szKeyType = kf.decode()
             lpMotion.dwKeyFrames = struct.unpack('<I', file.read(4))[0]
             lpMotion.lpKeyFrame = []
+            fields = c3_common.RecordLayout.motion_key(kf, lpMotion.dwBoneCount)
+            # Floats per bone
+            size = int(np.prod(c3_common.MOTION_KEYS[kf][1]))
+            # The quaternions as stored, Motion_Save writes them back instead of converting the matrices
+            quats = []
             
-            for kk in range(lpMotion.dwKeyFrames):
+            for record in c3_common.RecordLayout.read(file, fields, lpMotion.dwKeyFrames):
                 keyframe = C3KeyFrame()
-                keyframe.pos = struct.unpack('<I', file.read(4))[0]
+                keyframe.pos = record["pos"][0]
                 keyframe.matrix = []
                 
                 for bb in range(lpMotion.dwBoneCount):
-                    keyframe.matrix.append(C3Motion.ReadMatrix(file))
-                
-                lpMotion.lpKeyFrame.append(keyframe)
-        
-        elif kf == b'ZKEY':
-            lpMotion.dwKeyFrames = struct.unpack('<I', file.read(4))[0]
-            lpMotion.lpKeyFrame = []
-            
-            for kk in range(lpMotion.dwKeyFrames):
-                keyframe = C3KeyFrame()
-                wPos = struct.unpack('<H', file.read(2))[0]
-                keyframe.pos = wPos
-                keyframe.matrix = []
-                
-                for bb in range(lpMotion.dwBoneCount):
-                    qx = struct.unpack('<f', file.read(4))[0]
-                    qy = struct.unpack('<f', file.read(4))[0]
-                    qz = struct.unpack('<f', file.read(4))[0]
-                    qw = struct.unpack('<f', file.read(4))[0]
-                    
-                    x = struct.unpack('<f', file.read(4))[0]
-                    y = struct.unpack('<f', file.read(4))[0]
-                    z = struct.unpack('<f', file.read(4))[0]
+                    m = record["key"][bb * size:(bb + 1) * size]
+                    if kf == b'KKEY':
+                        mat = Matrix((m[0:4], m[4:8], m[8:12], m[12:16]))
+                    elif kf == b'ZKEY':
+                        quats.append(m[:4])
+                        mat = C3Motion.create_from_quaternion(*m[:4])
+                        mat[3][0] = m[4]
+                        mat[3][1] = m[5]
+                        mat[3][2] = m[6]
+                        mat[3][3] = 1.0
+                    else:
+                        mat = Matrix((
+                            (m[0], m[1], m[2], 0.0),
+                            (m[3], m[4], m[5], 0.0),
+                            (m[6], m[7], m[8], 0.0),
+                            (m[9], m[10], m[11], 1.0)
+                        ))
                     
-                    mat = C3Motion.create_from_quaternion(qx, qy, qz, qw)                   
-                    mat[3][0] = x
-                    mat[3][1] = y
-                    mat[3][2] = z
-                    mat[3][3] = 1.0  
-
                     keyframe.matrix.append(mat)
                 
                 lpMotion.lpKeyFrame.append(keyframe)
-        
-        elif kf == b'XKEY':
-            lpMotion.dwKeyFrames = struct.unpack('<I', file.read(4))[0]
-            lpMotion.lpKeyFrame = []
             
-            for kk in range(lpMotion.dwKeyFrames):
-                keyframe = C3KeyFrame()
-                wPos = struct.unpack('<H', file.read(2))[0]
-                keyframe.pos = wPos
-                keyframe.matrix = []
-                
-                for bb in range(lpMotion.dwBoneCount):
-                    _11 = struct.unpack('<f', file.read(4))[0]
-                    _12 = struct.unpack('<f', file.read(4))[0]
-                    _13 = struct.unpack('<f', file.read(4))[0]
-                    _21 = struct.unpack('<f', file.read(4))[0]
-                    _22 = struct.unpack('<f', file.read(4))[0]
-                    _23 = struct.unpack('<f', file.read(4))[0]
-                    _31 = struct.unpack('<f', file.read(4))[0]
-                    _32 = struct.unpack('<f', file.read(4))[0]
-                    _33 = struct.unpack('<f', file.read(4))[0]
-                    _41 = struct.unpack('<f', file.read(4))[0]
-                    _42 = struct.unpack('<f', file.read(4))[0]
-                    _43 = struct.unpack('<f', file.read(4))[0]
-                    
-                    mat = Matrix((
-                        (_11, _12, _13, 0.0),
-                        (_21, _22, _23, 0.0),
-                        (_31, _32, _33, 0.0),
-                        (_41, _42, _43, 1.0)
-                    ))
-                    
-                    keyframe.matrix.append(mat)
-                
-                lpMotion.lpKeyFrame.append(keyframe)
+            if kf == b'ZKEY':
+                lpMotion.lpKeyQuat = np.array(quats, dtype=np.float32).reshape(lpMotion.dwKeyFrames, lpMotion.dwBoneCount, 4)
         
         else:
-            file.seek(-4, 1)
+            file.seek(-len(kf), 1)
             
             lpMotion.dwKeyFrames = lpMotion.dwFrames
             lpMotion.lpKeyFrame = []
@@ -172,6 +235,238 @@ class C3Motion:
             lpMotion.lpMorph.append(struct.unpack('<f', file.read(4))[0])
         
         return True, lpMotion
+    
+    @staticmethod
+    def Motion_Save(file, lpMotion, szKeyType=None):
+        # Writes the chunk body Motion_Load reads, the keyframes as one structured array.
+        # szKeyType defaults to the format the motion was read in ("" is the legacy
+        # per-frame layout). ZKEY writes lpKeyQuat when it still matches the keyframes,
+        # so set it to None after changing their matrices
+        szKeyType = lpMotion.szKeyType if szKeyType is None else szKeyType
+        dwBoneCount = int(lpMotion.dwBoneCount)
+        lpKeyPos, lpKeyMatrix = C3Motion.Motion_KeyArrays(lpMotion)
+        dwKeyFrames = len(lpKeyPos)
+        if szKeyType in ("ZKEY", "XKEY") and dwKeyFrames and lpKeyPos.max() > 0xFFFF:
+            raise ValueError(f"{szKeyType} keyframe positions are 16-bit, got {lpKeyPos.max()}")
+        
+        out = [struct.pack('<II', dwBoneCount, lpMotion.dwFrames)]
+        if szKeyType in ("KKEY", "ZKEY", "XKEY"):
+            fields = c3_common.RecordLayout.dtype(c3_common.RecordLayout.motion_key(szKeyType.encode(), dwBoneCount))
+            keys = np.zeros(dwKeyFrames, dtype=np.dtype(fields))
+            keys["pos"] = lpKeyPos
+            if szKeyType == "KKEY":
+                keys["key"] = lpKeyMatrix
+            elif szKeyType == "ZKEY":
+                quats = lpMotion.lpKeyQuat
+                if quats is None or quats.shape != (dwKeyFrames, dwBoneCount, 4):
+                    quats = C3Motion.Motion_ToQuaternion(lpKeyMatrix)
+                keys["key"][..., :4] = quats
+                keys["key"][..., 4:] = lpKeyMatrix[:, :, 3, :3]
+            else:
+                keys["key"] = lpKeyMatrix[..., :3]
+        elif szKeyType == "":
+            if not np.array_equal(lpKeyPos, np.arange(lpMotion.dwFrames)):
+                raise ValueError("legacy motions need one keyframe per frame")
+            keys = np.ascontiguousarray(lpKeyMatrix.transpose(1, 0, 2, 3), dtype='<f4')
+        else:
+            raise ValueError(f"unknown key type {szKeyType!r}")
+        
+        if szKeyType:
+            out.append(szKeyType.encode() + struct.pack('<I', dwKeyFrames))
+        out.append(keys.tobytes())
+        out.append(struct.pack('<I', lpMotion.dwMorphCount))
+        out.append(np.array(lpMotion.lpMorph or [], dtype='<f4').tobytes())
+        file.write(b''.join(out))
+        return True
+    
+    @staticmethod
+    def Motion_KeyArrays(lpMotion):
+        # Keyframe positions (keyframes,) and matrices (keyframes, bones, 4, 4) of lpKeyFrame
+        dwBoneCount = int(lpMotion.dwBoneCount)
+        lpKeyFrame = lpMotion.lpKeyFrame or []
+        lpKeyPos = np.array([kf.pos for kf in lpKeyFrame], dtype=np.int64)
+        lpKeyMatrix = np.array(
+            [[[list(row) for row in m] for m in kf.matrix] for kf in lpKeyFrame],
+            dtype=np.float32
+        ).reshape(len(lpKeyFrame), dwBoneCount, 4, 4)
+        return lpKeyPos, lpKeyMatrix
+    
+    @staticmethod
+    def Motion_ToQuaternion(lpMatrix):
+        # (x, y, z, w) of the rotation part of row-vector matrices (..., 4, 4), the inverse
+        # of create_from_quaternion. Picks the largest of w, x, y, z to divide by
+        m = np.asarray(lpMatrix, dtype=np.float64)
+        m00, m11, m22 = m[..., 0, 0], m[..., 1, 1], m[..., 2, 2]
+        trace = m00 + m11 + m22
+        case = np.argmax(np.stack((trace, m00, m11, m22)), axis=0)
+        
+        quat = np.empty(m.shape[:-2] + (4,), dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s = np.sqrt(np.maximum(1.0 + trace, 1e-12)) * 2
+            w = np.stack(((m[..., 1, 2] - m[..., 2, 1]) / s, (m[..., 2, 0] - m[..., 0, 2]) / s, (m[..., 0, 1] - m[..., 1, 0]) / s, s / 4), axis=-1)
+            s = np.sqrt(np.maximum(1.0 + m00 - m11 - m22, 1e-12)) * 2
+            x = np.stack((s / 4, (m[..., 0, 1] + m[..., 1, 0]) / s, (m[..., 2, 0] + m[..., 0, 2]) / s, (m[..., 1, 2] - m[..., 2, 1]) / s), axis=-1)
+            s = np.sqrt(np.maximum(1.0 + m11 - m00 - m22, 1e-12)) * 2
+            y = np.stack(((m[..., 0, 1] + m[..., 1, 0]) / s, s / 4, (m[..., 1, 2] + m[..., 2, 1]) / s, (m[..., 2, 0] - m[..., 0, 2]) / s), axis=-1)
+            s = np.sqrt(np.maximum(1.0 + m22 - m00 - m11, 1e-12)) * 2
+            z = np.stack(((m[..., 2, 0] + m[..., 0, 2]) / s, (m[..., 1, 2] + m[..., 2, 1]) / s, s / 4, (m[..., 0, 1] - m[..., 1, 0]) / s), axis=-1)
+        for n, candidate in enumerate((w, x, y, z)):
+            quat[case == n] = candidate[case == n]
+        quat /= np.linalg.norm(quat, axis=-1, keepdims=True)
+        return quat.astype(np.float32)
+    
+    @staticmethod
+    def Motion_FromQuaternion(lpQuat):
+        # create_from_quaternion for arrays of (x, y, z, w), giving (..., 4, 4) float32
+        q = np.asarray(lpQuat, dtype=np.float64)
+        x, y, z, w = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+        m = np.zeros(q.shape[:-1] + (4, 4), dtype=np.float64)
+        m[..., 0, 0] = 1.0 - 2.0 * (y * y + z * z)
+        m[..., 0, 1] = 2.0 * (x * y + z * w)
+        m[..., 0, 2] = 2.0 * (z * x - y * w)
+        m[..., 1, 0] = 2.0 * (x * y - z * w)
+        m[..., 1, 1] = 1.0 - 2.0 * (z * z + x * x)
+        m[..., 1, 2] = 2.0 * (y * z + x * w)
+        m[..., 2, 0] = 2.0 * (z * x + y * w)
+        m[..., 2, 1] = 2.0 * (y * z - x * w)
+        m[..., 2, 2] = 1.0 - 2.0 * (y * y + x * x)
+        m[..., 3, 3] = 1.0
+        return m.astype(np.float32)
+    
+    @staticmethod
+    def Motion_Frames(lpMotion):
+        # Bone matrices of every frame (frames, bones, 4, 4), interpolated like Motion_GetPalette
+        dwFrames = int(lpMotion.dwFrames)
+        lpKeyPos, lpKeyMatrix = C3Motion.Motion_KeyArrays(lpMotion)
+        if not len(lpKeyPos):
+            return np.tile(np.identity(4, dtype=np.float32), (dwFrames, int(lpMotion.dwBoneCount), 1, 1))
+        
+        order = np.argsort(lpKeyPos, kind='stable')
+        lpKeyPos = lpKeyPos[order]
+        lpKeyMatrix = lpKeyMatrix[order]
+        frames = np.arange(dwFrames)
+        sindex = np.searchsorted(lpKeyPos, frames, side='right') - 1
+        eindex = np.minimum(sindex + 1, len(lpKeyPos) - 1)
+        # Before the first key both ends are the first key, after the last both are the last
+        sindex = np.maximum(sindex, 0)
+        span = lpKeyPos[eindex] - lpKeyPos[sindex]
+        t = np.where(span > 0, (frames - lpKeyPos[sindex]) / np.maximum(span, 1), 0.0).astype(np.float32)
+        mat_s = lpKeyMatrix[sindex]
+        return mat_s + (lpKeyMatrix[eindex] - mat_s) * t[:, None, None, None]
+    
+    @staticmethod
+    def Motion_Optimize(lpMotion, fTolerance=0.01):
+        # Re-encodes any motion as ZKEY: every frame is reduced to a quaternion and a
+        # translation, and only the frames that linear interpolation between the kept ones
+        # (as Motion_GetPalette plays it) cannot reproduce within fTolerance are kept. Errors
+        # are the largest bone matrix element difference from the source, so scale or shear
+        # that ZKEY cannot hold shows up in max_error. Returns the new motion and a report
+        dwFrames = int(lpMotion.dwFrames)
+        dwBoneCount = int(lpMotion.dwBoneCount)
+        if dwFrames > 0x10000:
+            raise ValueError(f"ZKEY keyframe positions are 16-bit, the motion has {dwFrames} frames")
+        
+        dense = C3Motion.Motion_Frames(lpMotion)
+        quats = C3Motion.Motion_ToQuaternion(dense)
+        keys = C3Motion.Motion_FromQuaternion(quats)
+        keys[:, :, 3, :3] = dense[:, :, 3, :3]
+        
+        # Frames between two keys of a sparse source are matrix blends, not rotations, so
+        # only frames whose own decomposition is within the tolerance can become keys
+        own = np.abs(keys - dense).max(axis=(1, 2, 3)) if dwFrames else np.zeros(0)
+        
+        def segment_error(start, end, target):
+            # Frames strictly between start and end against the blend of keys[start] and target
+            t = ((np.arange(start + 1, end) - start) / (end - start)).astype(np.float32)[:, None, None, None]
+            lerp = keys[start] + (target - keys[start]) * t
+            return float(np.abs(lerp - dense[start + 1:end]).max()) if end > start + 1 else 0.0
+        
+        # Greedy: each kept frame reaches the furthest key candidate the frames in between
+        # allow. The scan stops once even the source frame as the end misses the tolerance
+        kept = [0] if dwFrames else []
+        fMaxError = float(own[0]) if dwFrames else 0.0
+        start = 0
+        while start < dwFrames - 1:
+            end = start + 1
+            for candidate in range(start + 2, dwFrames):
+                if segment_error(start, candidate, dense[candidate]) > fTolerance:
+                    break
+                if own[candidate] <= fTolerance and segment_error(start, candidate, keys[candidate]) <= fTolerance:
+                    end = candidate
+            fMaxError = max(fMaxError, segment_error(start, end, keys[end]), float(own[end]))
+            kept.append(end)
+            start = end
+        
+        lpNew = C3Motion.Motion_FromArrays(dwBoneCount, dwFrames, "ZKEY", np.array(kept, dtype=np.int64), keys[kept],
+                                           quats[kept], lpMotion.dwMorphCount, lpMotion.lpMorph)
+        
+        before = io.BytesIO()
+        C3Motion.Motion_Save(before, lpMotion)
+        after = io.BytesIO()
+        C3Motion.Motion_Save(after, lpNew)
+        return lpNew, {
+            "bytes_before": len(before.getvalue()),
+            "bytes_after": len(after.getvalue()),
+            "keyframes_before": int(lpMotion.dwKeyFrames),
+            "keyframes_after": len(kept),
+            "max_error": fMaxError,
+        }
+
+    @staticmethod
+    def Motion_FromArrays(dwBoneCount, dwFrames, szKeyType, lpKeyPos, lpKeyMatrix, lpKeyQuat=None, dwMorphCount=0, lpMorph=None):
+        # A motion with C3KeyFrames built from Motion_KeyArrays style arrays
+        lpNew = C3Motion()
+        C3Motion.Motion_Clear(lpNew)
+        lpNew.dwBoneCount = dwBoneCount
+        lpNew.dwFrames = dwFrames
+        lpNew.szKeyType = szKeyType
+        lpNew.matrix = [Matrix.Identity(4) for _ in range(dwBoneCount)]
+        lpNew.dwKeyFrames = len(lpKeyPos)
+        lpNew.lpKeyQuat = lpKeyQuat
+        lpNew.lpKeyFrame = []
+        for pos, matrices in zip(lpKeyPos.tolist(), lpKeyMatrix.tolist()):
+            keyframe = C3KeyFrame()
+            keyframe.pos = pos
+            keyframe.matrix = [Matrix(m) for m in matrices]
+            lpNew.lpKeyFrame.append(keyframe)
+        lpNew.dwMorphCount = dwMorphCount
+        lpNew.lpMorph = list(lpMorph or [])
+        return lpNew
+    
+    @staticmethod
+    def Motion_Retime(lpMotion, fScale):
+        # The motion played over fScale times as many frames. Keyed motions keep their keys
+        # at scaled positions (keys landing on the same frame keep the first), legacy
+        # motions and morph weights are resampled per frame with linear interpolation
+        dwFrames = int(lpMotion.dwFrames)
+        dwNewFrames = max(1, int(round(dwFrames * fScale))) if dwFrames else 0
+        source = np.clip(np.arange(dwNewFrames) / fScale, 0, max(dwFrames - 1, 0))
+        lo = np.floor(source).astype(np.int64)
+        hi = np.minimum(lo + 1, max(dwFrames - 1, 0))
+        t = (source - lo).astype(np.float32)
+        
+        def resample(rows):
+            return rows[lo] + (rows[hi] - rows[lo]) * t.reshape((-1,) + (1,) * (rows.ndim - 1))
+        
+        lpKeyPos, lpKeyMatrix = C3Motion.Motion_KeyArrays(lpMotion)
+        lpKeyQuat = None
+        if lpMotion.szKeyType:
+            lpNewPos = np.minimum(np.round(lpKeyPos * fScale).astype(np.int64), max(dwNewFrames - 1, 0))
+            lpNewPos, first = np.unique(lpNewPos, return_index=True)
+            lpNewMatrix = lpKeyMatrix[first]
+            if lpMotion.lpKeyQuat is not None and len(lpMotion.lpKeyQuat) == len(lpKeyPos):
+                lpKeyQuat = lpMotion.lpKeyQuat[first]
+        else:
+            lpNewPos = np.arange(dwNewFrames)
+            lpNewMatrix = resample(C3Motion.Motion_Frames(lpMotion))
+        
+        dwMorphCount = int(lpMotion.dwMorphCount)
+        lpMorph = None
+        if lpMotion.lpMorph and dwMorphCount and dwFrames:
+            weights = np.array(lpMotion.lpMorph, dtype=np.float32).reshape(dwFrames, dwMorphCount)
+            lpMorph = resample(weights).ravel().tolist()
+        return C3Motion.Motion_FromArrays(int(lpMotion.dwBoneCount), dwNewFrames, lpMotion.szKeyType, lpNewPos,
+                                          lpNewMatrix, lpKeyQuat, dwMorphCount, lpMorph)
 
     @staticmethod
     def create_from_quaternion(qx, qy, qz, qw):
@@ -215,6 +510,9 @@ class C3Motion:
             for kk in range(lpMotion.dwKeyFrames):
                 lpMotion.lpKeyFrame[kk].matrix = None
         lpMotion.lpKeyFrame = None
+        lpMotion.lpKeyPos = None
+        lpMotion.lpKeyMatrix = None
+        lpMotion.lpKeyQuat = None
         lpMotion.matrix = None
         lpMotion.lpMorph = None
         lpMotion = None
@@ -256,3 +554,44 @@ class C3Motion:
         for i in range(4)
         ])
 
+    @staticmethod
+    def Motion_GetPalette(lpMotion, nFrame=None):
+        # Motion_GetMatrix for every bone at nFrame (nFrame by default) as a (bones, 4, 4) array
+        if nFrame is None:
+            nFrame = nFrame
+        key = (lpMotion.digest, nFrame)
+        if lpMotion.digest is not None:
+            palette = _palette_cache.get(key)
+            if palette is not None:
+                _palette_cache.move_to_end(key)
+                return palette
+        
+        dwBoneCount = int(lpMotion.dwBoneCount)
+        if not lpMotion.dwKeyFrames:
+            palette = np.tile(np.identity(4, dtype=np.float32), (dwBoneCount, 1, 1))
+        else:
+            if lpMotion.lpKeyMatrix is None:
+                lpMotion.lpKeyPos, lpMotion.lpKeyMatrix = C3Motion.Motion_KeyArrays(lpMotion)
+            
+            before = np.flatnonzero(lpMotion.lpKeyPos <= nFrame)
+            after = np.flatnonzero(lpMotion.lpKeyPos > nFrame)
+            
+            if len(before) == 0:
+                palette = lpMotion.lpKeyMatrix[after[0]].copy()
+            elif len(after) == 0:
+                palette = lpMotion.lpKeyMatrix[before[-1]].copy()
+            else:
+                sindex = before[-1]
+                eindex = after[0]
+                t = float(nFrame - lpMotion.lpKeyPos[sindex]) / \
+                    float(lpMotion.lpKeyPos[eindex] - lpMotion.lpKeyPos[sindex])
+                mat_s = lpMotion.lpKeyMatrix[sindex]
+                mat_e = lpMotion.lpKeyMatrix[eindex]
+                palette = mat_s + (mat_e - mat_s) * np.float32(t)
+        
+        if lpMotion.digest is not None:
+            _palette_cache[key] = palette
+            _palette_bytes[0] += palette.nbytes
+            while _palette_bytes[0] > PALETTE_CACHE_BYTES and len(_palette_cache) > 1:
+                _palette_bytes[0] -= _palette_cache.popitem(last=False)[1].nbytes
+        return palette
@@ -2,19 +2,26 @@ import bpy
 import bmesh
 import os
 import math
+import threading
+import time
+import numpy as np
 from mathutils import Vector, Matrix
-from bpy_extras.io_utils import ImportHelper
-from bpy.props import StringProperty, BoolProperty
+from bpy_extras.io_utils import ImportHelper, ExportHelper
+from bpy.props import StringProperty, BoolProperty, FloatProperty, EnumProperty, IntProperty
 from . import c3_phy
 from . import c3_motion
 from . import c3_common
 from . import c3_main
+from . import c3_bake
+from . import c3_profile
+from . import c3_texture
+from . import c3_live
+from . import c3_lod
+from . import c3_export
+from . import c3_library
 
-class IMPORT_OT_c3_model(bpy.types.Operator, ImportHelper):
-    bl_idname = "import_scene.c3_model"
-    bl_label = "Import .C3 Model"
-    bl_options = {'REGISTER', 'UNDO'}
-    
+class C3ModelImport(ImportHelper):
+    # Options and import stages shared by the blocking and the modal model importers
     filename_ext = ".c3"
     filter_glob: StringProperty(default="*.c3", options={'HIDDEN'})
     
@@ -29,8 +36,72 @@ class IMPORT_OT_c3_model(bpy.types.Operator, ImportHelper):
         description="Import into a new scene",
         default=True
     )
+    dedupe_tolerance: FloatProperty(
+        name="Merge Tolerance",
+        description="Reuse an earlier frame's shape key when every vertex is within this distance of it (0 reuses exact repeats only)",
+        default=0.0001,
+        min=0.0,
+        precision=6
+    )
+    static_epsilon: FloatProperty(
+        name="Static Epsilon",
+        description="Skip shape keys whose largest displacement from Basis is below this distance (0 keeps every frame)",
+        default=0.0,
+        min=0.0,
+        precision=6
+    )
+    bake_mode: EnumProperty(
+        name="Bake",
+        description="Which frames get a shape key",
+        items=[
+            ('FRAMES', "Every Frame", "Store a shape key for every frame of the motion"),
+            ('KEYFRAMES', "Keyframes Only", "Store shape keys only at the motion's keyframes and let linear blending rebuild the frames in between"),
+            ('LIVE', "Live", "Store no shape keys, skin the current frame into the mesh whenever the frame changes"),
+            ('GEOMETRY_NODES', "Geometry Nodes", "Store the bone matrices of every frame in an image and skin with a generated Geometry Nodes modifier (Blender 3.2+)"),
+        ],
+        default='FRAMES'
+    )
+    preload_textures: BoolProperty(
+        name="Preload Textures",
+        description="Read and check every texture on background threads while the meshes are built, then create the images in one batch at the end",
+        default=False
+    )
+    lod_count: IntProperty(
+        name="LODs",
+        description="Number of reduced meshes generated per PHY, they share the full mesh's animation (not available with Live)",
+        default=0,
+        min=0,
+        max=8
+    )
+    lod_ratio: FloatProperty(
+        name="LOD Ratio",
+        description="Fraction of vertices each LOD keeps from the previous level",
+        default=0.5,
+        min=0.05,
+        max=0.95
+    )
+    share_meshes: BoolProperty(
+        name="Share Meshes",
+        description="Give PHYs identical to one already in the file (same geometry, motion, texture and bake options) a new object using the existing mesh data instead of importing them again",
+        default=False
+    )
+    weld_vertices: BoolProperty(
+        name="Weld Vertices",
+        description="Merge vertices that share position and bone (C3 splits them at UV seams) and drop unused ones, so every baked frame stores fewer vertices",
+        default=False
+    )
+    profile_import: BoolProperty(
+        name="Profile",
+        description="Time each import stage per PHY (wall time, calls, peak Python memory) and write the results to the Info report and a JSON file in the temp folder",
+        default=False
+    )
+    profile_cprofile: BoolProperty(
+        name="cProfile",
+        description="Also capture a cProfile of the whole import alongside the stage profile",
+        default=False
+    )
 
-    def execute(self, context):
+    def prepare_scene(self, context):
         # Start debug server if not already connected
         if self.use_debugpy:
             import debugpy
@@ -47,22 +118,45 @@ class IMPORT_OT_c3_model(bpy.types.Operator, ImportHelper):
             context.window.scene = new_scene
             context = bpy.context
         
-        return self.import_c3_model(context, self.filepath)
+        return context
     
-    def import_c3_model(self, context, filepath):
-        filename = os.path.splitext(os.path.basename(self.filepath))[0]
-        # Create a parent collection for all imports from this file
-        file_collection = bpy.data.collections.new(filename)
-        context.scene.collection.children.link(file_collection)
+    def import_c3_model(self, context, filepath, profiler=None):
+        if profiler is None:
+            profiler = c3_profile.C3Profiler()
         
-        c3_loader = c3_phy.C3Phy()        
-        if not c3_loader.C3_Load(filepath):
+        loaded, c3_loader = self.load_c3_model(filepath, profiler, self.weld_vertices)
+        if not loaded:
             self.report({'ERROR'}, "Failed to load C3 file")
             return {'CANCELLED'}
         
+        file_collection = None
+        for file_collection in self.iter_import_c3_model(context, filepath, c3_loader, profiler):
+            pass
+        
+        self.finish_import(context, file_collection)
+        self.report({'INFO'}, f"Imported C3 model: {filepath}")
+        return {'FINISHED'}
+    
+    @staticmethod
+    def load_c3_model(filepath, profiler, bWeld=False):
+        # Parsing and motion assignment only, no bpy access, so this can run off the main thread
+        c3_loader = c3_phy.C3Phy()        
+        with profiler.stage("parse_phy"):
+            loaded = c3_loader.C3_Load(filepath)
+        if not loaded:
+            return False, c3_loader
+        
+        if bWeld:
+            with profiler.stage("weld"):
+                for lpPhy in c3_loader.m_phy:
+                    if lpPhy is not None:
+                        c3_phy.C3Phy.Phy_Weld(lpPhy)
+        
         motionpath = filepath
         motion_loader = c3_motion.C3Motion()
-        motion_loaded = motion_loader.C3_Load(motionpath)
+        with profiler.stage("parse_motion"):
+            motion_loaded = motion_loader.C3_Load(motionpath)
+        c3_loader.m_chunkReport = sorted(c3_loader.m_chunkReport + motion_loader.m_chunkReport, key=lambda entry: entry["offset"])
         
         for phy_idx in range(c3_loader.m_dwPhyNum):
             lpPhy = c3_loader.m_phy[phy_idx]
@@ -70,15 +164,7 @@ class IMPORT_OT_c3_model(bpy.types.Operator, ImportHelper):
             if lpPhy is None:
                 continue
             
-            # Store the original phy index
-            lpPhy.phy_index = phy_idx
-            
-            # Create a new collection for each m_phy
-            collection_name = lpPhy.lpName if lpPhy.lpName else f"C3_Phy_{phy_idx}"
-            new_collection = bpy.data.collections.new(collection_name)
-            file_collection.children.link(new_collection)
-            
-            if motion_loaded and phy_idx < motion_loader.m_dwMotionNum:
+            if motion_loaded and phy_idx < motion_loader.m_dwMotionNum and motion_loader.m_motion[phy_idx] is not None:
                 lpPhy.lpMotion = motion_loader.m_motion[phy_idx]
             else:
                 lpPhy.lpMotion = c3_motion.C3Motion()
@@ -86,9 +172,75 @@ class IMPORT_OT_c3_model(bpy.types.Operator, ImportHelper):
                 lpPhy.lpMotion.dwFrames = 1
                 lpPhy.lpMotion.matrix = [Matrix.Identity(4)]
                 lpPhy.lpMotion.nFrame = 0
+        
+        return True, c3_loader
+    
+    def import_work(self, c3_loader):
+        # One unit per PHY plus one per baked frame, matching what iter_import_c3_model yields
+        work = 0
+        for lpPhy in c3_loader.m_phy:
+            if lpPhy is None:
+                continue
+            work += 1
+            if lpPhy.lpMotion and lpPhy.lpMotion.dwFrames > 0 and self.bake_mode not in {'LIVE', 'GEOMETRY_NODES'}:
+                work += len(c3_bake.C3Bake.Bake_SampleFrames(lpPhy.lpMotion, self.bake_mode))
+        return work
+    
+    def iter_import_c3_model(self, context, filepath, c3_loader, profiler):
+        # Creates the data-blocks, yielding the file collection after each unit of import_work
+        filename = os.path.splitext(os.path.basename(filepath))[0]
+        # Create a parent collection for all imports from this file
+        file_collection = bpy.data.collections.new(filename)
+        context.scene.collection.children.link(file_collection)
+        
+        for entry in c3_loader.m_chunkReport:
+            if entry["status"] != "ok":
+                self.report({'WARNING'}, f"{entry['id']} chunk at offset {entry['offset']}: {entry['status']}, {entry['message']}")
+        
+        with profiler.stage("texture_index"):
+            texture_dirs = [os.path.dirname(filepath)] + c3_texture.C3Texture.Texture_Roots(context)
+            texture_index = c3_texture.C3Texture.Texture_BuildIndex(texture_dirs)
+        
+        texture_futures = None
+        texture_pending = []
+        lpTracks = []
+        lpLods = []
+        # Meshes of earlier imports by fingerprint, PHYs repeated in this file are added as they are built
+        shared = {mesh["c3_digest"]: mesh for mesh in bpy.data.meshes if "c3_digest" in mesh} if self.share_meshes else {}
+        if self.preload_textures:
+            with profiler.stage("texture_preload"):
+                tex_paths = [c3_texture.C3Texture.Texture_Resolve(texture_index, lpPhy.lpTexName, filename)
+                             for lpPhy in c3_loader.m_phy if lpPhy is not None]
+                texture_futures = c3_texture.C3Texture.Texture_Preload(tex_paths)
+        
+        for phy_idx in range(c3_loader.m_dwPhyNum):
+            lpPhy = c3_loader.m_phy[phy_idx]
+            
+            if lpPhy is None:
+                continue
+            
+            # Store the original phy index
+            lpPhy.phy_index = phy_idx
+            
+            # Create a new collection for each m_phy
+            collection_name = lpPhy.lpName if lpPhy.lpName else f"C3_Phy_{phy_idx}"
+            new_collection = bpy.data.collections.new(collection_name)
+            file_collection.children.link(new_collection)
             
             mesh_name = lpPhy.lpName if lpPhy.lpName else f"C3_Mesh_{phy_idx}"
-            mesh = bpy.data.meshes.new(mesh_name)
+            phy_name = f"{phy_idx}:{mesh_name}"
+            # The PHY's own texture name first, then the file's base name as before
+            tex_path = c3_texture.C3Texture.Texture_Resolve(texture_index, lpPhy.lpTexName, filename)
+            
+            digest = None
+            mesh = None
+            if self.share_meshes:
+                with profiler.stage("digest", phy_name):
+                    digest = c3_phy.C3Phy.Phy_Digest(lpPhy, self.mesh_options(tex_path))
+                mesh = shared.get(digest)
+            reused = mesh is not None
+            if not reused:
+                mesh = bpy.data.meshes.new(mesh_name)
             obj = bpy.data.objects.new(mesh_name, mesh)
             
             # Store phy_index and source file path as custom properties on the object
@@ -96,6 +248,7 @@ class IMPORT_OT_c3_model(bpy.types.Operator, ImportHelper):
             obj["c3_motion_index"] = phy_idx
             obj["c3_phy_file"] = filepath
             obj["c3_motion_file"] = filepath
+            obj["c3_weld"] = self.weld_vertices
 
             # Link object to the new collection instead of scene collection
             new_collection.objects.link(obj)
@@ -103,48 +256,72 @@ class IMPORT_OT_c3_model(bpy.types.Operator, ImportHelper):
             obj.select_set(True)
             obj.rotation_euler = (math.radians(180), 0, math.radians(180))
 
-            if lpPhy.lpMotion:
-                c3_phy.C3Phy.Phy_Calculate(lpPhy)
+            lpLods.append((obj, lpPhy, phy_name))
             
-            vertices = []
-            for v in range(lpPhy.dwNVecCount + lpPhy.dwAVecCount):
-                if lpPhy.lpMotion:
-                    pos = lpPhy.outputVertices[v].Position
-                else:
-                    pos = lpPhy.lpVB[v].pos[0]
-                vertices.append((pos.x, pos.y, pos.z))
+            if reused:
+                # Shape keys, UVs and materials come with the mesh, only per-object state is set up
+                if lpPhy.lpMotion and lpPhy.lpMotion.dwFrames > 0:
+                    self.share_animation(context, obj, lpPhy)
+                    lpTracks.append((obj, lpPhy, phy_name))
+                yield file_collection
+                continue
             
-            faces = []
-            for i in range(0, len(lpPhy.lpIB), 3):
-                faces.append((lpPhy.lpIB[i], lpPhy.lpIB[i+1], lpPhy.lpIB[i+2]))
+            if digest is not None:
+                mesh["c3_digest"] = digest
+                shared[digest] = mesh
             
-            mesh.from_pydata(vertices, [], faces)
-            mesh.update()
+            with profiler.stage("skinning", phy_name):
+                if lpPhy.lpMotion:
+                    # Basis is frame 0 whatever frame the PHY was last calculated at
+                    c3_phy.C3Phy.Phy_SetFrame(lpPhy, 0)
+                    c3_phy.C3Phy.Phy_Calculate(lpPhy)
+            
+            with profiler.stage("mesh", phy_name):
+                if lpPhy.lpMotion:
+                    vertices = lpPhy.outputPositions.tolist()
+                else:
+                    vertices = lpPhy.lpPos.tolist()
+                
+                faces = []
+                for i in range(0, len(lpPhy.lpIB), 3):
+                    faces.append((lpPhy.lpIB[i], lpPhy.lpIB[i+1], lpPhy.lpIB[i+2]))
+                
+                mesh.from_pydata(vertices, [], faces)
+                mesh.update()
 
-            if lpPhy.lpVB:
-                uv_layer = mesh.uv_layers.new(name="UVMap")
-                for poly in mesh.polygons:
-                    for loop_idx in poly.loop_indices:
-                        vert_idx = mesh.loops[loop_idx].vertex_index
-                        if vert_idx < len(lpPhy.lpVB):
-                            uv_layer.data[loop_idx].uv = (lpPhy.lpVB[vert_idx].TexCoord.x, 1-lpPhy.lpVB[vert_idx].TexCoord.y)
+            with profiler.stage("uv", phy_name):
+                if lpPhy.lpVB:
+                    self.set_uvs(mesh, lpPhy)
             
-            base_path = os.path.dirname(filepath)
-            base_name = os.path.splitext(os.path.basename(filepath))[0]
+            with profiler.stage("texture", phy_name):
+                if tex_path and texture_futures is not None:
+                    texture_pending.append((obj, tex_path))
+                elif tex_path:
+                    self.apply_texture(obj, tex_path)
             
-            tex_path = None
-            for ext in ['.dds', '.tga', '.png', '.jpg']:
-                test_path = os.path.join(base_path, base_name + ext)
-                if os.path.exists(test_path):
-                    tex_path = test_path
-                    break
+            yield file_collection
             
-            if tex_path:
-                self.apply_texture(obj, tex_path)
-            
-                # Bake mesh to shape keys for animation
-            if lpPhy.lpMotion and lpPhy.lpMotion.dwFrames > 0:
-               self.bake_mesh_to_shape_keys(obj, lpPhy)
+            # Bake mesh to shape keys for animation
+            bake_mode = self.bake_mode
+            if lpPhy.lpMotion and lpPhy.lpMotion.dwFrames > 0 and bake_mode == 'GEOMETRY_NODES':
+                with profiler.stage("bake.geometry_nodes", phy_name):
+                    try:
+                        c3_bake.C3Bake.Bake_GeometryNodes(obj, lpPhy)
+                        context.scene.frame_end = lpPhy.lpMotion.dwFrames - 1
+                        lpTracks.append((obj, lpPhy, phy_name))
+                    except ValueError as e:
+                        self.report({'WARNING'}, f"No Geometry Nodes skinning for {mesh_name} ({e}), baking it to shape keys")
+                        bake_mode = 'FRAMES'
+            if lpPhy.lpMotion and lpPhy.lpMotion.dwFrames > 0 and bake_mode == 'LIVE':
+                c3_live.C3Live.Live_Add(obj, lpPhy)
+                context.scene.frame_end = lpPhy.lpMotion.dwFrames - 1
+                lpTracks.append((obj, lpPhy, phy_name))
+            elif lpPhy.lpMotion and lpPhy.lpMotion.dwFrames > 0 and bake_mode != 'GEOMETRY_NODES':
+                for _ in c3_bake.C3Bake.Bake_ShapeKeysIter(obj, lpPhy, self.dedupe_tolerance, self.static_epsilon, bake_mode, profiler, phy_name):
+                    yield file_collection
+                with profiler.stage("bake.morphs", phy_name):
+                    c3_bake.C3Bake.Bake_Morphs(obj, lpPhy)
+                lpTracks.append((obj, lpPhy, phy_name))
            
             # if lpPhy.lpMotion and lpPhy.lpMotion.dwBoneCount > 0:
             #     armature = self.create_armature(context, lpPhy, mesh_name, new_collection)
@@ -153,10 +330,43 @@ class IMPORT_OT_c3_model(bpy.types.Operator, ImportHelper):
             #         armature["c3_phy_index"] = phy_idx
             #         self.skin_mesh_to_armature(obj, armature, lpPhy)
             #         self.create_animation(armature, lpPhy)
-                
+        
+        if texture_futures is not None:
+            with profiler.stage("texture_batch"):
+                failed = c3_texture.C3Texture.Texture_ApplyBatch(texture_pending, texture_futures, "C3_Material")
+            for tex_path, reason in failed:
+                self.report({'WARNING'}, f"Skipped texture {tex_path}: {reason}")
+        
+        # Key tracks animate the material, so they wait for the textures
+        for obj, lpPhy, phy_name in lpTracks:
+            with profiler.stage("bake.tracks", phy_name):
+                c3_bake.C3Bake.Bake_Tracks(obj, lpPhy)
+        
+        # LODs copy the finished shape keys and materials
+        if self.lod_count > 0 and self.bake_mode != 'LIVE':
+            for obj, lpPhy, phy_name in lpLods:
+                with profiler.stage("lod", phy_name):
+                    c3_lod.C3Lod.Lod_Create(obj, lpPhy, self.lod_count, self.lod_ratio, shared)
+            c3_lod.C3Lod.Lod_Update(context.scene)
+    
+    def mesh_options(self, tex_path):
+        # Options that change what a PHY's mesh data-block holds, part of its fingerprint
+        return repr((tex_path, self.bake_mode, self.dedupe_tolerance, self.static_epsilon, self.weld_vertices))
+    
+    def share_animation(self, context, obj, lpPhy):
+        # A new object on an existing mesh: shape keys and their action are already on the
+        # mesh, Live and Geometry Nodes skinning still need their per-object part
+        group = bpy.data.node_groups.get(obj.data.get("c3_skin_group", ""))
+        if group is not None:
+            obj.modifiers.new("C3 Skinning", 'NODES').node_group = group
+        elif self.bake_mode == 'LIVE':
+            c3_live.C3Live.Live_Add(obj, lpPhy)
+        context.scene.frame_end = lpPhy.lpMotion.dwFrames - 1
+    
+    def finish_import(self, context, file_collection):
         self.set_texture_view(context=context)     
         #Exclude from active view layer (strongest "disable")        
-        layer_coll = context.view_layer.layer_collection.children.get(filename)
+        layer_coll = context.view_layer.layer_collection.children.get(file_collection.name) if file_collection else None
         if layer_coll:
             layer_coll.exclude = True
             for child_name, child_coll in layer_coll.children.items():
@@ -171,15 +381,13 @@ class IMPORT_OT_c3_model(bpy.types.Operator, ImportHelper):
                             # Optionally set one as active
                             bpy.context.view_layer.objects.active = obj
 
-
-
-        bpy.ops.screen.animation_play()
-                
-        self.report({'INFO'}, f"Imported C3 model: {filepath}")
-        return {'FINISHED'}
+        if context.screen is not None:
+            bpy.ops.screen.animation_play()
         
     def set_texture_view(self, context=None):
         ctx = context or bpy.context
+        if ctx.screen is None:
+            return
         for area in ctx.screen.areas:
             if area.type == 'VIEW_3D':
                 for space in area.spaces:
@@ -189,19 +397,19 @@ class IMPORT_OT_c3_model(bpy.types.Operator, ImportHelper):
                         space.region_3d.view_perspective = 'ORTHO'                        
         
     def apply_texture(self, obj, tex_path):
-        mat = bpy.data.materials.new(name="C3_Material")
-        mat.use_nodes = True
-        bsdf = mat.node_tree.nodes["Principled BSDF"]
-        
-        tex_image = mat.node_tree.nodes.new('ShaderNodeTexImage')
-        tex_image.image = bpy.data.images.load(tex_path)
-        
-        mat.node_tree.links.new(bsdf.inputs['Base Color'], tex_image.outputs['Color'])
-        
-        if obj.data.materials:
-            obj.data.materials[0] = mat
+        c3_texture.C3Texture.Texture_Apply(obj, tex_path, "C3_Material")
+    
+    def set_uvs(self, mesh, lpPhy):
+        # Welded PHYs carry one UV per lpIB entry, which is the loop order from_pydata creates
+        if lpPhy.lpLoopTexCoord is not None:
+            uvs = lpPhy.lpLoopTexCoord.copy()
         else:
-            obj.data.materials.append(mat)
+            loops = np.empty(len(mesh.loops), dtype=np.int32)
+            mesh.loops.foreach_get("vertex_index", loops)
+            uvs = lpPhy.lpTexCoord[loops]
+        uvs[:, 1] = 1 - uvs[:, 1]
+        uv_layer = mesh.uv_layers.new(name="UVMap")
+        uv_layer.data.foreach_set("uv", uvs.ravel())
     
     def create_armature(self, context, lpPhy, mesh_name, collection):
         armature_data = bpy.data.armatures.new(f"{mesh_name}_Armature")
@@ -312,42 +520,168 @@ class IMPORT_OT_c3_model(bpy.types.Operator, ImportHelper):
         # Set the scene end frame to the maximum frame from the motion
         max_frame = lpPhy.lpMotion.dwFrames - 1
         bpy.context.scene.frame_end = max_frame
-    
-    def bake_mesh_to_shape_keys(self, obj, lpPhy):
-        if not lpPhy.lpMotion or lpPhy.lpMotion.dwFrames == 0:
-            return        
-        scene = bpy.context.scene
-
-        # Ensure Basis exists
-        if not obj.data.shape_keys:
-            obj.shape_key_add(name="Basis")
 
-        for frame in range(lpPhy.lpMotion.dwFrames+1):
-            scene.frame_set(frame)
-
-            # Create shape key for this frame
-            sk = obj.shape_key_add(name=f"Frame_{frame}", from_mix=False)
-
-            c3_phy.C3Phy.Phy_SetFrame(lpPhy, frame)
-            c3_phy.C3Phy.Phy_Calculate(lpPhy)
-
-            for i, v in enumerate(lpPhy.outputVertices):
-               sk.data[i].co = v.Position
-
-            # Keyframe shape key value
-            sk.value = 0.0
-            sk.keyframe_insert(data_path="value", frame=frame - 1)
+class IMPORT_OT_c3_model(bpy.types.Operator, C3ModelImport):
+    bl_idname = "import_scene.c3_model"
+    bl_label = "Import .C3 Model"
+    bl_options = {'REGISTER', 'UNDO'}
 
-            sk.value = 1.0
-            sk.keyframe_insert(data_path="value", frame=frame)
+    def execute(self, context):
+        context = self.prepare_scene(context)
+        
+        profiler = c3_profile.C3Profiler(self.profile_import, self.profile_cprofile)
+        profiler.Profile_Start()
+        try:
+            result = self.import_c3_model(context, self.filepath, profiler)
+        finally:
+            profiler.Profile_Stop()
+        
+        if self.profile_import:
+            profile_path = profiler.Profile_Dump(self.filepath)
+            for line in profiler.Profile_Summary():
+                self.report({'INFO'}, line)
+            self.report({'INFO'}, f"Import profile written to {profile_path}")
+        
+        return result
 
-            sk.value = 0.0
-            sk.keyframe_insert(data_path="value", frame=frame + 1)
+class IMPORT_OT_c3_model_modal(bpy.types.Operator, C3ModelImport):
+    """Import a C3 model without blocking the UI, press Esc to cancel"""
+    bl_idname = "import_scene.c3_model_modal"
+    bl_label = "Import .C3 Model (Background)"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    # Seconds of data-block work per timer tick, the rest of the time goes to the UI
+    time_slice = 0.05
+    # Data-blocks the import may add besides objects, meshes and collections, removed on
+    # cancel in this order so each one's users are gone before it is checked
+    cancel_types = ("materials", "node_groups", "images", "actions")
+    
+    def execute(self, context):
+        # Whatever exists now (cached images and materials included) survives a cancel
+        self._existing = {attr: set(getattr(bpy.data, attr)) for attr in self.cancel_types}
+        self._previous_scene = context.window.scene
+        context = self.prepare_scene(context)
+        self._scene = context.window.scene if context.window.scene != self._previous_scene else None
+        
+        # cProfile runs only in the timer slices here, the parse worker has a profiler of its
+        # own that is merged in once it finishes (an abandoned worker's is dropped)
+        self._profiler = c3_profile.C3Profiler(self.profile_import, self.profile_cprofile)
+        self._profiler.Profile_Start(bSliced=True)
+        self._parse_profiler = c3_profile.C3Profiler(self.profile_import, self.profile_cprofile)
+        self._parsed = {}
+        self._steps = None
+        self._file_collection = None
+        self._done = 0
+        
+        # Parsing is bpy-free, so it runs in a worker while the UI stays live
+        self._thread = threading.Thread(
+            target=self.parse_worker, args=(self.filepath, self._parse_profiler, self._parsed, self.weld_vertices), daemon=True
+        )
+        self._thread.start()
+        
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.01, window=context.window)
+        wm.modal_handler_add(self)
+        wm.progress_begin(0, 1)
+        return {'RUNNING_MODAL'}
+    
+    @staticmethod
+    def parse_worker(filepath, profiler, parsed, bWeld):
+        profiler.Profile_Start()
+        try:
+            parsed["loaded"], parsed["loader"] = C3ModelImport.load_c3_model(filepath, profiler, bWeld)
+        except Exception as e:
+            parsed["error"] = str(e)
+            parsed["loaded"] = False
+        finally:
+            profiler.Profile_Stop()
+    
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.cancel(context)
+            self.report({'WARNING'}, "C3 import cancelled")
+            return {'CANCELLED'}
+        
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+        
+        wm = context.window_manager
+        if self._steps is None:
+            if self._thread.is_alive():
+                return {'PASS_THROUGH'}
+            self._profiler.Profile_Merge(self._parse_profiler)
             
-        max_frame = lpPhy.lpMotion.dwFrames - 1
-        bpy.context.scene.frame_end = max_frame
-        # bpy.context.scene.render.fps = 10
-        # bpy.context.scene.render.fps_base = 1.0
+            if not self._parsed.get("loaded"):
+                self.end_modal(context)
+                self.report({'ERROR'}, self._parsed.get("error", "Failed to load C3 file"))
+                return {'CANCELLED'}
+            
+            c3_loader = self._parsed["loader"]
+            wm.progress_end()
+            wm.progress_begin(0, max(self.import_work(c3_loader), 1))
+            # The steps resume on later timer events, so they must not hold on to this context
+            self._steps = self.iter_import_c3_model(bpy.context, self.filepath, c3_loader, self._profiler)
+        
+        deadline = time.perf_counter() + self.time_slice
+        bFinished = False
+        with self._profiler.Profile_Slice():
+            try:
+                while time.perf_counter() < deadline:
+                    self._file_collection = next(self._steps)
+                    self._done += 1
+            except StopIteration:
+                self.finish_import(context, self._file_collection)
+                bFinished = True
+        if bFinished:
+            self.end_modal(context)
+            self.report({'INFO'}, f"Imported C3 model: {self.filepath}")
+            return {'FINISHED'}
+        
+        wm.progress_update(self._done)
+        return {'RUNNING_MODAL'}
+    
+    def end_modal(self, context):
+        if self._timer is None:
+            return
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        self._timer = None
+        wm.progress_end()
+        self._profiler.Profile_Stop()
+        if self.profile_import:
+            profile_path = self._profiler.Profile_Dump(self.filepath)
+            for line in self._profiler.Profile_Summary():
+                self.report({'INFO'}, line)
+            self.report({'INFO'}, f"Import profile written to {profile_path}")
+    
+    def cancel(self, context):
+        # Drop everything created so far, the worker thread (if still parsing) is simply abandoned
+        if self._steps is not None:
+            self._steps.close()
+        self.end_modal(context)
+        
+        if self._file_collection is not None:
+            collections = [self._file_collection] + list(self._file_collection.children_recursive)
+            objects = list(self._file_collection.all_objects)
+            # Meshes shared with objects outside this import stay
+            users = {}
+            for obj in objects:
+                if obj.type == 'MESH':
+                    users[obj.data] = users.get(obj.data, 0) + 1
+            meshes = [mesh for mesh, count in users.items() if mesh.users <= count]
+            bpy.data.batch_remove(objects + meshes + collections)
+            self._file_collection = None
+        
+        # Actions, track materials, textures and skinning data this import created and
+        # nothing uses any more (anything the user made meanwhile and uses stays)
+        for attr in self.cancel_types:
+            created = [data for data in getattr(bpy.data, attr) if data not in self._existing[attr] and data.users == 0]
+            if created:
+                bpy.data.batch_remove(created)
+        if self._scene is not None and context.window is not None:
+            context.window.scene = self._previous_scene
+            bpy.data.scenes.remove(self._scene)
+            self._scene = None
 
 class IMPORT_OT_c3_texture(bpy.types.Operator, ImportHelper):
     bl_idname = "import_scene.c3_texture"
@@ -364,19 +698,7 @@ class IMPORT_OT_c3_texture(bpy.types.Operator, ImportHelper):
             self.report({'ERROR'}, "No mesh object selected")
             return {'CANCELLED'}
         
-        mat = bpy.data.materials.new(name="C3_Custom_Material")
-        mat.use_nodes = True
-        bsdf = mat.node_tree.nodes["Principled BSDF"]
-        
-        tex_image = mat.node_tree.nodes.new('ShaderNodeTexImage')
-        tex_image.image = bpy.data.images.load(self.filepath)
-        
-        mat.node_tree.links.new(bsdf.inputs['Base Color'], tex_image.outputs['Color'])
-        
-        if obj.data.materials:
-            obj.data.materials[0] = mat
-        else:
-            obj.data.materials.append(mat)
+        c3_texture.C3Texture.Texture_Apply(obj, self.filepath, "C3_Custom_Material")
         
         self.report({'INFO'}, f"Applied texture: {self.filepath}")
         return {'FINISHED'}
@@ -394,6 +716,31 @@ class IMPORT_OT_c3_animation(bpy.types.Operator, ImportHelper):
         description="Use the original C3 file from model import instead of selecting a new one",
         default=True
     )
+    dedupe_tolerance: FloatProperty(
+        name="Merge Tolerance",
+        description="Reuse an earlier frame's shape key when every vertex is within this distance of it (0 reuses exact repeats only)",
+        default=0.0001,
+        min=0.0,
+        precision=6
+    )
+    static_epsilon: FloatProperty(
+        name="Static Epsilon",
+        description="Skip shape keys whose largest displacement from Basis is below this distance (0 keeps every frame)",
+        default=0.0,
+        min=0.0,
+        precision=6
+    )
+    bake_mode: EnumProperty(
+        name="Bake",
+        description="Which frames get a shape key",
+        items=[
+            ('FRAMES', "Every Frame", "Store a shape key for every frame of the motion"),
+            ('KEYFRAMES', "Keyframes Only", "Store shape keys only at the motion's keyframes and let linear blending rebuild the frames in between"),
+            ('LIVE', "Live", "Store no shape keys, skin the current frame into the mesh whenever the frame changes"),
+            ('GEOMETRY_NODES', "Geometry Nodes", "Store the bone matrices of every frame in an image and skin with a generated Geometry Nodes modifier (Blender 3.2+)"),
+        ],
+        default='FRAMES'
+    )
     
     def execute(self, context):
         obj = context.active_object
@@ -413,8 +760,6 @@ class IMPORT_OT_c3_animation(bpy.types.Operator, ImportHelper):
         phy_index = obj.get("c3_phy_index", 0)
         motion_index = obj.get("c3_motion_index", 0)
         
-        obj["c3_motion_file"] = model_file
-
         # Load the C3 file
         c3_loader = c3_phy.C3Phy()        
         if not c3_loader.C3_Load(model_file):
@@ -445,65 +790,65 @@ class IMPORT_OT_c3_animation(bpy.types.Operator, ImportHelper):
             self.report({'ERROR'}, f"Phy at index {phy_index} is None")
             return {'CANCELLED'}
         
-        if phy_index < motion_loader.m_dwMotionNum:
+        # The new motion must not change other objects sharing this mesh
+        if obj.data.users > 1:
+            obj.data = obj.data.copy()
+            if obj.data.shape_keys is not None:
+                c3_bake.C3Bake.Bake_OwnAction(obj.data.shape_keys)
+        if "c3_digest" in obj.data:
+            del obj.data["c3_digest"]
+        
+        # Shape keys and live meshes need the same vertex layout the model was imported with
+        if obj.get("c3_weld"):
+            c3_phy.C3Phy.Phy_Weld(lpPhy)
+        
+        if phy_index < motion_loader.m_dwMotionNum and motion_loader.m_motion[motion_index] is not None:
             lpPhy.lpMotion = motion_loader.m_motion[motion_index]
         else:
             self.report({'ERROR'}, f"No motion data for motion index {motion_index}")
             return {'CANCELLED'}
+        # Live rebuilds and the exporter reload the motion from here
+        obj["c3_motion_file"] = animation_file
 
         if lpPhy.lpMotion:
+            c3_phy.C3Phy.Phy_SetFrame(lpPhy, 0)
             c3_phy.C3Phy.Phy_Calculate(lpPhy)
         
-        # Clear existing shape keys except Basis
-        if obj.data.shape_keys:
-            # Remove all shape keys except Basis
-            shape_keys_to_remove = [sk for sk in obj.data.shape_keys.key_blocks if sk.name != "Basis"]
-            for sk in shape_keys_to_remove:
-                obj.shape_key_remove(sk)
-        
-        # Bake new animation to shape keys
-        if lpPhy.lpMotion and lpPhy.lpMotion.dwFrames > 0:
-            self.bake_mesh_to_shape_keys(obj, lpPhy)
-            self.report({'INFO'}, f"Imported animation with {lpPhy.lpMotion.dwFrames} frames")
-        else:
+        if not lpPhy.lpMotion or lpPhy.lpMotion.dwFrames == 0:
             self.report({'WARNING'}, "No animation frames found")
             return {'CANCELLED'}
         
+        if self.bake_mode != 'GEOMETRY_NODES' and "C3 Skinning" in obj.modifiers:
+            obj.modifiers.remove(obj.modifiers["C3 Skinning"])
+        
+        if self.bake_mode == 'GEOMETRY_NODES':
+            # The modifier skins the rest positions, shape keys would be applied before it
+            obj.shape_key_clear()
+            c3_live.C3Live.Live_Remove(obj)
+            try:
+                c3_bake.C3Bake.Bake_GeometryNodes(obj, lpPhy)
+            except ValueError as e:
+                self.report({'ERROR'}, f"No Geometry Nodes skinning: {e}")
+                return {'CANCELLED'}
+            context.scene.frame_end = lpPhy.lpMotion.dwFrames - 1
+            c3_bake.C3Bake.Bake_Tracks(obj, lpPhy)
+            self.report({'INFO'}, f"Skinning animation with {lpPhy.lpMotion.dwFrames} frames in Geometry Nodes")
+        elif self.bake_mode == 'LIVE':
+            # Live objects must not have shape keys, Basis would override the mesh positions
+            obj.shape_key_clear()
+            c3_live.C3Live.Live_Add(obj, lpPhy)
+            context.scene.frame_end = lpPhy.lpMotion.dwFrames - 1
+            c3_bake.C3Bake.Bake_Tracks(obj, lpPhy)
+            self.report({'INFO'}, f"Playing animation with {lpPhy.lpMotion.dwFrames} frames live")
+        else:
+            # Bake new animation to shape keys, reusing the Frame_ keys of the previous bake
+            c3_live.C3Live.Live_Remove(obj)
+            c3_bake.C3Bake.Bake_ShapeKeys(obj, lpPhy, self.dedupe_tolerance, self.static_epsilon, self.bake_mode)
+            c3_bake.C3Bake.Bake_Morphs(obj, lpPhy)
+            c3_bake.C3Bake.Bake_Tracks(obj, lpPhy)
+            self.report({'INFO'}, f"Imported animation with {lpPhy.lpMotion.dwFrames} frames")
+        
         return {'FINISHED'}
-    
-    def bake_mesh_to_shape_keys(self, obj, lpPhy):
-        if not lpPhy.lpMotion or lpPhy.lpMotion.dwFrames == 0:
-            return        
-        scene = bpy.context.scene
-
-        # Ensure Basis exists
-        if not obj.data.shape_keys:
-            obj.shape_key_add(name="Basis")
-
-        for frame in range(lpPhy.lpMotion.dwFrames+1):
-            scene.frame_set(frame)
-
-            # Create shape key for this frame
-            sk = obj.shape_key_add(name=f"Frame_{frame}", from_mix=False)
-
-            c3_phy.C3Phy.Phy_SetFrame(lpPhy, frame)
-            c3_phy.C3Phy.Phy_Calculate(lpPhy)
-
-            for i, v in enumerate(lpPhy.outputVertices):
-               sk.data[i].co = v.Position
-
-            # Keyframe shape key value
-            sk.value = 0.0
-            sk.keyframe_insert(data_path="value", frame=frame - 1)
-
-            sk.value = 1.0
-            sk.keyframe_insert(data_path="value", frame=frame)
-
-            sk.value = 0.0
-            sk.keyframe_insert(data_path="value", frame=frame + 1)
-            
-        max_frame = lpPhy.lpMotion.dwFrames - 1
-        bpy.context.scene.frame_end = max_frame
 
 class IMPORT_OT_c3_parts(bpy.types.Operator, ImportHelper):
     """Load C3 part to replace existing mesh by name"""
@@ -562,10 +907,11 @@ class IMPORT_OT_c3_parts(bpy.types.Operator, ImportHelper):
                 target_collection = collection
                 break
         
-        # Try to get motion from original file if stored
+        # Try to get motion from original file if stored, decoded motions and their
+        # bone palettes are kept for the session so repeated swaps only skin the new part
         if stored_motion_file:
-            original_loader = c3_motion.C3Motion()
-            if original_loader.C3_Load(stored_motion_file):
+            original_loader = c3_motion.C3Motion.C3_LoadCached(stored_motion_file)
+            if original_loader is not None:
                 if stored_motion_index < original_loader.m_dwMotionNum:
                     stored_motion = original_loader.m_motion[stored_motion_index]                    
         
@@ -584,18 +930,16 @@ class IMPORT_OT_c3_parts(bpy.types.Operator, ImportHelper):
             target_phy.lpMotion.matrix = [Matrix.Identity(4)]
             target_phy.lpMotion.nFrame = 0
         
-        # Calculate vertices with motion
+        # Calculate vertices with motion at frame 0
         if target_phy.lpMotion:
+            c3_phy.C3Phy.Phy_SetFrame(target_phy, 0)
             c3_phy.C3Phy.Phy_Calculate(target_phy)
         
         # Build vertex list
-        vertices = []
-        for v in range(target_phy.dwNVecCount + target_phy.dwAVecCount):
-            if target_phy.lpMotion:
-                pos = target_phy.outputVertices[v].Position
-            else:
-                pos = target_phy.lpVB[v].pos[0]
-            vertices.append((pos.x, pos.y, pos.z))
+        if target_phy.lpMotion:
+            vertices = target_phy.outputPositions.tolist()
+        else:
+            vertices = target_phy.lpPos.tolist()
         
         # Build face list
         faces = []
@@ -626,8 +970,9 @@ class IMPORT_OT_c3_parts(bpy.types.Operator, ImportHelper):
         if old_mesh.users == 0:
             bpy.data.meshes.remove(old_mesh)
         
-        # Maintain object properties
+        # Maintain object properties, the new part is built unwelded
         target_obj["c3_phy_index"] = 0
+        target_obj["c3_weld"] = False
         target_obj["c3_motion_index"] = stored_motion_index
         if stored_source_file:
             target_obj["c3_phy_file"] = self.filepath
@@ -636,15 +981,10 @@ class IMPORT_OT_c3_parts(bpy.types.Operator, ImportHelper):
         
         # Load and apply texture if requested
         if self.load_texture:
-            base_path = os.path.dirname(self.filepath)
             base_name = os.path.splitext(os.path.basename(self.filepath))[0]
-            
-            tex_path = None
-            for ext in ['.dds', '.tga', '.png', '.jpg']:
-                test_path = os.path.join(base_path, base_name + ext)
-                if os.path.exists(test_path):
-                    tex_path = test_path
-                    break
+            texture_dirs = [os.path.dirname(self.filepath)] + c3_texture.C3Texture.Texture_Roots(context)
+            texture_index = c3_texture.C3Texture.Texture_BuildIndex(texture_dirs)
+            tex_path = c3_texture.C3Texture.Texture_Resolve(texture_index, target_phy.lpTexName, base_name)
             
             if tex_path:
                 self.apply_texture(target_obj, tex_path)
@@ -659,7 +999,7 @@ class IMPORT_OT_c3_parts(bpy.types.Operator, ImportHelper):
         #             target_obj.shape_key_remove(sk)
             
         #     # Bake animation to shape keys
-        #     self.bake_mesh_to_shape_keys(target_obj, target_phy)
+        #     c3_bake.C3Bake.Bake_ShapeKeys(target_obj, target_phy)
         #     self.report({'INFO'}, f"Rebaked animation with {stored_motion.dwFrames} frames")
         
         self.report({'INFO'}, f"Replaced mesh part: {mesh_name}")
@@ -667,63 +1007,214 @@ class IMPORT_OT_c3_parts(bpy.types.Operator, ImportHelper):
     
     def apply_texture(self, obj, tex_path):
         """Apply texture to the object"""
-        mat = bpy.data.materials.new(name="C3_Part_Material")
-        mat.use_nodes = True
-        bsdf = mat.node_tree.nodes["Principled BSDF"]
-        
-        tex_image = mat.node_tree.nodes.new('ShaderNodeTexImage')
-        tex_image.image = bpy.data.images.load(tex_path)
+        c3_texture.C3Texture.Texture_Apply(obj, tex_path, "C3_Part_Material")
+
+class EXPORT_OT_c3_model(bpy.types.Operator, ExportHelper):
+    """Write the selected C3 objects back into a copy of the file they were imported from"""
+    bl_idname = "export_scene.c3_model"
+    bl_label = "Export .C3 Model"
+    bl_options = {'REGISTER'}
+    
+    filename_ext = ".c3"
+    filter_glob: StringProperty(default="*.c3", options={'HIDDEN'})
+    
+    retime_motions: BoolProperty(
+        name="Retime Motions",
+        description="Stretch every motion by the scene's Time Stretching (Output > Frame Range, New / Old)",
+        default=False
+    )
+    optimize_motions: BoolProperty(
+        name="Recompress Motions",
+        description="Rewrite motions as ZKEY quaternion keys, dropping keyframes that interpolation reproduces within the tolerance",
+        default=False
+    )
+    motion_tolerance: FloatProperty(
+        name="Motion Tolerance",
+        description="Largest bone matrix difference from the original motion allowed on any frame",
+        default=0.01,
+        min=0.0,
+        precision=4
+    )
+    
+    @staticmethod
+    def export_objects(context):
+        # LOD copies have no PHY of their own
+        return [obj for obj in context.selected_objects
+                if obj.type == 'MESH' and "c3_phy_file" in obj and not obj.get("c3_lod")]
+    
+    def invoke(self, context, event):
+        objects = self.export_objects(context)
+        if objects and not self.filepath:
+            self.filepath = bpy.path.abspath(objects[0]["c3_phy_file"])
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+    
+    def execute(self, context):
+        objects = self.export_objects(context)
+        if not objects:
+            self.report({'ERROR'}, "No imported C3 objects selected")
+            return {'CANCELLED'}
         
-        mat.node_tree.links.new(bsdf.inputs['Base Color'], tex_image.outputs['Color'])
+        render = context.scene.render
+        time_scale = render.frame_map_new / render.frame_map_old if self.retime_motions else 1.0
+        start = time.perf_counter()
+        try:
+            count, reports = c3_export.C3Export.Export_Objects(objects, self.filepath, context.scene.frame_current,
+                                                               self.motion_tolerance if self.optimize_motions else None,
+                                                               time_scale)
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"Export failed: {e}")
+            return {'CANCELLED'}
         
-        if obj.data.materials:
-            obj.data.materials[0] = mat
-        else:
-            obj.data.materials.append(mat)
-    
-    def bake_mesh_to_shape_keys(self, obj, lpPhy):
-        """Bake animation frames to shape keys"""
-        if not lpPhy.lpMotion or lpPhy.lpMotion.dwFrames == 0:
-            return        
-        scene = bpy.context.scene
-
-        # Ensure Basis exists
-        if not obj.data.shape_keys:
-            obj.shape_key_add(name="Basis")
-
-        for frame in range(lpPhy.lpMotion.dwFrames + 1):
-            scene.frame_set(frame)
-
-            # Create shape key for this frame
-            sk = obj.shape_key_add(name=f"Frame_{frame}", from_mix=False)
-
-            c3_phy.C3Phy.Phy_SetFrame(lpPhy, frame)
-            c3_phy.C3Phy.Phy_Calculate(lpPhy)
-
-            for i, v in enumerate(lpPhy.outputVertices):
-                sk.data[i].co = v.Position
-
-            # Keyframe shape key value
-            sk.value = 0.0
-            sk.keyframe_insert(data_path="value", frame=frame - 1)
+        for n, report in enumerate(reports):
+            if report["error"]:
+                self.report({'WARNING'}, f"Motion {n} not {'recompressed' if report['retimed'] else 'changed'}: {report['error']}")
+        if reports and time_scale != 1.0:
+            retimed = sum(1 for report in reports if report["retimed"])
+            self.report({'INFO'}, f"Retimed {retimed} of {len(reports)} motions by {time_scale:g}")
+        if reports and self.optimize_motions:
+            replaced = [report for report in reports if report["replaced"]]
+            before = sum(report["bytes_before"] for report in reports)
+            after = sum(report["bytes_after"] for report in reports)
+            max_error = max((report["max_error"] for report in replaced), default=0.0)
+            self.report({'INFO'}, f"Recompressed {len(replaced)} of {len(reports)} motions: {before} -> {after} bytes, max error {max_error:.6f}")
+        self.report({'INFO'}, f"Exported {count} PHY(s) to {self.filepath} in {time.perf_counter() - start:.2f}s")
+        return {'FINISHED'}
 
-            sk.value = 1.0
-            sk.keyframe_insert(data_path="value", frame=frame)
+class IMPORT_OT_c3_library(bpy.types.Operator):
+    """Index the .c3 files of a folder and optionally make it a Blender asset library"""
+    bl_idname = "import_scene.c3_library"
+    bl_label = "Index .C3 Library"
+    bl_options = {'REGISTER'}
+    
+    directory: StringProperty(subtype='DIR_PATH')
+    filter_folder: BoolProperty(default=True, options={'HIDDEN'})
+    
+    jobs: IntProperty(
+        name="Processes",
+        description="Worker processes scanning changed files (0 uses one per CPU)",
+        default=0,
+        min=0
+    )
+    build_assets: BoolProperty(
+        name="Asset Library",
+        description="Write c3_library.blend and the catalogs into the folder and add it to the asset libraries",
+        default=True
+    )
+    
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+    
+    def execute(self, context):
+        root = bpy.path.abspath(self.directory)
+        if not os.path.isdir(root):
+            self.report({'ERROR'}, f"Not a folder: {root}")
+            return {'CANCELLED'}
+        
+        start = time.perf_counter()
+        try:
+            files, changed, removed = c3_library.C3Library.Library_Update(root, self.jobs or None)
+            self.report({'INFO'}, f"Indexed {len(files)} files ({len(changed)} scanned, {removed} removed)")
+            if self.build_assets:
+                count = c3_library.C3Library.Library_Build(root, files, changed)
+                library = c3_library.C3Library.Library_Register(context, root)
+                self.report({'INFO'}, f"{count} assets in asset library '{library.name}'")
+        except (OSError, RuntimeError) as e:
+            self.report({'ERROR'}, f"Indexing failed: {e}")
+            return {'CANCELLED'}
+        
+        bad = sum(1 for entry in files.values() if entry["errors"])
+        if bad:
+            self.report({'WARNING'}, f"{bad} files have errors and were left out of the asset library")
+        self.report({'INFO'}, f"Library updated in {time.perf_counter() - start:.2f}s")
+        return {'FINISHED'}
 
-            sk.value = 0.0
-            sk.keyframe_insert(data_path="value", frame=frame + 1)
+class IMPORT_OT_c3_library_previews(bpy.types.Operator):
+    """Use each model's texture as the preview of the assets of an indexed folder that have none"""
+    bl_idname = "import_scene.c3_library_previews"
+    bl_label = "Make C3 Library Previews"
+    bl_options = {'REGISTER'}
+    
+    directory: StringProperty(subtype='DIR_PATH')
+    filter_folder: BoolProperty(default=True, options={'HIDDEN'})
+    
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+    
+    def execute(self, context):
+        root = bpy.path.abspath(self.directory)
+        if not os.path.isfile(os.path.join(root, c3_library.LIBRARY_NAME)):
+            self.report({'ERROR'}, f"No {c3_library.LIBRARY_NAME} in {root}, index it with an asset library first")
+            return {'CANCELLED'}
         
-        max_frame = lpPhy.lpMotion.dwFrames - 1
-        bpy.context.scene.frame_end = max_frame
+        start = time.perf_counter()
+        try:
+            made, missing = c3_library.C3Library.Library_Previews(root, c3_texture.C3Texture.Texture_Roots(context))
+        except (OSError, RuntimeError) as e:
+            self.report({'ERROR'}, f"Making previews failed: {e}")
+            return {'CANCELLED'}
+        
+        if missing:
+            self.report({'WARNING'}, f"{missing} assets have no texture to use as a preview")
+        self.report({'INFO'}, f"Made {made} previews in {time.perf_counter() - start:.2f}s")
+        return {'FINISHED'}
+
+class IMPORT_OT_c3_assets(bpy.types.Operator):
+    """Replace the selected C3 asset placeholders with the models they stand for"""
+    bl_idname = "import_scene.c3_assets"
+    bl_label = "Import C3 Assets"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    @classmethod
+    def poll(cls, context):
+        return any("c3_asset" in obj for obj in context.selected_objects)
+    
+    def execute(self, context):
+        placeholders = [obj for obj in context.selected_objects if "c3_asset" in obj]
+        imported = 0
+        for placeholder in placeholders:
+            filepath = placeholder["c3_source_file"]
+            location = placeholder.matrix_world.translation.copy()
+            before = set(bpy.data.objects)
+            try:
+                result = bpy.ops.import_scene.c3_model(filepath=filepath, create_new_scene=False)
+            except RuntimeError as e:
+                self.report({'WARNING'}, f"{placeholder.name}: {e}")
+                continue
+            if 'FINISHED' not in result:
+                continue
+            
+            for obj in set(bpy.data.objects) - before:
+                if obj.parent is None:
+                    obj.location += location
+            bpy.data.objects.remove(placeholder)
+            imported += 1
+        
+        self.report({'INFO'}, f"Imported {imported} of {len(placeholders)} C3 assets")
+        return {'FINISHED'} if imported else {'CANCELLED'}
 
 def register():
     bpy.utils.register_class(IMPORT_OT_c3_model)
+    bpy.utils.register_class(IMPORT_OT_c3_model_modal)
     bpy.utils.register_class(IMPORT_OT_c3_texture)
     bpy.utils.register_class(IMPORT_OT_c3_animation)
     bpy.utils.register_class(IMPORT_OT_c3_parts)
+    bpy.utils.register_class(EXPORT_OT_c3_model)
+    bpy.utils.register_class(IMPORT_OT_c3_library)
+    bpy.utils.register_class(IMPORT_OT_c3_library_previews)
+    bpy.utils.register_class(IMPORT_OT_c3_assets)
 
 def unregister():
+    bpy.utils.unregister_class(IMPORT_OT_c3_assets)
+    bpy.utils.unregister_class(IMPORT_OT_c3_library_previews)
+    bpy.utils.unregister_class(IMPORT_OT_c3_library)
+    bpy.utils.unregister_class(EXPORT_OT_c3_model)
     bpy.utils.unregister_class(IMPORT_OT_c3_parts)
     bpy.utils.unregister_class(IMPORT_OT_c3_animation)
     bpy.utils.unregister_class(IMPORT_OT_c3_texture)
-    bpy.utils.unregister_class(IMPORT_OT_c3_model)
\ No newline at end of file
+    bpy.utils.unregister_class(IMPORT_OT_c3_model_modal)
+    bpy.utils.unregister_class(IMPORT_OT_c3_model)
+    c3_motion.C3Motion.Motion_ClearCache()
+    c3_texture.C3Texture.Texture_ClearCache()
\ No newline at end of file
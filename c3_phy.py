@@ -1,12 +1,16 @@
+import hashlib
+import io
+import os
 import struct
+import numpy as np
 from mathutils import Vector, Matrix
 from . import c3_main
 from . import c3_common
 from . import c3_key
 from . import c3_motion
 
-_BONE_MAX_ = 2
-_MORPH_MAX_ = 4
+_BONE_MAX_ = c3_common.PHY_BONES
+_MORPH_MAX_ = max(c3_common.PHY_MORPHS.values())
 
 class PhyVertex:
     def __init__(self, morphMax, boneMax):
@@ -16,12 +20,6 @@ class PhyVertex:
         self.index = [0] * boneMax
         self.weight = [0.0] * boneMax
 
-class PhyOutVertex:
-    def __init__(self):
-        self.Position = Vector((0, 0, 0))
-        self.Color = (1.0, 1.0, 1.0, 1.0)
-        self.TexCoord = Vector((0, 0))
-
 class C3Phy:
     def __init__(self):
         self.lpName = None
@@ -29,7 +27,17 @@ class C3Phy:
         self.dwNVecCount = 0
         self.dwAVecCount = 0
         self.lpVB = None
-        self.outputVertices = None
+        self.lpPos = None
+        self.lpMorphPos = None
+        self.lpTexCoord = None
+        self.lpLoopTexCoord = None
+        self.lpSkinBone = None
+        self.lpBoneIndex = None
+        self.lpBoneWeight = None
+        self.lpColor = None
+        self.lpNormal = None
+        self.outputPositions = None
+        self.outputTexCoords = None
         self.dwNTriCount = 0
         self.dwATriCount = 0
         self.lpIB = None
@@ -39,6 +47,8 @@ class C3Phy:
         self.bboxMin = Vector((0, 0, 0))
         self.bboxMax = Vector((0, 0, 0))
         self.lpMotion = None
+        # Frame of this PHY, kept here because interned motions are shared between PHYs
+        self.nFrame = 0
         self.fA = 1.0
         self.fR = 1.0
         self.fG = 1.0
@@ -48,8 +58,13 @@ class C3Phy:
         self.dwTexRow = 1
         self.InitMatrix = Matrix.Identity(4)
         self.uvstep = Vector((0, 0))
+        self.bStep = False
+        self.bTwoSided = False
+        self.dwNamePad = 0
+        self.dwTexNamePad = 0
         self.m_dwPhyNum = 0
-        self.m_phy = [None] * 16
+        self.m_phy = []
+        self.m_chunkReport = []
     
     @staticmethod
     def Phy_Clear(lpPhy):
@@ -58,7 +73,17 @@ class C3Phy:
         lpPhy.dwNVecCount = 0
         lpPhy.dwAVecCount = 0
         lpPhy.lpVB = None
-        lpPhy.outputVertices = None
+        lpPhy.lpPos = None
+        lpPhy.lpMorphPos = None
+        lpPhy.lpLoopTexCoord = None
+        lpPhy.lpTexCoord = None
+        lpPhy.lpSkinBone = None
+        lpPhy.lpBoneIndex = None
+        lpPhy.lpBoneWeight = None
+        lpPhy.lpColor = None
+        lpPhy.lpNormal = None
+        lpPhy.outputPositions = None
+        lpPhy.outputTexCoords = None
         lpPhy.dwNTriCount = 0
         lpPhy.dwATriCount = 0
         lpPhy.lpIB = None
@@ -68,105 +93,101 @@ class C3Phy:
         lpPhy.bboxMin = Vector((0, 0, 0))
         lpPhy.bboxMax = Vector((0, 0, 0))
         lpPhy.lpMotion = None
+        lpPhy.nFrame = 0
         lpPhy.fA = lpPhy.fR = lpPhy.fG = lpPhy.fB = 1.0
         lpPhy.Key = c3_key.C3Key()
         c3_key.C3Key.Key_Clear(lpPhy.Key)
         lpPhy.bDraw = True
         lpPhy.dwTexRow = 1
         lpPhy.uvstep = Vector((0, 0))
+        lpPhy.bStep = False
+        lpPhy.bTwoSided = False
+        lpPhy.dwNamePad = 0
+        lpPhy.dwTexNamePad = 0
         lpPhy.InitMatrix = Matrix.Identity(4)
     
-    def C3_Load(self, lpName):
+    def C3_Load(self, lpName, bVertices=True):
+        # Each PHY chunk is parsed from its own bounded buffer: a bad chunk is recorded in
+        # m_chunkReport and leaves None in m_phy while the rest of the file still loads.
+        # bVertices=False skips the PhyVertex list (lpVB) for callers that only use the arrays
         self.m_dwPhyNum = 0
-        for n in range(16):
-            self.m_phy[n] = None
+        self.m_phy = []
+        self.m_chunkReport = []
         
         try:
             with open(lpName, 'rb') as file:
-                version = file.read(16).decode().rstrip('\0')
+                version = file.read(16).decode(errors='replace').rstrip('\0')
                 
                 if version != c3_main.C3_VERSION:
                     return False
                 
-                while file.tell() < len(open(lpName, 'rb').read()):
-                    chunk = c3_common.ChunkHeader.read(file)
-                    if chunk.byChunkID == b'PHY ' or chunk.byChunkID == b'PHY3' or chunk.byChunkID == b'PHY4':
-                        result, phy = C3Phy.Phy_Load(file, chunk.ChunkID)
-                        if not result:
-                            break
-                        self.m_phy[self.m_dwPhyNum] = phy
+                for chunk, offset, data in c3_common.ChunkHeader.read_chunks(file, (b'PHY ', b'PHY3', b'PHY4'), self.m_chunkReport):
+                    view = io.BytesIO(data)
+                    try:
+                        result, phy = C3Phy.Phy_Load(view, chunk.ChunkID, bVertices=bVertices)
+                        message = "" if result else "Phy_Load failed"
+                    except Exception as e:
+                        result = False
+                        message = f"{type(e).__name__}: {e}"
+                    
+                    if not result:
+                        print(f"Error: skipped {chunk.ChunkID} chunk at {offset}: {message}")
+                        self.m_chunkReport.append(c3_common.ChunkHeader.make_report(chunk.byChunkID, offset, chunk.dwChunkSize, "error", message))
+                        # Keep the slot so c3_phy_index and the PHY/motion pairing stay in step
+                        self.m_phy.append(None)
                         self.m_dwPhyNum += 1
+                        continue
+                    
+                    dwUnread = chunk.dwChunkSize - view.tell()
+                    if dwUnread:
+                        self.m_chunkReport.append(c3_common.ChunkHeader.make_report(chunk.byChunkID, offset, chunk.dwChunkSize, "mismatch", f"{dwUnread} bytes unread"))
                     else:
-                        file.seek(chunk.dwChunkSize, 1)
-        except Exception as e:
+                        self.m_chunkReport.append(c3_common.ChunkHeader.make_report(chunk.byChunkID, offset, chunk.dwChunkSize, "ok"))
+                    self.m_phy.append(phy)
+                    self.m_dwPhyNum += 1
+        except OSError as e:
             print("Error:", e)
             return False
         
-        return self.m_dwPhyNum > 0
+        return any(lpPhy is not None for lpPhy in self.m_phy)
     
     @staticmethod
-    def Phy_Load(file, ChunkID, bTex=False):
+    def Phy_Load(file, ChunkID, bTex=False, bVertices=True):
         lpPhy = C3Phy()
         C3Phy.Phy_Clear(lpPhy)
         
         temp = struct.unpack('<I', file.read(4))[0]
-        lpPhy.lpName = file.read(temp).decode().rstrip('\0')
+        byName = file.read(temp)
+        lpPhy.lpName = byName.decode().rstrip('\0')
+        lpPhy.dwNamePad = len(byName) - len(byName.rstrip(b'\0'))
         
         lpPhy.dwBlendCount = struct.unpack('<I', file.read(4))[0]
         lpPhy.dwNVecCount = struct.unpack('<I', file.read(4))[0]
         lpPhy.dwAVecCount = struct.unpack('<I', file.read(4))[0]
         
         totalVerts = lpPhy.dwNVecCount + lpPhy.dwAVecCount
-        lpPhy.lpVB = []
-        lpPhy.outputVertices = []
-        
-        morph_max = _MORPH_MAX_
-        if ChunkID == "PHY3" or ChunkID == "PHY4":
-            morph_max = 1
-        
-        for i in range(totalVerts):
-            vert = PhyVertex(morph_max, _BONE_MAX_)
-            
-            for m in range(morph_max):
-                x = struct.unpack('<f', file.read(4))[0]
-                y = struct.unpack('<f', file.read(4))[0]
-                z = struct.unpack('<f', file.read(4))[0]
-                vert.pos[m] = Vector((x, y, z))
-            
-            u = struct.unpack('<f', file.read(4))[0]
-            v = struct.unpack('<f', file.read(4))[0]
-            vert.TexCoord = Vector((u, v))
-            
-            file.read(4)
-            vert.color = (1.0, 1.0, 1.0, 1.0)
-            
-            for b in range(_BONE_MAX_):
-                vert.index[b] = struct.unpack('<I', file.read(4))[0]
-            
-            for b in range(_BONE_MAX_):
-                vert.weight[b] = struct.unpack('<f', file.read(4))[0]
-            
-            if ChunkID == "PHY3":
-                x = struct.unpack('<f', file.read(4))[0]
-                y = struct.unpack('<f', file.read(4))[0]
-                z = struct.unpack('<f', file.read(4))[0]
-            
-            lpPhy.lpVB.append(vert)
-            lpPhy.outputVertices.append(PhyOutVertex())            
-            lpPhy.outputVertices[i].Position = vert.pos[0]
-            lpPhy.outputVertices[i].Color = vert.color
-            lpPhy.outputVertices[i].TexCoord = vert.TexCoord
+        fields = c3_common.RecordLayout.phy_vertex(ChunkID.encode())
+        dwSize = c3_common.RecordLayout.size(fields)
+        data = file.read(totalVerts * dwSize)
+        if len(data) != totalVerts * dwSize:
+            raise ValueError(f"{totalVerts} vertices of {dwSize} bytes run past the end of the chunk")
+        C3Phy.Phy_BuildArrays(lpPhy, np.frombuffer(data, dtype=np.dtype(c3_common.RecordLayout.dtype(fields))))
+        # Export and live playback only use the arrays and skip the PhyVertex list
+        lpPhy.lpVB = C3Phy.Phy_BuildVertices(lpPhy) if bVertices else None
         
         lpPhy.dwNTriCount = struct.unpack('<I', file.read(4))[0]
         lpPhy.dwATriCount = struct.unpack('<I', file.read(4))[0]
         
         totalIndices = (lpPhy.dwNTriCount + lpPhy.dwATriCount) * 3
-        lpPhy.lpIB = []
-        for i in range(totalIndices):
-            lpPhy.lpIB.append(struct.unpack('<H', file.read(2))[0])
+        data = file.read(totalIndices * 2)
+        if len(data) != totalIndices * 2:
+            raise ValueError(f"{totalIndices} indices run past the end of the chunk")
+        lpPhy.lpIB = np.frombuffer(data, dtype='<u2').tolist()
         
         temp = struct.unpack('<I', file.read(4))[0]
-        lpPhy.lpTexName = file.read(temp).decode('gbk').rstrip('\0')
+        byName = file.read(temp)
+        lpPhy.lpTexName = byName.decode('gbk').rstrip('\0')
+        lpPhy.dwTexNamePad = len(byName) - len(byName.rstrip(b'\0'))
         
         x = struct.unpack('<f', file.read(4))[0]
         y = struct.unpack('<f', file.read(4))[0]
@@ -196,23 +217,236 @@ class C3Phy:
         for i in range(lpPhy.Key.dwChangeTexs):
             lpPhy.Key.lpChangeTexs.append(c3_key.C3Frame.read(file))
         
+        # Optional trailing flags, which may be cut short by the end of the chunk
         flag = file.read(4)
+        lpPhy.bStep = flag == b'STEP'
         if flag == b'STEP':
             lpPhy.uvstep.x = struct.unpack('<f', file.read(4))[0]
             lpPhy.uvstep.y = struct.unpack('<f', file.read(4))[0]
         else:
-            file.seek(-4, 1)
+            file.seek(-len(flag), 1)
         
         flag2 = file.read(4)
+        lpPhy.bTwoSided = flag2 == b'2SID'
         if flag2 == b'2SID':
             pass
         else:
-            file.seek(-4, 1)
+            file.seek(-len(flag2), 1)
         
         C3Phy.Phy_SetColor(lpPhy, 1, 1, 1, 1)
         
         return True, lpPhy
     
+    @staticmethod
+    def Phy_Save(file, lpPhy, ChunkID):
+        # Writes the chunk body Phy_Load reads from the PHY's arrays, the vertex block as one
+        # structured array. A PHY read and saved unchanged comes out byte for byte the same
+        totalVerts = len(lpPhy.lpPos)
+        ib = np.asarray(lpPhy.lpIB, dtype=np.int64)
+        if lpPhy.lpLoopTexCoord is not None:
+            raise ValueError(f"{lpPhy.lpName}: welded PHYs have per-corner UVs and cannot be saved")
+        if lpPhy.dwNVecCount + lpPhy.dwAVecCount != totalVerts:
+            raise ValueError(f"{lpPhy.lpName}: vertex counts {lpPhy.dwNVecCount} + {lpPhy.dwAVecCount} do not match {totalVerts} vertices")
+        if (lpPhy.dwNTriCount + lpPhy.dwATriCount) * 3 != len(ib):
+            raise ValueError(f"{lpPhy.lpName}: triangle counts {lpPhy.dwNTriCount} + {lpPhy.dwATriCount} do not match {len(ib)} indices")
+        if len(ib) and (ib.min() < 0 or ib.max() >= min(totalVerts, 0x10000)):
+            raise ValueError(f"{lpPhy.lpName}: indices must address the {totalVerts} vertices with 16 bits")
+        
+        morph_max = c3_common.PHY_MORPHS[ChunkID.encode()]
+        fields = c3_common.RecordLayout.dtype(c3_common.RecordLayout.phy_vertex(ChunkID.encode()))
+        vb = np.zeros(totalVerts, dtype=np.dtype(fields))
+        vb["pos"][:, 0] = lpPhy.lpPos
+        # Morph targets a PHY3/PHY4 source does not have repeat the base position
+        for m in range(1, morph_max):
+            vb["pos"][:, m] = lpPhy.lpMorphPos[m - 1] if m - 1 < len(lpPhy.lpMorphPos) else lpPhy.lpPos
+        vb["uv"] = lpPhy.lpTexCoord
+        vb["color"] = lpPhy.lpColor if lpPhy.lpColor is not None else 0xFFFFFFFF
+        vb["index"] = lpPhy.lpBoneIndex
+        vb["weight"] = lpPhy.lpBoneWeight
+        if ChunkID == "PHY3" and lpPhy.lpNormal is not None:
+            vb["normal"] = lpPhy.lpNormal
+        
+        byName = lpPhy.lpName.encode() + b'\0' * lpPhy.dwNamePad
+        byTexName = lpPhy.lpTexName.encode('gbk') + b'\0' * lpPhy.dwTexNamePad
+        out = [
+            struct.pack('<I', len(byName)), byName,
+            struct.pack('<III', lpPhy.dwBlendCount, lpPhy.dwNVecCount, lpPhy.dwAVecCount),
+            vb.tobytes(),
+            struct.pack('<II', lpPhy.dwNTriCount, lpPhy.dwATriCount),
+            ib.astype('<u2').tobytes(),
+            struct.pack('<I', len(byTexName)), byTexName,
+            struct.pack('<6f', *lpPhy.bboxMin, *lpPhy.bboxMax),
+            np.array(lpPhy.InitMatrix, dtype='<f4').tobytes(),
+            struct.pack('<I', lpPhy.dwTexRow),
+            c3_key.C3Frame.pack(lpPhy.Key.lpAlphas),
+            c3_key.C3Frame.pack(lpPhy.Key.lpDraws),
+            c3_key.C3Frame.pack(lpPhy.Key.lpChangeTexs),
+        ]
+        if lpPhy.bStep:
+            out.append(b'STEP' + struct.pack('<2f', lpPhy.uvstep.x, lpPhy.uvstep.y))
+        if lpPhy.bTwoSided:
+            out.append(b'2SID')
+        file.write(b''.join(out))
+        return True
+    
+    @staticmethod
+    def Phy_BuildArrays(lpPhy, vb):
+        # The per-vertex arrays from the vertex records (RecordLayout.phy_vertex) as read
+        totalVerts = len(vb)
+        lpPhy.lpPos = np.array(vb["pos"][:, 0], dtype=np.float32)
+        # Morph targets 1.. of PHY chunks, (targets, vertices, 3) and empty for PHY3/PHY4
+        lpPhy.lpMorphPos = np.array(vb["pos"][:, 1:].transpose(1, 0, 2), dtype=np.float32)
+        lpPhy.lpTexCoord = np.array(vb["uv"], dtype=np.float32)
+        # Colours and normals are kept only so Phy_Save can write them back
+        lpPhy.lpColor = np.array(vb["color"], dtype=np.uint32)
+        lpPhy.lpNormal = np.array(vb["normal"], dtype=np.float32) if "normal" in vb.dtype.names else None
+        
+        index = vb["index"].astype(np.int64)
+        weight = np.array(vb["weight"], dtype=np.float32)
+        lpPhy.lpBoneIndex = index.astype(np.uint32)
+        lpPhy.lpBoneWeight = weight
+        
+        # Only the first bone with a positive weight drives a vertex, -1 when none does
+        bound = weight > 0
+        first = np.argmax(bound, axis=1)
+        lpPhy.lpSkinBone = np.where(bound.any(axis=1), index[np.arange(totalVerts), first], -1)
+        
+        lpPhy.outputPositions = lpPhy.lpPos.copy()
+        lpPhy.outputTexCoords = lpPhy.lpTexCoord.copy()
+    
+    @staticmethod
+    def Phy_BuildVertices(lpPhy):
+        # PhyVertex list of the arrays, for code that walks the vertices one by one
+        morph_max = len(lpPhy.lpMorphPos) + 1
+        pos = np.concatenate((lpPhy.lpPos[None], lpPhy.lpMorphPos)).transpose(1, 0, 2).tolist()
+        uv = lpPhy.lpTexCoord.tolist()
+        index = lpPhy.lpBoneIndex.tolist()
+        weight = lpPhy.lpBoneWeight.tolist()
+        lpVB = []
+        for n in range(len(pos)):
+            vert = PhyVertex(morph_max, _BONE_MAX_)
+            vert.pos = [Vector(p) for p in pos[n]]
+            vert.TexCoord = Vector(uv[n])
+            vert.index = index[n]
+            vert.weight = weight[n]
+            lpVB.append(vert)
+        return lpVB
+    
+    @staticmethod
+    def Phy_Weld(lpPhy):
+        # Merges vertices with the same position, morph targets and bone, which C3 splits
+        # at UV seams, and drops vertices no triangle uses. UVs move to lpLoopTexCoord
+        # (one per lpIB entry) and triangles that collapse after the merge are removed
+        totalVerts = len(lpPhy.lpPos)
+        ib = np.array(lpPhy.lpIB, dtype=np.int64).reshape(-1, 3)
+        if totalVerts == 0 or len(ib) == 0:
+            return totalVerts, totalVerts
+        
+        used = np.unique(ib)
+        # + 0.0 turns -0.0 into 0.0 so both hash the same
+        columns = [(lpPhy.lpPos[used] + 0.0).view(np.int32), lpPhy.lpSkinBone[used].astype(np.int32)[:, None]]
+        for morph in lpPhy.lpMorphPos:
+            columns.append((morph[used] + 0.0).view(np.int32))
+        keys = np.ascontiguousarray(np.concatenate(columns, axis=1))
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        
+        # Keep the merged vertices in order of first use so the mesh stays close to the original
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        remap = np.full(totalVerts, -1, dtype=np.int64)
+        remap[used] = rank[inverse.ravel()]
+        keep = used[first[order]]
+        
+        newIB = remap[ib]
+        valid = (newIB[:, 0] != newIB[:, 1]) & (newIB[:, 1] != newIB[:, 2]) & (newIB[:, 0] != newIB[:, 2])
+        lpPhy.lpLoopTexCoord = np.ascontiguousarray(lpPhy.lpTexCoord[ib[valid]].reshape(-1, 2))
+        lpPhy.lpIB = newIB[valid].ravel().tolist()
+        
+        if lpPhy.lpVB is not None:
+            lpPhy.lpVB = [lpPhy.lpVB[i] for i in keep]
+        lpPhy.lpPos = np.ascontiguousarray(lpPhy.lpPos[keep])
+        lpPhy.lpMorphPos = np.ascontiguousarray(lpPhy.lpMorphPos[:, keep])
+        lpPhy.lpTexCoord = np.ascontiguousarray(lpPhy.lpTexCoord[keep])
+        lpPhy.lpSkinBone = lpPhy.lpSkinBone[keep]
+        lpPhy.lpBoneIndex = lpPhy.lpBoneIndex[keep]
+        lpPhy.lpBoneWeight = lpPhy.lpBoneWeight[keep]
+        lpPhy.lpColor = lpPhy.lpColor[keep]
+        if lpPhy.lpNormal is not None:
+            lpPhy.lpNormal = lpPhy.lpNormal[keep]
+        lpPhy.outputPositions = lpPhy.lpPos.copy()
+        lpPhy.outputTexCoords = lpPhy.lpTexCoord.copy()
+        return totalVerts, len(keep)
+    
+    @staticmethod
+    def Phy_Digest(lpPhy, szExtra=""):
+        # Fingerprint of everything that ends up in the mesh data-block: geometry, UVs,
+        # skinning, key tracks and the motion (by its chunk digest), plus caller options
+        h = hashlib.blake2b(digest_size=16)
+        for array in (lpPhy.lpPos, lpPhy.lpMorphPos, lpPhy.lpTexCoord, lpPhy.lpLoopTexCoord, lpPhy.lpSkinBone):
+            if array is not None:
+                h.update(str(array.shape).encode())
+                h.update(np.ascontiguousarray(array).tobytes())
+        h.update(np.array(lpPhy.lpIB, dtype=np.int64).tobytes())
+        h.update(np.array(lpPhy.InitMatrix, dtype=np.float32).tobytes())
+        h.update(struct.pack('<Iff', int(lpPhy.dwTexRow), lpPhy.uvstep.x, lpPhy.uvstep.y))
+        for lpFrames in (lpPhy.Key.lpAlphas, lpPhy.Key.lpDraws, lpPhy.Key.lpChangeTexs):
+            for frame in lpFrames or []:
+                h.update(struct.pack('<if?i', frame.nFrame, frame.fParam[0], frame.bParam[0], frame.nParam[0]))
+            h.update(b'|')
+        
+        lpMotion = lpPhy.lpMotion
+        if lpMotion is not None and lpMotion.digest is not None:
+            h.update(lpMotion.digest.encode())
+        elif lpMotion is not None:
+            h.update(struct.pack('<II', int(lpMotion.dwBoneCount), int(lpMotion.dwFrames)))
+            h.update(np.array(lpMotion.matrix, dtype=np.float32).tobytes())
+        h.update(szExtra.encode())
+        return h.hexdigest()
+    
+    @staticmethod
+    def Phy_Decimate(lpPhy, fRatio):
+        # Shortest-edge collapse down to about fRatio of the used vertices. A vertex only
+        # collapses into a neighbour bound to the same bone, so the skinning and every
+        # baked frame stay valid for the survivors. Each pass collapses a vertex set with
+        # no shared neighbours, then edges are rebuilt from the collapsed triangles.
+        # Returns the triangles as original vertex indices and the source triangle of each
+        ib = np.array(lpPhy.lpIB, dtype=np.int64).reshape(-1, 3)
+        totalVerts = len(lpPhy.lpPos)
+        parent = np.arange(totalVerts)
+        remaining = len(np.unique(ib))
+        target = max(3, int(remaining * fRatio))
+        
+        while remaining > target:
+            tris = parent[ib]
+            tris = tris[(tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 0] != tris[:, 2])]
+            edges = np.sort(np.concatenate((tris[:, [0, 1]], tris[:, [1, 2]], tris[:, [2, 0]])), axis=1)
+            edges = np.unique(edges, axis=0)
+            edges = edges[lpPhy.lpSkinBone[edges[:, 0]] == lpPhy.lpSkinBone[edges[:, 1]]]
+            if len(edges) == 0:
+                break
+            
+            length = np.linalg.norm(lpPhy.lpPos[edges[:, 0]] - lpPhy.lpPos[edges[:, 1]], axis=1)
+            collapse = np.arange(totalVerts)
+            touched = np.zeros(totalVerts, dtype=bool)
+            nCollapsed = 0
+            for a, b in edges[np.argsort(length, kind='stable')].tolist():
+                if touched[a] or touched[b]:
+                    continue
+                collapse[b] = a
+                touched[a] = touched[b] = True
+                nCollapsed += 1
+                remaining -= 1
+                if remaining <= target:
+                    break
+            if nCollapsed == 0:
+                break
+            parent = collapse[parent]
+        
+        tris = parent[ib]
+        valid = (tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 0] != tris[:, 2])
+        return tris[valid], np.flatnonzero(valid)
+    
     @staticmethod
     def ReadMatrix(file):
         m = []
@@ -229,7 +463,17 @@ class C3Phy:
     def Phy_Unload(lpPhy):
         lpPhy.lpName = None
         lpPhy.lpVB = None
-        lpPhy.outputVertices = None
+        lpPhy.lpPos = None
+        lpPhy.lpMorphPos = None
+        lpPhy.lpLoopTexCoord = None
+        lpPhy.lpTexCoord = None
+        lpPhy.lpSkinBone = None
+        lpPhy.lpBoneIndex = None
+        lpPhy.lpBoneWeight = None
+        lpPhy.lpColor = None
+        lpPhy.lpNormal = None
+        lpPhy.outputPositions = None
+        lpPhy.outputTexCoords = None
         lpPhy.lpIB = None
         lpPhy.lpTexName = None
         lpPhy.Key.lpAlphas = None
@@ -238,65 +482,74 @@ class C3Phy:
         lpPhy = None
     
     @staticmethod
-    def Phy_Calculate(lpPhy):
-        result, alpha = c3_key.C3Key.Key_ProcessAlpha(lpPhy.Key, lpPhy.lpMotion.nFrame, lpPhy.lpMotion.dwFrames)
+    def Phy_ProcessKeys(lpPhy):
+        # Updates fA and bDraw for the current frame and returns the texture coordinate offset
+        result, alpha = c3_key.C3Key.Key_ProcessAlpha(lpPhy.Key, lpPhy.nFrame, lpPhy.lpMotion.dwFrames)
         if result:
             lpPhy.fA = alpha
         
-        result, draw = c3_key.C3Key.Key_ProcessDraw(lpPhy.Key, lpPhy.lpMotion.nFrame)
+        result, draw = c3_key.C3Key.Key_ProcessDraw(lpPhy.Key, lpPhy.nFrame)
         if result:
             lpPhy.bDraw = draw
         
-        result, tex = c3_key.C3Key.Key_ProcessChangeTex(lpPhy.Key, lpPhy.lpMotion.nFrame)
-        if not result:
-            tex = -1
+        result, tex = c3_key.C3Key.Key_ProcessChangeTex(lpPhy.Key, lpPhy.nFrame)
+        if result and tex > -1:
+            segsize = 1.0 / lpPhy.dwTexRow
+            return ((tex % lpPhy.dwTexRow) * segsize, (tex // lpPhy.dwTexRow) * segsize)
+        return (lpPhy.uvstep.x, lpPhy.uvstep.y)
+    
+    @staticmethod
+    def Phy_Calculate(lpPhy):
+        offset = C3Phy.Phy_ProcessKeys(lpPhy)
         
         if not lpPhy.bDraw:
             return True
         
-        bone = []
-        for b in range(lpPhy.lpMotion.dwBoneCount):           
-            mm = c3_motion.C3Motion.Motion_GetMatrix(lpPhy.lpMotion, b)           
-            bone.append(lpPhy.InitMatrix @ mm @ lpPhy.lpMotion.matrix[b])
+        bone = C3Phy.Phy_GetBones(lpPhy)
+        lpPhy.outputPositions = C3Phy.Phy_Skin(lpPhy, lpPhy.lpPos, bone)
         
-        for v in range(lpPhy.dwNVecCount + lpPhy.dwAVecCount):
-            mix = lpPhy.lpVB[v].pos[0]
-            finalPos = Vector((0, 0, 0))
-            
-            for l in range(_BONE_MAX_):
-                index = lpPhy.lpVB[v].index[l]
-                weight = lpPhy.lpVB[v].weight[l]
-                
-                if weight > 0:
-                    mix4d = Vector(mix).to_4d()
-                    bone_transposed = bone[index]
-                    vec = mix4d @ bone_transposed
-                    finalPos += vec.xyz
-                    break
-            
-            lpPhy.outputVertices[v].Position = finalPos
-            lpPhy.outputVertices[v].Color = (lpPhy.fR, lpPhy.fG, lpPhy.fB, lpPhy.fA)
-            lpPhy.outputVertices[v].TexCoord = lpPhy.lpVB[v].TexCoord + lpPhy.uvstep
-            
-            if tex > -1:
-                segsize = 1.0 / lpPhy.dwTexRow
-                lpPhy.outputVertices[v].TexCoord = Vector((
-                    lpPhy.lpVB[v].TexCoord.x + (tex % lpPhy.dwTexRow) * segsize,
-                    lpPhy.lpVB[v].TexCoord.y + (tex // lpPhy.dwTexRow) * segsize
-                ))
+        lpPhy.outputTexCoords = lpPhy.lpTexCoord + np.array(offset, dtype=np.float32)
         
         return True
     
+    @staticmethod
+    def Phy_Skin(lpPhy, lpPos, bone):
+        sel = lpPhy.lpSkinBone
+        pos4 = np.ones((len(sel), 4), dtype=np.float32)
+        pos4[:, :3] = lpPos
+        finalPos = np.ascontiguousarray(np.einsum('ni,nij->nj', pos4, bone[np.maximum(sel, 0)])[:, :3])
+        finalPos[sel < 0] = 0.0
+        return finalPos
+    
+    @staticmethod
+    def Phy_Unskin(lpPhy, lpPos, bone):
+        # Inverse of Phy_Skin, unbound vertices (skinned to the origin) keep the PHY's lpPos
+        sel = lpPhy.lpSkinBone
+        pos4 = np.ones((len(sel), 4), dtype=np.float64)
+        pos4[:, :3] = lpPos
+        inverse = np.linalg.pinv(bone.astype(np.float64))
+        bindPos = np.einsum('ni,nij->nj', pos4, inverse[np.maximum(sel, 0)])[:, :3].astype(np.float32)
+        bindPos[sel < 0] = lpPhy.lpPos[sel < 0]
+        return bindPos
+    
+    @staticmethod
+    def Phy_GetBones(lpPhy):
+        # InitMatrix @ Motion_GetMatrix(b) @ matrix[b] for every bone, interpolation comes from the shared palette cache
+        palette = c3_motion.C3Motion.Motion_GetPalette(lpPhy.lpMotion, lpPhy.nFrame)
+        init = np.array(lpPhy.InitMatrix, dtype=np.float32)
+        matrix = np.array(lpPhy.lpMotion.matrix, dtype=np.float32).reshape(-1, 4, 4)
+        return init @ palette @ matrix
+    
     @staticmethod
     def Phy_NextFrame(lpPhy, nStep):
-        lpPhy.lpMotion.nFrame = (lpPhy.lpMotion.nFrame + nStep) % int(lpPhy.lpMotion.dwFrames)
+        lpPhy.nFrame = (lpPhy.nFrame + nStep) % int(lpPhy.lpMotion.dwFrames)
     
     @staticmethod
     def Phy_SetFrame(lpPhy, dwFrame):
         if lpPhy.lpMotion.dwFrames == 0:
-            lpPhy.lpMotion.nFrame = 0
+            lpPhy.nFrame = 0
         else:
-            lpPhy.lpMotion.nFrame = int(dwFrame % lpPhy.lpMotion.dwFrames)
+            lpPhy.nFrame = int(dwFrame % lpPhy.lpMotion.dwFrames)
     
     @staticmethod
     def Phy_Muliply(lpPhy, nBoneIndex, matrix):
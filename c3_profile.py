@@ -0,0 +1,132 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+class C3Profiler:
+    def __init__(self, bEnabled=False, bCProfile=False):
+        self.bEnabled = bEnabled
+        self.bCProfile = bCProfile and bEnabled
+        self.stages = {}
+        self.phys = {}
+        self.lpStack = []
+        self.profile = None
+        # cProfile data of profilers merged in from other threads
+        self.lpProfiles = []
+        self.fStart = 0.0
+        self.fTotal = 0.0
+        self.bOwnTrace = False
+
+    def Profile_Start(self, bSliced=False):
+        # cProfile only sees the calling thread. bSliced leaves it off outside Profile_Slice
+        # blocks, for work spread over timer ticks with UI callbacks in between
+        if not self.bEnabled:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.bOwnTrace = True
+        if self.bCProfile:
+            self.profile = cProfile.Profile()
+            if not bSliced:
+                self.profile.enable()
+        self.fStart = time.perf_counter()
+
+    def Profile_Stop(self):
+        if not self.bEnabled:
+            return
+        self.fTotal = time.perf_counter() - self.fStart
+        if self.profile is not None:
+            self.profile.disable()
+        if self.bOwnTrace:
+            tracemalloc.stop()
+            self.bOwnTrace = False
+
+    @contextmanager
+    def Profile_Slice(self):
+        if self.profile is None:
+            yield
+            return
+        self.profile.enable()
+        try:
+            yield
+        finally:
+            self.profile.disable()
+
+    def Profile_Merge(self, other):
+        # Adds the stages and cProfile data of a profiler that ran on another thread.
+        # Each profiler keeps its own stage stack, so the two never nest into each other
+        for name, stat in other.stages.items():
+            C3Profiler.Profile_Record(self.stages, name, stat["wall_s"], stat["peak_bytes"], stat["calls"])
+        for phy, stages in other.phys.items():
+            for name, stat in stages.items():
+                C3Profiler.Profile_Record(self.phys.setdefault(phy, {}), name, stat["wall_s"], stat["peak_bytes"], stat["calls"])
+        if other.profile is not None:
+            self.lpProfiles.append(other.profile)
+        self.lpProfiles += other.lpProfiles
+
+    @contextmanager
+    def stage(self, name, phy=None):
+        # Wall time, call count and Python peak memory (tracemalloc) of the block,
+        # summed per stage name and, when phy is given, per PHY as well
+        if not self.bEnabled:
+            yield
+            return
+
+        current, peak = tracemalloc.get_traced_memory()
+        if self.lpStack:
+            self.lpStack[-1][2] = max(self.lpStack[-1][2], peak - self.lpStack[-1][1])
+        tracemalloc.reset_peak()
+        entry = [time.perf_counter(), current, 0]
+        self.lpStack.append(entry)
+        try:
+            yield
+        finally:
+            self.lpStack.pop()
+            elapsed = time.perf_counter() - entry[0]
+            peak = max(entry[2], tracemalloc.get_traced_memory()[1] - entry[1])
+            if self.lpStack:
+                self.lpStack[-1][2] = max(self.lpStack[-1][2], peak + entry[1] - self.lpStack[-1][1])
+            self.Profile_Record(self.stages, name, elapsed, peak)
+            if phy is not None:
+                self.Profile_Record(self.phys.setdefault(phy, {}), name, elapsed, peak)
+
+    @staticmethod
+    def Profile_Record(table, name, elapsed, peak, nCalls=1):
+        stat = table.setdefault(name, {"calls": 0, "wall_s": 0.0, "peak_bytes": 0})
+        stat["calls"] += nCalls
+        stat["wall_s"] += elapsed
+        stat["peak_bytes"] = max(stat["peak_bytes"], peak)
+
+    def Profile_Summary(self, nTop=6):
+        lines = [f"Total {self.fTotal:.3f}s"]
+        ranked = sorted(self.stages.items(), key=lambda item: item[1]["wall_s"], reverse=True)
+        for name, stat in ranked[:nTop]:
+            lines.append(f"{name}: {stat['wall_s']:.3f}s x{stat['calls']}, peak {stat['peak_bytes'] / 1048576:.1f} MiB")
+        return lines
+
+    def Profile_Dump(self, lpName):
+        report = {
+            "source": lpName,
+            "total_s": self.fTotal,
+            "stages": self.stages,
+            "phys": self.phys,
+        }
+        base = os.path.join(tempfile.gettempdir(), "c3_profile_" + os.path.splitext(os.path.basename(lpName))[0])
+
+        lpProfiles = ([self.profile] if self.profile is not None else []) + self.lpProfiles
+        if lpProfiles:
+            stream = io.StringIO()
+            stats = pstats.Stats(*lpProfiles, stream=stream)
+            stats.dump_stats(base + ".prof")
+            stats.sort_stats("cumulative").print_stats(30)
+            report["cprofile"] = stream.getvalue()
+            report["cprofile_file"] = base + ".prof"
+
+        with open(base + ".json", 'w', encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        return base + ".json"
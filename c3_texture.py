@@ -0,0 +1,192 @@
+import os
+import struct
+import bpy
+from concurrent.futures import ThreadPoolExecutor
+
+# Resolved texture path -> (mtime, image name) and (path, material name) -> material name.
+# Names are checked against bpy.data on every hit since the user can rename or delete them,
+# an image whose file changed on disk is reloaded in place so its materials stay valid
+_image_table = {}
+_material_table = {}
+# Directory -> (mtime, {lowercase stem: path}), rebuilt only when the directory itself changes
+_dir_index = {}
+
+TEXTURE_EXTS = ('.dds', '.tga', '.png', '.jpg')
+# Uncompressed, color-mapped and grayscale TGA, plain and RLE
+TGA_TYPES = (1, 2, 3, 9, 10, 11)
+
+class C3Texture:
+    @staticmethod
+    def Texture_GetImage(tex_path, lpReload=None):
+        # With lpReload, images whose file changed are collected there instead of
+        # reloaded right away so a batch can reload them together at the end
+        path = os.path.realpath(tex_path)
+        mtime = os.path.getmtime(path)
+
+        entry = _image_table.get(path)
+        image = bpy.data.images.get(entry[1]) if entry else None
+        if image is not None and C3Texture.Texture_ImagePath(image) == path:
+            if entry[0] != mtime:
+                if lpReload is None:
+                    image.reload()
+                else:
+                    lpReload.append(image)
+                _image_table[path] = (mtime, image.name)
+            return image
+
+        image = bpy.data.images.load(path, check_existing=True)
+        _image_table[path] = (mtime, image.name)
+        return image
+
+    @staticmethod
+    def Texture_ImagePath(image):
+        return os.path.realpath(bpy.path.abspath(image.filepath, library=image.library))
+
+    @staticmethod
+    def Texture_GetMaterial(tex_path, name="C3_Material", lpReload=None):
+        path = os.path.realpath(tex_path)
+        image = C3Texture.Texture_GetImage(path, lpReload)
+        key = (path, name)
+
+        mat = bpy.data.materials.get(_material_table.get(key, ""))
+        if mat is not None and mat.use_nodes:
+            node = mat.node_tree.nodes.get("C3_Texture")
+            if node is not None and node.image == image:
+                return mat
+
+        mat = bpy.data.materials.new(name=name)
+        mat.use_nodes = True
+        bsdf = mat.node_tree.nodes["Principled BSDF"]
+
+        tex_image = mat.node_tree.nodes.new('ShaderNodeTexImage')
+        tex_image.name = "C3_Texture"
+        tex_image.image = image
+
+        mat.node_tree.links.new(bsdf.inputs['Base Color'], tex_image.outputs['Color'])
+
+        _material_table[key] = mat.name
+        return mat
+
+    @staticmethod
+    def Texture_Apply(obj, tex_path, name="C3_Material", lpReload=None):
+        mat = C3Texture.Texture_GetMaterial(tex_path, name, lpReload)
+
+        if obj.data.materials:
+            obj.data.materials[0] = mat
+        else:
+            obj.data.materials.append(mat)
+        return mat
+
+    @staticmethod
+    def Texture_Roots(context):
+        addon = context.preferences.addons.get(__package__)
+        if addon is None:
+            return []
+        return [root.strip() for root in addon.preferences.texture_roots.split(";") if root.strip()]
+
+    @staticmethod
+    def Texture_BuildIndex(directories):
+        # One listing per directory instead of an exists() probe per PHY and extension,
+        # earlier directories and extensions in TEXTURE_EXTS order win
+        index = {}
+        for directory in directories:
+            directory = os.path.realpath(bpy.path.abspath(directory))
+            try:
+                mtime = os.stat(directory).st_mtime
+            except OSError:
+                continue
+
+            entry = _dir_index.get(directory)
+            if entry is None or entry[0] != mtime:
+                stems = {}
+                with os.scandir(directory) as it:
+                    for dirent in it:
+                        stem, ext = os.path.splitext(dirent.name)
+                        ext = ext.lower()
+                        if ext not in TEXTURE_EXTS or not dirent.is_file():
+                            continue
+                        stem = stem.lower()
+                        current = stems.get(stem)
+                        if current is None or TEXTURE_EXTS.index(ext) < TEXTURE_EXTS.index(os.path.splitext(current)[1].lower()):
+                            stems[stem] = dirent.path
+                entry = (mtime, stems)
+                _dir_index[directory] = entry
+
+            for stem, path in entry[1].items():
+                index.setdefault(stem, path)
+        return index
+
+    @staticmethod
+    def Texture_Resolve(index, lpTexName, base_name=None):
+        # lpTexName may carry a Windows path and any of the texture extensions
+        if lpTexName:
+            stem = os.path.splitext(lpTexName.replace("\\", "/").split("/")[-1])[0].lower()
+            if stem in index:
+                return index[stem]
+        if base_name:
+            return index.get(base_name.lower())
+        return None
+
+    @staticmethod
+    def Texture_ReadHeader(path):
+        # Runs on a worker thread: no bpy here. Reading the whole file validates it
+        # and leaves it in the OS cache for the images.load that follows
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+        except OSError as e:
+            return False, str(e)
+
+        ext = os.path.splitext(path)[1].lower()
+        if ext == '.dds':
+            if len(data) < 128 or data[:4] != b"DDS " or struct.unpack_from("<I", data, 4)[0] != 124:
+                return False, "bad DDS header"
+            height, width = struct.unpack_from("<II", data, 12)
+        elif ext == '.tga':
+            if len(data) < 18 or data[2] not in TGA_TYPES:
+                return False, "bad TGA header"
+            width, height = struct.unpack_from("<HH", data, 12)
+        else:
+            return True, ""
+
+        if width == 0 or height == 0:
+            return False, "empty image"
+        return True, ""
+
+    @staticmethod
+    def Texture_Preload(lpPaths, nWorkers=None):
+        # Starts the header checks and returns path -> Future without waiting for them
+        executor = ThreadPoolExecutor(max_workers=nWorkers or min(8, (os.cpu_count() or 1) + 2))
+        futures = {}
+        for path in lpPaths:
+            if path and path not in futures:
+                futures[path] = executor.submit(C3Texture.Texture_ReadHeader, path)
+        executor.shutdown(wait=False)
+        return futures
+
+    @staticmethod
+    def Texture_ApplyBatch(lpPending, futures, name="C3_Material"):
+        # lpPending is a list of (obj, tex_path). Images and materials are created in one
+        # pass once the preload finished, changed images are reloaded at the end.
+        # Returns the (path, reason) pairs that failed validation
+        failed = {}
+        lpReload = []
+        for obj, tex_path in lpPending:
+            if tex_path not in failed:
+                future = futures.get(tex_path)
+                ok, reason = future.result() if future is not None else (True, "")
+                if not ok:
+                    failed[tex_path] = reason
+            if tex_path in failed:
+                continue
+            C3Texture.Texture_Apply(obj, tex_path, name, lpReload)
+
+        for image in lpReload:
+            image.reload()
+        return list(failed.items())
+
+    @staticmethod
+    def Texture_ClearCache():
+        _image_table.clear()
+        _material_table.clear()
+        _dir_index.clear()
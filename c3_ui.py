@@ -1,4 +1,17 @@
 import bpy
+from bpy.props import StringProperty
+
+class C3_AddonPreferences(bpy.types.AddonPreferences):
+    bl_idname = __package__
+    
+    texture_roots: StringProperty(
+        name="Texture Folders",
+        description="Extra folders searched for PHY textures after the model's own folder, separated by ';'",
+        default=""
+    )
+    
+    def draw(self, context):
+        self.layout.prop(self, "texture_roots")
 
 class C3_MT_menu(bpy.types.Menu):
     bl_idname = "C3_MT_menu"
@@ -7,19 +20,31 @@ class C3_MT_menu(bpy.types.Menu):
     def draw(self, context):
         layout = self.layout
         layout.operator("import_scene.c3_model", text="Import .C3 Model")
+        layout.operator("import_scene.c3_model_modal", text="Import .C3 Model (Background)")
         layout.operator("import_scene.c3_parts", text="Import .C3 Model Parts")
         layout.separator()
         layout.operator("import_scene.c3_texture", text="Import Texture")
         layout.separator()
         layout.operator("import_scene.c3_animation", text="Import Animation")
+        layout.separator()
+        layout.operator("export_scene.c3_model", text="Export .C3 Model")
+        layout.separator()
+        layout.operator("import_scene.c3_library", text="Index .C3 Library")
+        layout.operator("import_scene.c3_library_previews", text="Make C3 Library Previews")
+        layout.operator("import_scene.c3_assets", text="Import C3 Assets")
+        layout.separator()
+        layout.prop(context.scene, "c3_lod_viewport")
+        layout.prop(context.scene, "c3_lod_render")
 
 def menu_func(self, context):
     self.layout.menu(C3_MT_menu.bl_idname)
 
 def register():
+    bpy.utils.register_class(C3_AddonPreferences)
     bpy.utils.register_class(C3_MT_menu)
     bpy.types.TOPBAR_MT_editor_menus.append(menu_func)
 
 def unregister():
     bpy.types.TOPBAR_MT_editor_menus.remove(menu_func)
     bpy.utils.unregister_class(C3_MT_menu)
+    bpy.utils.unregister_class(C3_AddonPreferences)
@@ -0,0 +1,16 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope="session")
+def addon():
+    # The parser modules without bpy, they still need numpy and mathutils (pip install numpy mathutils)
+    pytest.importorskip("mathutils")
+    from benchmarks import load_addon
+    return load_addon()
+
+@pytest.fixture(autouse=True)
+def clear_motion_cache(addon):
+    addon.c3_motion.C3Motion.Motion_ClearCache()
@@ -0,0 +1,35 @@
+import time
+import pytest
+from benchmarks import c3_synth
+
+def load(addon, path):
+    phy_loader = addon.c3_phy.C3Phy()
+    motion_loader = addon.c3_motion.C3Motion()
+    assert phy_loader.C3_Load(path)
+    assert motion_loader.C3_Load(path)
+    return phy_loader, motion_loader
+
+def test_load_many_chunks(addon, tmp_path):
+    path = c3_synth.make_c3(str(tmp_path / "many.c3"), "PHY4", "ZKEY", vertices=64, bones=4, frames=10, keyframes=3, count=250)
+    phy_loader, motion_loader = load(addon, path)
+    assert phy_loader.m_dwPhyNum == 250
+    assert motion_loader.m_dwMotionNum == 250
+    assert [lpPhy.lpName for lpPhy in phy_loader.m_phy] == [f"v_part{n}" for n in range(250)]
+    assert all(lpMotion is not None and lpMotion.dwFrames == 10 for lpMotion in motion_loader.m_motion)
+    assert all(entry["status"] == "ok" for entry in phy_loader.m_chunkReport + motion_loader.m_chunkReport)
+
+def test_load_time_is_linear(addon, tmp_path):
+    # Quadratic loading (re-walking the file per chunk) would make each chunk of the 400
+    # chunk file 4x as slow as in the 100 chunk one, linear loading keeps it about the same
+    per_chunk = {}
+    for count in (100, 400):
+        path = c3_synth.make_c3(str(tmp_path / f"scale_{count}.c3"), "PHY4", "ZKEY", vertices=64, bones=4, frames=10,
+                                keyframes=3, count=count)
+        times = []
+        for _ in range(3):
+            addon.c3_motion.C3Motion.Motion_ClearCache()
+            start = time.perf_counter()
+            load(addon, path)
+            times.append(time.perf_counter() - start)
+        per_chunk[count] = min(times) / count
+    assert per_chunk[400] < per_chunk[100] * 2.5
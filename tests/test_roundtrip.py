@@ -0,0 +1,51 @@
+import io
+import numpy as np
+import pytest
+from benchmarks import c3_synth
+
+def resave(addon, path, ChunkID):
+    # The file rebuilt from its parsed PHYs and motions with Phy_Save/Motion_Save
+    phy_loader = addon.c3_phy.C3Phy()
+    assert phy_loader.C3_Load(path)
+    motion_loader = addon.c3_motion.C3Motion()
+    assert motion_loader.C3_Load(path)
+    out = [c3_synth.C3_HEADER]
+    for lpPhy in phy_loader.m_phy:
+        view = io.BytesIO()
+        addon.c3_phy.C3Phy.Phy_Save(view, lpPhy, ChunkID)
+        out.append(c3_synth.chunk(ChunkID, view.getvalue()))
+    for lpMotion in motion_loader.m_motion:
+        view = io.BytesIO()
+        addon.c3_motion.C3Motion.Motion_Save(view, lpMotion)
+        out.append(c3_synth.chunk("MOTI", view.getvalue()))
+    return b"".join(out)
+
+def save_motion(addon, lpMotion):
+    view = io.BytesIO()
+    addon.c3_motion.C3Motion.Motion_Save(view, lpMotion)
+    return view.getvalue()
+
+@pytest.mark.parametrize("KeyType", c3_synth.KEY_TYPES)
+@pytest.mark.parametrize("ChunkID", c3_synth.PHY_TYPES)
+def test_save_reproduces_file(addon, tmp_path, ChunkID, KeyType):
+    path = c3_synth.make_c3(str(tmp_path / "model.c3"), ChunkID, KeyType, vertices=200, bones=6, frames=12,
+                            keyframes=4, count=3, morphs=2)
+    with open(path, 'rb') as file:
+        assert resave(addon, path, ChunkID) == file.read()
+
+@pytest.mark.parametrize("KeyType", c3_synth.KEY_TYPES)
+def test_retime(addon, KeyType):
+    C3Motion = addon.c3_motion.C3Motion
+    data = c3_synth.motion_chunk(np.random.default_rng(1), KeyType, bones=4, frames=20, keyframes=5, morphs=2)[8:]
+    lpMotion = C3Motion.Motion_Load(io.BytesIO(data))[1]
+    
+    assert save_motion(addon, C3Motion.Motion_Retime(lpMotion, 1.0)) == data
+    
+    lpSlow = C3Motion.Motion_Load(io.BytesIO(save_motion(addon, C3Motion.Motion_Retime(lpMotion, 2.0))))[1]
+    assert lpSlow.dwFrames == 40
+    assert lpSlow.szKeyType == lpMotion.szKeyType
+    # Every source frame is played on the even frames of the slowed motion
+    source = C3Motion.Motion_Frames(lpMotion)
+    assert np.allclose(C3Motion.Motion_Frames(lpSlow)[:40:2], source, atol=1e-5)
+    weights = np.array(lpSlow.lpMorph).reshape(40, 2)
+    assert np.allclose(weights[:40:2], np.array(lpMotion.lpMorph).reshape(20, 2), atol=1e-6)
@@ -0,0 +1,48 @@
+import numpy as np
+from benchmarks import c3_synth
+
+def load_phys(addon, path):
+    # The PHYs with their motions attached, as the importer pairs them
+    phy_loader = addon.c3_phy.C3Phy()
+    assert phy_loader.C3_Load(path)
+    motion_loader = addon.c3_motion.C3Motion()
+    assert motion_loader.C3_Load(path)
+    for lpPhy, lpMotion in zip(phy_loader.m_phy, motion_loader.m_motion):
+        lpPhy.lpMotion = lpMotion
+    return phy_loader.m_phy
+
+def test_basis_after_bake_of_other_phy(addon, tmp_path):
+    C3Phy = addon.c3_phy.C3Phy
+    path = c3_synth.make_c3(str(tmp_path / "parts.c3"), "PHY4", "ZKEY", vertices=100, bones=6, frames=30,
+                            keyframes=10, count=2, shared=True)
+    lpPhys = load_phys(addon, path)
+    assert lpPhys[0].lpMotion is lpPhys[1].lpMotion
+
+    C3Phy.Phy_Calculate(lpPhys[1])
+    basis = lpPhys[1].outputPositions.copy()
+
+    # The frames a shape key bake of PHY 0 samples, ending on the last one
+    for frame in range(30):
+        C3Phy.Phy_SetFrame(lpPhys[0], frame)
+        C3Phy.Phy_Calculate(lpPhys[0])
+    assert lpPhys[0].nFrame == 29
+
+    assert lpPhys[1].nFrame == 0
+    C3Phy.Phy_Calculate(lpPhys[1])
+    assert np.array_equal(lpPhys[1].outputPositions, basis)
+
+def test_shared_motion_frames_match_own_motion(addon, tmp_path):
+    # A PHY on the shared motion poses like the same PHY on a motion of its own
+    C3Phy = addon.c3_phy.C3Phy
+    path = c3_synth.make_c3(str(tmp_path / "parts.c3"), "PHY4", "KKEY", vertices=50, bones=4, frames=12,
+                            keyframes=4, count=2, shared=True)
+    lpShared = load_phys(addon, path)
+    C3Phy.Phy_SetFrame(lpShared[0], 7)
+    C3Phy.Phy_SetFrame(lpShared[1], 3)
+    C3Phy.Phy_Calculate(lpShared[1])
+
+    addon.c3_motion.C3Motion.Motion_ClearCache()
+    lpOwn = load_phys(addon, path)[1]
+    C3Phy.Phy_SetFrame(lpOwn, 3)
+    C3Phy.Phy_Calculate(lpOwn)
+    assert np.array_equal(lpShared[1].outputPositions, lpOwn.outputPositions)